@@ -0,0 +1,240 @@
+# batch.py
+
+from functools import cached_property
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from kpi_function.kpi import (
+    get_total_reviews,
+    get_score_distribution,
+    get_reviews_by_version,
+    get_thumbs_up_distribution,
+    get_combined_sentiment_average,
+    get_review_frequency_by_hour,
+    get_score_thumbs_correlation,
+    get_sentiment_trends_by_version,
+    get_average_score_over_time,
+    get_monthly_review_count,
+)
+from kpi_function.rollup import (
+    is_hour_aligned,
+    rollup_average_score_over_time,
+    rollup_monthly_review_count,
+    rollup_sentiment_trends_by_version,
+)
+
+
+# KPI disponibles dans un lot (mêmes noms que les endpoints de main.py)
+BATCH_KPI_NAMES = (
+    'total_reviews',
+    'score_distribution',
+    'sentiment_ratio',
+    'average_score_over_time',
+    'reviews_by_version',
+    'thumbs_up_distribution',
+    'combined_sentiment_average',
+    'average_thumbs_up_per_sentiment',
+    'review_frequency_by_hour',
+    'top_users_by_reviews',
+    'score_thumbs_correlation',
+    'reviews_per_user',
+    'average_score_per_user',
+    'sentiment_trends_by_version',
+    'monthly_reviews',
+)
+
+# Fréquences pour lesquelles la moyenne des notes se déduit de l'agrégat mensuel partagé
+MONTHLY_FREQS = ('M', 'ME')
+
+
+class KPIBatch:
+    """
+    Calcul d'un lot de KPI sur un même DataFrame, en partageant les passes de groupby.
+
+    Plusieurs KPI regroupent sur les mêmes clés :
+    - 'sentiment' : répartition des sentiments et moyenne des pouces levés ;
+    - 'userName'  : top utilisateurs, avis par utilisateur et note moyenne par utilisateur ;
+    - le mois     : avis par mois et note moyenne par mois.
+    Chaque agrégat partagé est calculé une seule fois (au premier KPI qui en a besoin),
+    puis chaque KPI en est dérivé, avec exactement le même résultat que sa fonction de kpi.py.
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        DataFrame contenant les avis utilisateurs (serving frame de préférence).
+    rollup : pd.DataFrame, optionnel
+        Cube horaire des mêmes avis (voir rollup.HourlyRollup) : les séries temporelles
+        sont alors calculées sur le cube plutôt que sur les lignes.
+    """
+
+    def __init__(self, df: pd.DataFrame, rollup: Optional[pd.DataFrame] = None):
+        self.df = df
+        self.rollup = rollup
+
+    @cached_property
+    def by_sentiment(self) -> pd.DataFrame:
+        """
+        Une passe sur 'sentiment' : nombre d'avis et moyenne des 'thumbsUpCount',
+        dans l'ordre d'apparition des sentiments.
+        """
+        return self.df.groupby('sentiment', observed=True, sort=False)['thumbsUpCount'].agg(['size', 'mean'])
+
+    @cached_property
+    def by_user(self) -> pd.DataFrame:
+        """
+        Une passe sur 'userName' : nombre d'avis et note moyenne, dans l'ordre d'apparition.
+        """
+        return self.df.groupby('userName', observed=True, sort=False)['score'].agg(['size', 'mean'])
+
+    @cached_property
+    def by_month(self) -> pd.DataFrame:
+        """
+        Une passe sur le mois : nombre d'avis et note moyenne, mois sans avis inclus
+        (à 0 avis et note NaN, comme avec un resample mensuel).
+        """
+        months = self.df['month'] if 'month' in self.df.columns else pd.to_datetime(self.df['at']).dt.to_period('M')
+        grouped = self.df['score'].groupby(months).agg(['size', 'mean'])
+        if grouped.empty:
+            return grouped
+        all_months = pd.period_range(grouped.index.min(), grouped.index.max(), freq='M')
+        grouped = grouped.reindex(all_months)
+        grouped['size'] = grouped['size'].fillna(0).astype('int64')
+        return grouped
+
+    @cached_property
+    def users_by_count(self) -> pd.DataFrame:
+        """
+        Utilisateurs triés par nombre d'avis décroissant (ex-aequo dans l'ordre d'apparition).
+        """
+        counts = self.by_user['size'].rename('count').sort_values(ascending=False, kind='stable').reset_index()
+        counts.columns = ['userName', 'review_count']
+        return counts
+
+    def sentiment_ratio(self) -> dict:
+        counts = self.by_sentiment['size'].sort_values(ascending=False, kind='stable').to_dict()
+        total = get_total_reviews(self.df)
+        return {k: round(v / total * 100, 2) for k, v in counts.items()}
+
+    def average_thumbs_up_per_sentiment(self) -> pd.DataFrame:
+        average_thumbs = self.by_sentiment['mean'].sort_index().rename('average_thumbs_up').reset_index()
+        return average_thumbs
+
+    def top_users_by_reviews(self, top_n: int = 10) -> pd.DataFrame:
+        return self.users_by_count.head(top_n)
+
+    def reviews_per_user(self) -> pd.DataFrame:
+        return self.users_by_count
+
+    def average_score_per_user(self) -> pd.DataFrame:
+        return self.by_user['mean'].sort_index().rename('average_score').reset_index()
+
+    def monthly_reviews(self) -> pd.DataFrame:
+        if self.rollup is not None:
+            return rollup_monthly_review_count(self.rollup)
+        if self.by_month.empty:
+            return get_monthly_review_count(self.df)
+        return pd.DataFrame({
+            'month': self.by_month.index.strftime('%Y-%m'),
+            'review_count': self.by_month['size'].to_numpy()
+        })
+
+    def average_score_over_time(self, freq: str = 'M') -> pd.DataFrame:
+        if self.rollup is not None and is_hour_aligned(freq):
+            return rollup_average_score_over_time(self.rollup, freq)
+        if freq not in MONTHLY_FREQS or self.by_month.empty:
+            return get_average_score_over_time(self.df, freq)
+        # Même étiquette que le resample mensuel : le dernier jour du mois, à minuit
+        month_ends = self.by_month.index.to_timestamp(how='end').normalize()
+        return pd.DataFrame({'at': month_ends, 'average_score': self.by_month['mean'].to_numpy()})
+
+    def compute(self, name: str, freq: str = 'M', top_n: int = 10):
+        """
+        Calcule un KPI du lot (résultat identique à celui de la fonction de kpi.py correspondante).
+        """
+        if name == 'total_reviews':
+            return get_total_reviews(self.df)
+        if name == 'score_distribution':
+            return get_score_distribution(self.df)
+        if name == 'sentiment_ratio':
+            return self.sentiment_ratio()
+        if name == 'average_score_over_time':
+            return self.average_score_over_time(freq)
+        if name == 'reviews_by_version':
+            return get_reviews_by_version(self.df)
+        if name == 'thumbs_up_distribution':
+            return get_thumbs_up_distribution(self.df)
+        if name == 'combined_sentiment_average':
+            return get_combined_sentiment_average(self.df)
+        if name == 'average_thumbs_up_per_sentiment':
+            return self.average_thumbs_up_per_sentiment()
+        if name == 'review_frequency_by_hour':
+            return get_review_frequency_by_hour(self.df)
+        if name == 'top_users_by_reviews':
+            return self.top_users_by_reviews(top_n)
+        if name == 'score_thumbs_correlation':
+            return get_score_thumbs_correlation(self.df)
+        if name == 'reviews_per_user':
+            return self.reviews_per_user()
+        if name == 'average_score_per_user':
+            return self.average_score_per_user()
+        if name == 'sentiment_trends_by_version':
+            if self.rollup is not None and is_hour_aligned(freq):
+                return rollup_sentiment_trends_by_version(self.rollup, freq)
+            return get_sentiment_trends_by_version(self.df, freq)
+        if name == 'monthly_reviews':
+            return self.monthly_reviews()
+        raise ValueError(f"KPI inconnu : '{name}'. KPI disponibles : {list(BATCH_KPI_NAMES)}.")
+
+
+def parse_kpi_names(names: Optional[Iterable[str]]) -> list:
+    """
+    Normalise la liste des KPI demandés : accepte un paramètre répété
+    (?names=a&names=b) ou des noms séparés par des virgules (?names=a,b).
+    Sans liste, tous les KPI du lot sont demandés. Lève ValueError sur un nom inconnu.
+    """
+    if not names:
+        return list(BATCH_KPI_NAMES)
+    requested = []
+    for item in names:
+        for name in item.split(','):
+            name = name.strip()
+            if not name or name in requested:
+                continue
+            if name not in BATCH_KPI_NAMES:
+                raise ValueError(f"KPI inconnu : '{name}'. KPI disponibles : {list(BATCH_KPI_NAMES)}.")
+            requested.append(name)
+    return requested
+
+
+def compute_kpis(
+    df: pd.DataFrame,
+    names: Iterable[str],
+    freq: str = 'M',
+    top_n: int = 10,
+    rollup: Optional[pd.DataFrame] = None
+) -> dict:
+    """
+    Calcule plusieurs KPI en une fois, en partageant les passes de groupby (voir KPIBatch).
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        DataFrame contenant les avis utilisateurs.
+    names : Iterable[str]
+        Noms des KPI à calculer (voir BATCH_KPI_NAMES).
+    freq : str
+        Fréquence temporelle pour 'average_score_over_time' et 'sentiment_trends_by_version'.
+    top_n : int
+        Nombre d'utilisateurs pour 'top_users_by_reviews'.
+    rollup : pd.DataFrame, optionnel
+        Cube horaire filtré comme df, pour les séries temporelles (voir KPIBatch).
+
+    Retour
+    ------
+    dict
+        Dictionnaire {nom du KPI: résultat}, les résultats ayant le même type
+        que ceux des fonctions de kpi.py (DataFrame, dict ou scalaire).
+    """
+    batch = KPIBatch(df, rollup)
+    return {name: batch.compute(name, freq=freq, top_n=top_n) for name in names}
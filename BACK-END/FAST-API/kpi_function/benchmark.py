@@ -0,0 +1,279 @@
+# benchmark.py
+#
+# Banc d'essai des fonctions KPI : temps d'exécution et pic mémoire de chaque fonction
+# de kpi.py (et de old_kpi.py pour comparaison) sur des jeux de 10k à 10M lignes,
+# avec vérification que les deux implémentations renvoient le même résultat.
+#
+# Lancement (depuis BACK-END/FAST-API) :
+#     python -m kpi_function.benchmark --sizes 10000,100000 --output benchmark_report.json
+
+import argparse
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from kpi_function import kpi, old_kpi
+from kpi_function.serving import build_serving_frame
+from pipeline.storage import read_dataset
+
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_DATA_PATH = "Assets/Datas/archive_uber/uber_data_final.csv"
+
+# Fonctions mesurées et leurs paramètres (mêmes valeurs par défaut que les endpoints de main.py)
+KPI_CALLS = [
+    ("get_total_reviews", {}),
+    ("get_score_distribution", {}),
+    ("get_sentiment_ratio", {}),
+    ("get_average_score_over_time", {"freq": "M"}),
+    ("get_reviews_by_version", {}),
+    ("get_thumbs_up_distribution", {}),
+    ("get_combined_sentiment_average", {}),
+    ("get_most_common_words", {"sentiment": "positive", "top_n": 10}),
+    ("get_average_thumbs_up_per_sentiment", {}),
+    ("get_review_frequency_by_hour", {}),
+    ("get_top_users_by_reviews", {"top_n": 10}),
+    ("get_score_thumbs_correlation", {}),
+    ("get_reviews_per_user", {}),
+    ("get_average_score_per_user", {}),
+    ("get_sentiment_trends_by_version", {"freq": "M"}),
+    ("get_monthly_review_count", {}),
+]
+
+
+def scale_dataset(base: pd.DataFrame, n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Construit un jeu de n_rows lignes au schéma final à partir du jeu réel,
+    par tirage aléatoire (avec remise) des lignes.
+
+    Pour que les cardinalités grandissent avec le volume comme en production,
+    les utilisateurs sont re-tirés parmi n_rows / 2 noms et les dates sont
+    réparties sur un an à partir de la première date du jeu réel.
+    """
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+
+    n_users = max(n_rows // 2, 1)
+    df['userName'] = pd.Series(rng.integers(0, n_users, n_rows)).astype(str).radd("User_")
+
+    start = pd.to_datetime(base['at']).min()
+    offsets = pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, n_rows), unit='s')
+    df['at'] = start + offsets
+    return df
+
+
+def as_object_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Copie du DataFrame où les colonnes 'category' redeviennent 'object', comme après un
+    pd.read_csv : c'est sur ce type de données que tournait old_kpi.py (ses groupby
+    sans observed=True listeraient sinon toutes les catégories, même absentes).
+    """
+    categorical = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    return df.astype({col: object for col in categorical})
+
+
+def measure(func: Callable, prepare: Callable[[], tuple], repeat: int) -> dict:
+    """
+    Mesure une fonction : temps (min et médiane sur 'repeat' exécutions) puis pic mémoire
+    (une exécution sous tracemalloc, qui suit aussi les allocations NumPy).
+
+    'prepare' fournit les arguments de chaque exécution, hors mesure
+    (ex. une copie du DataFrame pour les fonctions qui le modifient).
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        args = prepare()
+        t0 = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - t0)
+
+    args = prepare()
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "wall_time_s": {"min": min(times), "median": statistics.median(times)},
+        "peak_memory_bytes": peak,
+        "result": result,
+    }
+
+
+def _normalize(result):
+    """
+    Met un résultat KPI sous une forme comparable : les colonnes 'category' deviennent
+    des colonnes 'object', l'index est remis à zéro.
+    """
+    if isinstance(result, pd.DataFrame):
+        result = result.reset_index(drop=True)
+        for col in result.columns:
+            if isinstance(result[col].dtype, pd.CategoricalDtype):
+                result[col] = result[col].astype(object)
+    return result
+
+
+def compare_results(new, old) -> dict:
+    """
+    Compare les résultats des deux implémentations.
+
+    Retour
+    ------
+    dict
+        {"status": ..., "detail": ...} avec status :
+        - 'identical' : même résultat, même ordre ;
+        - 'same_rows_different_order' : mêmes lignes, ordre différent ;
+        - 'different_tie_order' : mêmes valeurs numériques dans le même ordre, mais des ex-aequo
+          départagés autrement (ex. top des utilisateurs à égalité de nombre d'avis) ;
+        - 'different' : résultats différents (detail contient le message de comparaison).
+    """
+    new, old = _normalize(new), _normalize(old)
+    if isinstance(new, pd.DataFrame) and isinstance(old, pd.DataFrame):
+        try:
+            pd.testing.assert_frame_equal(new, old, check_dtype=False)
+            return {"status": "identical", "detail": None}
+        except AssertionError as exc:
+            detail = str(exc)
+        try:
+            columns = list(new.columns)
+            pd.testing.assert_frame_equal(
+                new.sort_values(columns, kind='stable').reset_index(drop=True),
+                old.sort_values(columns, kind='stable').reset_index(drop=True),
+                check_dtype=False
+            )
+            return {"status": "same_rows_different_order", "detail": None}
+        except (AssertionError, TypeError):
+            pass
+        numeric = [col for col in new.columns if pd.api.types.is_numeric_dtype(new[col])]
+        if numeric and new.shape == old.shape and list(new.columns) == list(old.columns):
+            try:
+                pd.testing.assert_frame_equal(new[numeric], old[numeric], check_dtype=False)
+                return {"status": "different_tie_order", "detail": None}
+            except AssertionError:
+                pass
+        return {"status": "different", "detail": detail}
+
+    if isinstance(new, float) and isinstance(old, float) and np.isnan(new) and np.isnan(old):
+        return {"status": "identical", "detail": None}
+    if isinstance(new, dict) and isinstance(old, dict):
+        # L'égalité de deux dict ignore l'ordre des clés : on le compare d'abord
+        if list(new.items()) == list(old.items()):
+            return {"status": "identical", "detail": None}
+        if new == old:
+            return {"status": "same_rows_different_order", "detail": None}
+    elif new == old:
+        return {"status": "identical", "detail": None}
+    if isinstance(new, list) and isinstance(old, list) and sorted(new) == sorted(old):
+        return {"status": "same_rows_different_order", "detail": None}
+    return {"status": "different", "detail": f"kpi={new!r} old_kpi={old!r}"[:500]}
+
+
+def run_benchmark(
+    base: pd.DataFrame,
+    sizes: list,
+    repeat: int = 3,
+    include_old: bool = True,
+    functions: Optional[list] = None,
+    seed: int = 0,
+    verbose: bool = True
+) -> dict:
+    """
+    Lance le banc d'essai et retourne le rapport (dictionnaire sérialisable en JSON).
+
+    Pour chaque taille, les fonctions de kpi.py sont mesurées sur le serving frame
+    (comme dans l'API) et celles de old_kpi.py sur une copie du jeu brut à chaque
+    exécution (elles modifient le DataFrame reçu), avec des colonnes 'object' comme avant
+    le passage aux types compacts. La construction du serving frame est mesurée à part
+    ('build_serving_frame').
+
+    Paramètres
+    ----------
+    base : pd.DataFrame
+        Jeu réel au schéma final (uber_data_final), utilisé comme source de tirage.
+    sizes : list
+        Nombres de lignes à tester.
+    repeat : int
+        Nombre d'exécutions chronométrées par fonction.
+    include_old : bool
+        Mesure aussi old_kpi.py et vérifie l'équivalence des résultats.
+    functions : list, optionnel
+        Sous-ensemble des fonctions à mesurer (noms de KPI_CALLS).
+    """
+    calls = [(name, params) for name, params in KPI_CALLS if not functions or name in functions]
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "repeat": repeat,
+        "results": [],
+        "equivalence": [],
+    }
+
+    for n_rows in sizes:
+        raw = scale_dataset(base, n_rows, seed)
+        raw_object = as_object_columns(raw) if include_old else None
+        built = measure(build_serving_frame, lambda: (raw,), 1)
+        serving = built.pop("result")
+        report["results"].append({"rows": n_rows, "function": "build_serving_frame", "implementation": "kpi", **built})
+        if verbose:
+            print(f"{n_rows} lignes : serving frame construit en {built['wall_time_s']['min']:.3f} s")
+
+        for name, params in calls:
+            new = measure(lambda frame: getattr(kpi, name)(frame, **params), lambda: (serving,), repeat)
+            new_result = new.pop("result")
+            report["results"].append({"rows": n_rows, "function": name, "implementation": "kpi", **new})
+            line = f"  {name} : {new['wall_time_s']['median']:.4f} s"
+
+            old_func = getattr(old_kpi, name, None)
+            if include_old and old_func is not None:
+                old = measure(lambda frame: old_func(frame, **params), lambda: (raw_object.copy(),), repeat)
+                old_result = old.pop("result")
+                report["results"].append({"rows": n_rows, "function": name, "implementation": "old_kpi", **old})
+                report["equivalence"].append({"rows": n_rows, "function": name, **compare_results(new_result, old_result)})
+                line += f" (old_kpi : {old['wall_time_s']['median']:.4f} s, {report['equivalence'][-1]['status']})"
+            if verbose:
+                print(line)
+
+        del raw, raw_object, serving
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc d'essai des fonctions KPI (kpi.py et old_kpi.py).")
+    parser.add_argument(
+        "--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Tailles des jeux de données, séparées par des virgules (10k à 10M lignes par défaut)."
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre d'exécutions chronométrées par fonction.")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="Jeu réel servant de source de tirage.")
+    parser.add_argument("--seed", type=int, default=0, help="Graine du tirage aléatoire.")
+    parser.add_argument("--functions", default=None, help="Fonctions à mesurer, séparées par des virgules.")
+    parser.add_argument("--no-old", action="store_true", help="Ne mesure pas old_kpi.py (pas de vérification d'équivalence).")
+    parser.add_argument("--output", default="benchmark_report.json", help="Fichier du rapport JSON.")
+    args = parser.parse_args()
+
+    # Les alias de fréquence dépréciés ('M') sont ceux de l'API : on masque les avertissements
+    warnings.simplefilter("ignore", FutureWarning)
+    report = run_benchmark(
+        read_dataset(args.data),
+        sizes=[int(size) for size in args.sizes.split(",")],
+        repeat=args.repeat,
+        include_old=not args.no_old,
+        functions=args.functions.split(",") if args.functions else None,
+        seed=args.seed,
+    )
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("Rapport écrit :", args.output)
@@ -0,0 +1,137 @@
+# cache.py
+
+import functools
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+def get_dataset_version(path: str) -> str:
+    """
+    Calcule une "version" du jeu de données à partir des métadonnées du fichier.
+
+    On n'ouvre pas le fichier : la taille et la date de modification (en nanosecondes)
+    suffisent à détecter une nouvelle publication du pipeline, pour le coût d'un simple os.stat.
+
+    Paramètres
+    ----------
+    path : str
+        Chemin vers le fichier de données (ex. 'uber_data_final.csv').
+
+    Retour
+    ------
+    str
+        Identifiant de version sous la forme '<mtime_ns>-<taille>',
+        ou 'missing' si le fichier n'existe pas.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return "missing"
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+class KPICache:
+    """
+    Cache mémoire des résultats KPI, borné en taille avec éviction LRU.
+
+    Chaque entrée est indexée par (version du dataset, nom du KPI, paramètres).
+    Dès que la version change (le pipeline a republié le fichier), toutes les
+    entrées sont purgées : on ne sert jamais un résultat calculé sur d'anciennes données.
+
+    Paramètres
+    ----------
+    version_fn : Callable[[], str]
+        Fonction renvoyant la version courante du dataset (ex. get_dataset_version).
+    maxsize : int
+        Nombre maximal d'entrées conservées (par défaut 256).
+    """
+
+    def __init__(self, version_fn: Callable[[], str], maxsize: int = 256):
+        if maxsize <= 0:
+            raise ValueError("maxsize doit être strictement positif.")
+        self.version_fn = version_fn
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._version: Optional[str] = None
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self) -> str:
+        """
+        Compare la version courante à celle des entrées et purge le cache si elle a changé.
+        Doit être appelée avec le verrou acquis.
+        """
+        version = self.version_fn()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+        return version
+
+    def get_or_compute(self, name: str, params: dict, compute: Callable[[], Any]) -> Any:
+        """
+        Renvoie le résultat en cache pour (name, params), ou le calcule puis le stocke.
+
+        Le calcul se fait hors verrou : deux requêtes simultanées peuvent calculer
+        la même entrée, mais aucune ne bloque les autres endpoints pendant un groupby.
+        """
+        with self._lock:
+            version = self._check_version()
+            # Les paramètres multi-valués (listes) sont convertis en tuples pour être hashables
+            key = (version, name, tuple(sorted(
+                (k, tuple(v) if isinstance(v, list) else v) for k, v in params.items()
+            )))
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            # On ne stocke pas un résultat si le dataset a changé pendant le calcul
+            if self._check_version() == version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def cached(self, func: Callable) -> Callable:
+        """
+        Décorateur pour les endpoints FastAPI : le nom de la fonction et ses
+        paramètres nommés (freq, top_n, sentiment, ...) forment la clé du cache.
+
+        functools.wraps conserve la signature, FastAPI continue donc à
+        détecter les paramètres de requête de l'endpoint décoré.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.get_or_compute(func.__name__, kwargs, lambda: func(*args, **kwargs))
+        return wrapper
+
+    def clear(self) -> None:
+        """
+        Vide le cache et remet les statistiques à zéro.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Retourne les statistiques du cache (taille, hits, misses, version courante).
+        """
+        with self._lock:
+            return {
+                "version": self._version,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,667 @@
+# dataset.py
+
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from kpi_function.cache import get_dataset_version
+from kpi_function.filters import FrameIndex
+from kpi_function.heavy_hitters import TopUsersSketch
+from kpi_function.live import KPIAccumulators
+from kpi_function.rollup import HourlyRollup
+from kpi_function.serving import build_serving_frame
+from pipeline.storage import rows_contained_in
+
+
+# Colonnes attendues dans le fichier publié par le pipeline
+REQUIRED_COLUMNS = [
+    'userName', 'content', 'score', 'thumbsUpCount',
+    'reviewCreatedVersion', 'at', 'combined_score', 'sentiment',
+]
+NUMERIC_COLUMNS = ['score', 'thumbsUpCount', 'combined_score']
+
+
+def validate_schema(df: pd.DataFrame) -> None:
+    """
+    Vérifie que le jeu de données a le schéma attendu par les KPI.
+    Lève ValueError (avec la liste des problèmes) sinon.
+    """
+    problems = [f"colonne manquante : '{col}'" for col in REQUIRED_COLUMNS if col not in df.columns]
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col].dtype):
+            problems.append(f"colonne '{col}' non numérique ({df[col].dtype})")
+    if 'at' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['at'].dtype):
+        try:
+            pd.to_datetime(df['at'])
+        except (ValueError, TypeError):
+            problems.append("colonne 'at' non convertible en date")
+    if problems:
+        raise ValueError("Schéma invalide : " + " ; ".join(problems))
+
+
+def concat_frames(frames: list) -> pd.DataFrame:
+    """
+    Concatène des DataFrames de même schéma en gardant les types du premier :
+    les colonnes 'category' le restent (pd.concat les repasse en 'object' quand les catégories
+    diffèrent) et les petits entiers (int8, int32) ne sont pas élargis, s'il n'y a pas de manquant
+    et si toutes les valeurs tiennent dans le type.
+    Les colonnes entièrement manquantes (ex. avis ingéré sans 'reviewCreatedVersion') sont
+    d'abord converties au type du premier DataFrame : pd.concat ne les ignore plus en silence.
+    """
+    dtypes = frames[0].dtypes
+    combined = pd.concat([frames[0]] + [_cast_all_na(df, dtypes) for df in frames[1:]], ignore_index=True)
+    for col, dtype in frames[0].dtypes.items():
+        if combined[col].dtype == dtype:
+            continue
+        if isinstance(dtype, pd.CategoricalDtype):
+            combined[col] = combined[col].astype('category')
+        elif pd.api.types.is_integer_dtype(dtype) and not combined[col].isna().any() and _fits(combined[col], dtype):
+            combined[col] = combined[col].astype(dtype)
+    return combined
+
+
+def _cast_all_na(df: pd.DataFrame, dtypes: pd.Series) -> pd.DataFrame:
+    """
+    Convertit les colonnes entièrement manquantes de 'df' au type 'dtypes' correspondant
+    (float64 pour un entier ou booléen NumPy, qui ne peut pas contenir de manquant ; les entiers
+    nullables 'Int8' / 'Int16' gardent leur type).
+    """
+    casts = {}
+    for col, dtype in dtypes.items():
+        if col not in df.columns or df[col].dtype == dtype or df.empty or not df[col].isna().all():
+            continue
+        if isinstance(dtype, np.dtype) and (np.issubdtype(dtype, np.integer) or np.issubdtype(dtype, np.bool_)):
+            casts[col] = 'float64'
+        else:
+            casts[col] = dtype
+    return df.astype(casts) if casts else df
+
+
+def _fits(values: pd.Series, dtype) -> bool:
+    """
+    Les valeurs (entières) tiennent dans le type entier 'dtype' sans débordement.
+    """
+    bounds = np.iinfo(getattr(dtype, 'numpy_dtype', dtype))
+    return values.empty or (bounds.min <= values.min() and values.max() <= bounds.max)
+
+
+def content_marker(texts: pd.Series) -> pd.Series:
+    """
+    Remplace les textes des avis par un marqueur booléen (True si le texte existe, manquant sinon) :
+    les comptes d'avis avec texte (count) restent les mêmes sans garder les chaînes en mémoire.
+    """
+    present = texts.notna()
+    return present.astype('boolean').mask(~present)
+
+
+class LazyContent:
+    """
+    Textes des avis ('content') gardés hors du serving frame et relus à la demande,
+    dans l'ordre des lignes du frame : fichier de données, lignes du journal lues au
+    chargement, puis avis ingérés compactés depuis (gardés en mémoire, 'tail').
+
+    Les textes du fichier ne sont pas gardés après lecture : ils ne servent qu'à construire
+    des structures elles-mêmes mises en cache (index des mots, table SQL). Si le fichier a été
+    republié depuis le chargement du snapshot, ses textes ne correspondent plus au frame :
+    get() lève ValueError (le rechargement en cours fournira un nouveau snapshot).
+
+    Paramètres
+    ----------
+    path : str
+        Chemin du fichier de données.
+    reader : Callable
+        Fonction de lecture acceptant 'columns' (ex. pipeline.storage.read_dataset).
+    version : str
+        Version du fichier lue au chargement du snapshot.
+    base_rows : int
+        Nombre de lignes du frame venant du fichier et du journal.
+    journal_path : str, optionnel
+        Journal des avis ingérés, dont on relit les 'journal_rows' premières lignes.
+    journal_rows : int
+        Nombre de lignes du journal incluses dans le snapshot.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        reader: Callable[..., pd.DataFrame],
+        version: str,
+        base_rows: int,
+        journal_path: Optional[str] = None,
+        journal_rows: int = 0,
+        tail: Optional[pd.Series] = None
+    ):
+        self.path = path
+        self.reader = reader
+        self.version = version
+        self.base_rows = base_rows
+        self.journal_path = journal_path
+        self.journal_rows = journal_rows
+        self.tail = tail if tail is not None else pd.Series([], dtype=object)
+
+    def get(self, start: int = 0) -> pd.Series:
+        """
+        Textes des lignes du frame à partir de 'start' (index remis à partir de 0).
+        Le fichier n'est relu que si des lignes demandées en viennent.
+        """
+        if start >= self.base_rows:
+            return self.tail.iloc[start - self.base_rows:].reset_index(drop=True)
+        parts = [self.reader(self.path, columns=['content'])['content']]
+        if get_dataset_version(self.path) != self.version:
+            raise ValueError("Le fichier de données a été republié : textes des avis indisponibles.")
+        if self.journal_rows:
+            parts.append(self.reader(self.journal_path, columns=['content'])['content'].head(self.journal_rows))
+        parts.append(self.tail)
+        return pd.concat(parts, ignore_index=True).astype(object).iloc[start:].reset_index(drop=True)
+
+    def extend(self, texts: pd.Series) -> "LazyContent":
+        """
+        Nouveau magasin de textes avec des avis ajoutés à la fin (compactage).
+        """
+        tail = pd.concat([self.tail, texts.astype(object)], ignore_index=True)
+        return LazyContent(
+            self.path, self.reader, self.version, self.base_rows, self.journal_path, self.journal_rows, tail
+        )
+
+    def memory_usage(self) -> int:
+        """
+        Octets occupés par les textes gardés en mémoire (avis ingérés compactés).
+        """
+        return int(self.tail.memory_usage(deep=True))
+
+
+class DatasetSnapshot:
+    """
+    Version chargée du jeu de données : serving frame, index de filtrage,
+    cube horaire des séries temporelles et métadonnées.
+
+    Un snapshot n'est jamais modifié après sa création : une requête qui l'a récupéré
+    garde une vue cohérente des données même si un rechargement a lieu pendant son calcul.
+    'ingest_seq' est le numéro du dernier avis ingéré (POST /reviews) inclus dans le frame.
+    'content' (LazyContent) est renseigné quand les textes des avis sont gardés hors du frame :
+    la colonne 'content' du frame ne contient alors qu'un marqueur (voir content_marker).
+    'folded_journal' : positions des lignes du journal lues au chargement qui étaient déjà dans
+    le fichier (ajoutées par le pipeline) et n'ont pas été reprises ; DatasetStore les retire du journal.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        version: str,
+        frame: pd.DataFrame,
+        last_modified: Optional[float],
+        ingest_seq: int = 0,
+        journal_rows: int = 0,
+        content: Optional[LazyContent] = None,
+        folded_journal: Optional[np.ndarray] = None
+    ):
+        self.path = path
+        self.version = version
+        self.frame = frame
+        self.index = FrameIndex(frame)
+        self.rollup = HourlyRollup(frame)
+        self.last_modified = last_modified
+        self.ingest_seq = ingest_seq
+        self.journal_rows = journal_rows
+        self.content = content
+        self.folded_journal = folded_journal if folded_journal is not None else np.empty(0, dtype=np.int64)
+        self.loaded_at = time.time()
+
+    @property
+    def source_tag(self) -> str:
+        """
+        Identifiant des lignes chargées : version du fichier et lignes du journal lues au chargement.
+        Les avis compactés ensuite ne font que s'ajouter à la suite (même source_tag).
+        """
+        return f"{self.version}+j{self.journal_rows}" if self.journal_rows else self.version
+
+    @property
+    def tag(self) -> str:
+        """
+        Identifiant du contenu du frame : version du fichier, plus les lignes du journal lues
+        au chargement et les avis ingérés compactés depuis.
+        """
+        return f"{self.source_tag}+{self.ingest_seq}" if self.ingest_seq else self.source_tag
+
+    @property
+    def rows(self) -> int:
+        return len(self.frame)
+
+    def text_frame(self, start: int = 0, columns: Optional[list] = None) -> pd.DataFrame:
+        """
+        Lignes du frame à partir de 'start', avec les vrais textes des avis dans 'content'
+        (relus si besoin). 'columns' limite la copie aux colonnes utiles quand les textes sont
+        hors du frame ; sinon le frame est renvoyé tel quel (sans copie si start vaut 0).
+        Lève ValueError si les textes ne peuvent plus être relus (fichier republié).
+        """
+        rows = self.frame.iloc[start:] if start else self.frame
+        if self.content is None:
+            return rows
+        if columns is not None:
+            rows = rows[[col for col in columns if col in rows.columns]]
+        return rows.assign(content=self.content.get(start).to_numpy())
+
+    def iter_text_frames(self, start: int = 0, columns: Optional[list] = None):
+        """
+        Lignes à partir de 'start' par morceaux : (position du morceau, lignes avec les vrais textes).
+        Le frame est déjà en mémoire : un seul morceau.
+        """
+        if start < self.rows:
+            yield start, self.text_frame(start, columns)
+
+    def text_rows(self, start: Optional[str] = None, end: Optional[str] = None, columns: Optional[list] = None) -> pd.DataFrame:
+        """
+        Lignes de la période (bornes comme FrameIndex.select) avec les vrais textes des avis.
+        Lève ValueError si une date est invalide ou si les textes ne peuvent plus être relus.
+        """
+        positions = self.index.positions(start, end)
+        rows = self.frame if positions is None else self.frame.take(positions)
+        if self.content is None:
+            return rows
+        if columns is not None:
+            rows = rows[[col for col in columns if col in rows.columns]]
+        texts = self.content.get().to_numpy()
+        return rows.assign(content=texts if positions is None else texts[positions])
+
+    def memory_report(self) -> dict:
+        """
+        Mémoire occupée par le snapshot : octets et type de chaque colonne du frame,
+        index de filtrage, cube horaire et textes gardés hors du frame.
+        """
+        usage = self.frame.memory_usage(deep=True)
+        columns = {
+            col: {"dtype": str(self.frame[col].dtype), "bytes": int(usage[col])}
+            for col in self.frame.columns
+        }
+        report = {
+            "rows": len(self.frame),
+            "frame_bytes": int(usage.sum()),
+            "columns": columns,
+            "index_bytes": self.index.nbytes,
+            "rollup_bytes": self.rollup.nbytes,
+            "content": {
+                "lazy": self.content is not None,
+                "bytes": self.content.memory_usage() if self.content is not None else columns["content"]["bytes"],
+            },
+        }
+        return report
+
+
+def load_snapshot(
+    path: str,
+    reader: Callable[[str], pd.DataFrame],
+    journal_path: Optional[str] = None,
+    journal_rows: Optional[int] = None,
+    ingest_seq: int = 0,
+    lazy_content: bool = False,
+    float_tolerance: float = 0.0
+) -> DatasetSnapshot:
+    """
+    Charge le fichier, valide son schéma puis construit le serving frame, son index et le cube horaire.
+
+    La version est lue avant la lecture : si le fichier est republié pendant le chargement,
+    la version suivante sera différente et déclenchera un nouveau rechargement.
+
+    Les avis ingérés par l'API et sauvegardés dans le journal ('journal_path') sont ajoutés
+    à la suite du fichier ; 'journal_rows' limite la lecture aux lignes déjà comptées
+    (un ajout en cours pendant la lecture appartient à l'ingestion suivante). Les avis du journal
+    déjà présents dans le fichier (republié par le pipeline, voir fold_ingest_journal) ne sont
+    pas repris : leurs positions sont gardées dans 'folded_journal' du snapshot.
+
+    Avec 'lazy_content', les textes des avis ne restent pas dans le frame : ils seront relus
+    à la demande (index des mots, backend SQL). 'float_tolerance' : voir build_serving_frame.
+    """
+    version = get_dataset_version(path)
+    try:
+        last_modified = os.stat(path).st_mtime
+    except FileNotFoundError:
+        last_modified = None
+    raw = reader(path)
+    validate_schema(raw)
+
+    n_journal = 0
+    folded = None
+    if journal_path and os.path.exists(journal_path) and journal_rows != 0:
+        journal = reader(journal_path)
+        if journal_rows is not None:
+            journal = journal.head(journal_rows)
+        validate_schema(journal)
+        contained = rows_contained_in(journal, raw)
+        folded = np.flatnonzero(contained)
+        journal = journal[~contained]
+        n_journal = len(journal)
+        raw = concat_frames([raw, journal[raw.columns.intersection(journal.columns)]])
+    frame = build_serving_frame(raw, float_tolerance)
+    del raw
+    content = None
+    if lazy_content:
+        content = LazyContent(path, reader, version, len(frame), journal_path, n_journal)
+        frame['content'] = content_marker(frame['content'])
+    return DatasetSnapshot(path, version, frame, last_modified, ingest_seq, n_journal, content, folded)
+
+
+class DatasetStore:
+    """
+    Détient le snapshot servi par l'API et le remplace à chaud quand le fichier change.
+
+    Le nouveau jeu de données est chargé et validé en arrière-plan, puis échangé par une
+    simple affectation (atomique) : les requêtes en cours terminent sur l'ancien snapshot,
+    les suivantes voient le nouveau. En cas d'erreur (fichier absent, schéma invalide),
+    l'ancien snapshot reste servi et l'erreur est exposée dans status().
+
+    Ingestion (ingest) : les avis reçus par l'API sont ajoutés au journal (si configuré),
+    comptés dans les accumulateurs des KPI (O(1) par avis, visibles immédiatement) et gardés
+    en attente. Un compactage en arrière-plan, au plus toutes les 'compact_interval' secondes,
+    les ajoute au serving frame (index et cube reconstruits) pour les KPI filtrés et les séries
+    temporelles. Les accumulateurs décrivent toujours le frame courant plus les avis en attente,
+    de même que les résumés des auteurs d'avis (top_users, si 'top_users_capacity').
+
+    Le journal ne grossit pas indéfiniment : le pipeline ajoute ses avis au jeu publié
+    (voir fold_ingest_journal) et, au rechargement du fichier republié, les avis qu'il
+    contient désormais sont retirés du journal (réécrit de façon atomique).
+
+    Paramètres
+    ----------
+    path : str
+        Chemin du fichier de données.
+    reader : Callable[[str], pd.DataFrame]
+        Fonction de lecture (ex. pipeline.storage.read_dataset).
+    journal_path : str, optionnel
+        Fichier où sont ajoutés les avis ingérés (relu au chargement, en plus du fichier de données).
+    writer : Callable[[pd.DataFrame, str], Any], optionnel
+        Fonction d'ajout au journal (ex. pipeline.storage.append_dataset).
+    compact_interval : float
+        Délai (secondes) avant d'ajouter les avis en attente au serving frame.
+    lazy_content : bool
+        Garder les textes des avis hors du serving frame (relus à la demande, voir LazyContent).
+    float_tolerance : float
+        Écart relatif accepté pour stocker les flottants du frame en float32 (0 : conversion exacte).
+    top_users_capacity : int
+        Nombre de compteurs des résumés Space-Saving des auteurs d'avis (voir TopUsersSketch),
+        tenus à jour à chaque ingestion. 0 : pas de résumés.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        reader: Callable[[str], pd.DataFrame],
+        journal_path: Optional[str] = None,
+        writer: Optional[Callable[[pd.DataFrame, str], object]] = None,
+        compact_interval: float = 5.0,
+        lazy_content: bool = False,
+        float_tolerance: float = 0.0,
+        top_users_capacity: int = 0
+    ):
+        self.path = path
+        self.reader = reader
+        self.journal_path = journal_path if writer is not None else None
+        self.writer = writer
+        self.compact_interval = compact_interval
+        self.lazy_content = lazy_content
+        self.float_tolerance = float_tolerance
+        self.top_users_capacity = top_users_capacity
+        self.current: Optional[DatasetSnapshot] = None
+        self.last_error: Optional[str] = None
+        self.reload_count = 0
+        self._reload_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        # Ingestion : numéro du dernier avis ingéré, lots en attente (numéro du dernier avis, lignes),
+        # accumulateurs et résumés des auteurs (construits à chaque rechargement, frame plus avis en attente)
+        # et lignes du journal
+        self.sequence = 0
+        self.pending = []
+        self.accumulators: Optional[KPIAccumulators] = None
+        self.top_users: Optional[TopUsersSketch] = None
+        self.journal_rows = 0
+        self.journal_folded = 0
+        self.last_ingest_at: Optional[float] = None
+        self._ingest_lock = threading.Lock()
+        self._compact_thread: Optional[threading.Thread] = None
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Recharge le jeu de données dans le thread courant si sa version a changé
+        (ou toujours si 'force'). Retourne True si le snapshot a été remplacé.
+        Lève l'erreur de chargement s'il n'y a encore aucun snapshot à servir.
+        """
+        with self._reload_lock:
+            if not force and self.current is not None and get_dataset_version(self.path) == self.current.version:
+                return False
+            with self._ingest_lock:
+                sequence = self.sequence
+                journal_rows = self.journal_rows if self.current is not None else None
+            try:
+                snapshot = load_snapshot(
+                    self.path, self.reader, self.journal_path, journal_rows, sequence,
+                    self.lazy_content, self.float_tolerance
+                )
+            except (OSError, ValueError) as exc:
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                if self.current is None:
+                    raise
+                return False
+            # Accumulateurs et résumés du nouveau frame construits hors du verrou : un passage sur tout
+            # le frame qui ne doit pas bloquer les ingestions (POST /reviews, worker de sentiment)
+            accumulators = KPIAccumulators(snapshot.frame)
+            top_users = TopUsersSketch(snapshot.frame, self.top_users_capacity) if self.top_users_capacity else None
+            with self._ingest_lock:
+                try:
+                    self._truncate_journal(snapshot.folded_journal)
+                except (OSError, ValueError) as exc:
+                    # Journal non réécrit : ses lignes ne correspondent plus au snapshot, on ne le publie pas
+                    self.last_error = f"{type(exc).__name__}: {exc}"
+                    if self.current is None:
+                        raise
+                    return False
+                # Les avis ingérés pendant le chargement restent en attente, rejoués dans les accumulateurs
+                self.pending = [batch for batch in self.pending if batch[0] > sequence]
+                for _, rows in self.pending:
+                    for review in rows.to_dict('records'):
+                        accumulators.add(review)
+                    if top_users is not None:
+                        top_users.add(rows)
+                self.accumulators = accumulators
+                self.top_users = top_users
+                if self.current is None:
+                    self.journal_rows = snapshot.journal_rows
+                else:
+                    self.journal_rows -= len(snapshot.folded_journal)
+                self.current = snapshot
+            self.last_error = None
+            self.reload_count += 1
+            return True
+
+    def _truncate_journal(self, folded: np.ndarray) -> None:
+        """
+        Retire du journal les lignes (positions) déjà présentes dans le fichier publié.
+        Le journal est réécrit dans un fichier temporaire puis remplacé (os.replace).
+        Appelé sous _ingest_lock : aucun avis n'y est ajouté pendant la réécriture.
+        """
+        if not len(folded):
+            return
+        journal = self.reader(self.journal_path)
+        kept = journal.drop(index=journal.index[folded])
+        if kept.empty:
+            os.remove(self.journal_path)
+        else:
+            root, ext = os.path.splitext(self.journal_path)
+            tmp_path = f"{root}.rewrite{ext}"
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self.writer(kept, tmp_path)
+            os.replace(tmp_path, self.journal_path)
+        self.journal_folded += len(folded)
+
+    def ingest(self, reviews: pd.DataFrame) -> int:
+        """
+        Ajoute des avis (colonnes du jeu final) : journal, accumulateurs des KPI et résumés
+        des auteurs, puis compactage différé dans le serving frame. Retourne le numéro du dernier avis ingéré.
+        Lève ValueError si le schéma est invalide.
+        """
+        validate_schema(reviews)
+        reviews = reviews[REQUIRED_COLUMNS].reset_index(drop=True)
+        reviews = reviews.assign(at=pd.to_datetime(reviews['at']))
+        with self._ingest_lock:
+            if self.journal_path:
+                self.writer(reviews.copy(), self.journal_path)
+                self.journal_rows += len(reviews)
+            for review in reviews.to_dict('records'):
+                self.accumulators.add(review)
+                if self.top_users is not None:
+                    self.top_users.update(review['userName'], review['sentiment'], review['at'])
+            self.sequence += len(reviews)
+            self.last_ingest_at = time.time()
+            self.pending.append((self.sequence, reviews))
+            self._schedule_compaction()
+            return self.sequence
+
+    def live_view(self) -> tuple:
+        """
+        Vue cohérente pour les lectures : (snapshot, avis en attente ou None, accumulateurs ou None).
+        Les accumulateurs ne sont renvoyés que s'il y a des avis en attente : sinon le snapshot
+        contient déjà tout et les KPI se calculent sur son frame.
+        """
+        with self._ingest_lock:
+            if not self.pending:
+                return self.current, None, None
+            pending = pd.concat([rows for _, rows in self.pending], ignore_index=True)
+            return self.current, pending, self.accumulators
+
+    def live_accumulators(self) -> Optional[KPIAccumulators]:
+        """
+        Accumulateurs des KPI s'il y a des avis en attente de compactage, sinon None
+        (le frame du snapshot contient alors tous les avis).
+        """
+        with self._ingest_lock:
+            return self.accumulators if self.pending else None
+
+    def version(self) -> str:
+        """
+        Version des données servies : contenu du snapshot et nombre d'avis ingérés.
+        Change à chaque ingestion (caches et ETags suivent les avis visibles immédiatement).
+        """
+        snapshot = self.current
+        if self.sequence == snapshot.ingest_seq:
+            return snapshot.tag
+        return f"{snapshot.tag}/{self.sequence}"
+
+    def last_modified(self) -> Optional[float]:
+        """
+        Date de dernière modification des données servies (Last-Modified) : celle du fichier,
+        ou celle du dernier avis ingéré si elle est plus récente.
+        """
+        file_modified = self.current.last_modified
+        if self.last_ingest_at is None:
+            return file_modified
+        return max(file_modified or 0.0, self.last_ingest_at)
+
+    def compact(self) -> bool:
+        """
+        Ajoute les avis en attente au serving frame (nouveau snapshot : index et cube reconstruits).
+        Accumulateurs et résumés des auteurs comptent déjà ces avis : ils sont gardés tels quels.
+        Retourne True si le snapshot a été remplacé.
+        """
+        with self._reload_lock:
+            with self._ingest_lock:
+                batches = list(self.pending)
+                snapshot = self.current
+            if not batches:
+                return False
+            rows = pd.concat([batch_rows for _, batch_rows in batches], ignore_index=True)
+            new_rows = build_serving_frame(rows, self.float_tolerance)[snapshot.frame.columns]
+            content = None
+            if snapshot.content is not None:
+                content = snapshot.content.extend(new_rows['content'])
+                new_rows['content'] = content_marker(new_rows['content'])
+            frame = concat_frames([snapshot.frame, new_rows])
+            compacted = DatasetSnapshot(
+                snapshot.path, snapshot.version, frame, snapshot.last_modified,
+                ingest_seq=batches[-1][0], journal_rows=snapshot.journal_rows, content=content
+            )
+            with self._ingest_lock:
+                self.pending = [batch for batch in self.pending if batch[0] > compacted.ingest_seq]
+                self.current = compacted
+            return True
+
+    def _schedule_compaction(self) -> None:
+        """
+        Lance un compactage différé de 'compact_interval' secondes, sauf s'il y en a déjà un de prévu :
+        une rafale d'ingestions est ajoutée au frame en une seule fois. Appelé sous _ingest_lock.
+        """
+        if self._compact_thread is not None:
+            return
+
+        def compact_later():
+            while True:
+                self._stop.wait(self.compact_interval)
+                self.compact()
+                # On recommence tant que des avis sont arrivés pendant le compactage
+                with self._ingest_lock:
+                    if not self.pending:
+                        self._compact_thread = None
+                        return
+
+        self._compact_thread = threading.Thread(target=compact_later, name="dataset-compaction", daemon=True)
+        self._compact_thread.start()
+
+    def reload_in_background(self, force: bool = False) -> bool:
+        """
+        Lance un rechargement dans un thread. Retourne False si un rechargement est déjà en cours.
+        """
+        if self._reload_thread is not None and self._reload_thread.is_alive():
+            return False
+        self._reload_thread = threading.Thread(target=self.reload, kwargs={"force": force}, daemon=True)
+        self._reload_thread.start()
+        return True
+
+    def start_watcher(self, interval: float) -> None:
+        """
+        Surveille le fichier toutes les 'interval' secondes (un simple os.stat)
+        et recharge le jeu de données quand sa version change.
+        """
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def watch():
+            while not self._stop.wait(interval):
+                self.reload()
+
+        self._watcher = threading.Thread(target=watch, name="dataset-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        """
+        Arrête la surveillance du fichier.
+        """
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+        self._stop.clear()
+
+    def status(self) -> dict:
+        """
+        État du jeu de données servi (version, taille, date de chargement, dernière erreur).
+        """
+        snapshot = self.current
+        return {
+            "path": self.path,
+            "version": snapshot.version if snapshot else None,
+            "rows": snapshot.rows if snapshot else 0,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "reloading": self._reload_thread is not None and self._reload_thread.is_alive(),
+            "reload_count": self.reload_count,
+            "last_error": self.last_error,
+            "ingested_reviews": self.sequence,
+            "pending_reviews": sum(len(rows) for _, rows in self.pending),
+            "journal_path": self.journal_path,
+            "journal_rows": self.journal_rows,
+            "journal_folded_rows": self.journal_folded,
+        }
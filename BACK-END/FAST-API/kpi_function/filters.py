@@ -0,0 +1,224 @@
+# filters.py
+
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+DAY_NS = 24 * 3600 * 10**9
+
+
+def parse_bounds(start: Optional[str], end: Optional[str]) -> tuple:
+    """
+    Convertit les bornes 'start' / 'end' (incluses) en intervalle [début, fin[ en nanosecondes.
+
+    La précision de la date fixe l'étendue de la borne : 'end=2024-11' inclut tout le mois
+    de novembre, 'end=2024-11-30' toute la journée du 30. Lève ValueError si une date est invalide.
+
+    Retour
+    ------
+    tuple
+        (début : int ou None, fin exclusive : int ou None)
+    """
+    lower = pd.Period(start).start_time.value if start else None
+    upper = pd.Period(end).end_time.value + 1 if end else None
+    return lower, upper
+
+
+def matching_keys(keys: Iterable[str], values: Iterable[str]) -> list:
+    """
+    Clés qui correspondent aux valeurs demandées, dans l'ordre des valeurs.
+
+    Une valeur se terminant par '.x' ou '*' sélectionne toutes les clés qui commencent
+    par le même préfixe (ex. '4.556.x' pour toutes les versions 4.556) ; les autres
+    valeurs sélectionnent la clé identique si elle existe.
+    """
+    keys = list(keys)
+    known = set(keys)
+    matched = []
+    for value in values:
+        if value.endswith('.x') or value.endswith('*'):
+            prefix = value[:-1]
+            matched.extend(key for key in keys if key.startswith(prefix))
+        elif value in known:
+            matched.append(value)
+    return matched
+
+
+class FrameIndex:
+    """
+    Index du serving frame pour filtrer sans parcourir toutes les lignes.
+
+    On stocke :
+    - les positions des lignes triées par 'at' : une plage de dates se résout
+      par recherche dichotomique (np.searchsorted) ;
+    - pour chaque version et chaque sentiment, la liste triée des positions des lignes ;
+    - des cumuls par jour (globaux et par sentiment) : le nombre d'avis entre deux jours
+      est une simple différence de deux cases, en O(1).
+
+    Les positions renvoyées sont toujours dans l'ordre des lignes du DataFrame :
+    les KPI calculés sur un sous-ensemble gardent le même ordre des ex-aequo.
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        DataFrame contenant au moins 'at' (datetime), 'reviewCreatedVersion' et 'sentiment'.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.size = len(df)
+        at = pd.to_datetime(df['at']).to_numpy(dtype='datetime64[ns]').view('int64')
+
+        # Tri stable par date : order[i] est la position de la i-ème ligne la plus ancienne
+        self.order = np.argsort(at, kind='stable')
+        self.sorted_at = at[self.order]
+
+        # Positions des lignes par catégorie (triées, dans l'ordre du DataFrame)
+        self.version_positions = self._positions_by_value(df['reviewCreatedVersion'])
+        self.sentiment_positions = self._positions_by_value(df['sentiment'])
+
+        # Cumuls journaliers : prefix[k] = nombre d'avis avant le jour first_day + k
+        self.first_day = (self.sorted_at[0] // DAY_NS) * DAY_NS if self.size else 0
+        days = (at - self.first_day) // DAY_NS
+        n_days = int(days.max()) + 1 if self.size else 0
+        self.day_prefix = {None: self._prefix_counts(days, n_days)}
+        for sentiment, positions in self.sentiment_positions.items():
+            self.day_prefix[sentiment] = self._prefix_counts(days[positions], n_days)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Octets occupés par les tableaux de l'index.
+        """
+        arrays = [self.order, self.sorted_at]
+        arrays += list(self.version_positions.values()) + list(self.sentiment_positions.values())
+        arrays += list(self.day_prefix.values())
+        return int(sum(array.nbytes for array in arrays))
+
+    @staticmethod
+    def _positions_by_value(series: pd.Series) -> dict:
+        """
+        Positions (triées) des lignes pour chaque valeur présente de la colonne.
+        """
+        groups = series.groupby(series, observed=True, sort=False).indices
+        return {str(value): np.asarray(positions, dtype=np.int64) for value, positions in groups.items()}
+
+    @staticmethod
+    def _prefix_counts(days: np.ndarray, n_days: int) -> np.ndarray:
+        """
+        Cumul du nombre d'avis par jour, avec un 0 en tête.
+        """
+        return np.concatenate(([0], np.cumsum(np.bincount(days, minlength=n_days))))
+
+    def _day_slot(self, bound: int) -> int:
+        """
+        Indice dans les cumuls journaliers d'une borne tombant à minuit, borné à [0, nombre de jours].
+        """
+        n_days = len(self.day_prefix[None]) - 1
+        return int(min(max((bound - self.first_day) // DAY_NS, 0), n_days))
+
+    def _range_positions(self, lower: Optional[int], upper: Optional[int]) -> np.ndarray:
+        """
+        Positions des lignes dont la date est dans [lower, upper[, par recherche dichotomique.
+        """
+        lo = 0 if lower is None else np.searchsorted(self.sorted_at, lower, side='left')
+        hi = self.size if upper is None else np.searchsorted(self.sorted_at, upper, side='left')
+        return np.sort(self.order[lo:hi])
+
+    @staticmethod
+    def _union(index: dict, values: Iterable[str]) -> np.ndarray:
+        """
+        Réunion des positions de plusieurs valeurs d'une catégorie
+        (familles de versions comprises, voir matching_keys).
+        """
+        keys = matching_keys(index, values)
+        if not keys:
+            return np.empty(0, dtype=np.int64)
+        if len(keys) == 1:
+            return index[keys[0]]
+        return np.unique(np.concatenate([index[key] for key in keys]))
+
+    def positions(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        versions: Optional[Iterable[str]] = None,
+        sentiments: Optional[Iterable[str]] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Positions des lignes qui respectent tous les filtres (dans l'ordre du DataFrame),
+        ou None si aucun filtre n'est demandé.
+
+        Paramètres
+        ----------
+        start, end : str, optionnel
+            Bornes de période incluses ('YYYY-MM', 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM', ...).
+        versions : Iterable[str], optionnel
+            Versions de l'application ('4.556.10005', ou '4.556.x' pour une famille).
+        sentiments : Iterable[str], optionnel
+            Sentiments ('positive', 'negative', 'neutral').
+        """
+        selections = []
+        if start or end:
+            selections.append(self._range_positions(*parse_bounds(start, end)))
+        if versions:
+            selections.append(self._union(self.version_positions, versions))
+        if sentiments:
+            selections.append(self._union(self.sentiment_positions, sentiments))
+        if not selections:
+            return None
+
+        # On intersecte en partant de la plus petite sélection
+        selections.sort(key=len)
+        result = selections[0]
+        for other in selections[1:]:
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result
+
+    def count(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        versions: Optional[Iterable[str]] = None,
+        sentiments: Optional[Iterable[str]] = None
+    ) -> int:
+        """
+        Nombre d'avis respectant les filtres.
+
+        Sans filtre de version, avec au plus un sentiment et des bornes à la journée
+        (ou plus larges), le comptage est lu dans les cumuls journaliers en O(1) ;
+        sinon on compte les positions filtrées.
+        """
+        sentiments = list(sentiments) if sentiments else []
+        if not versions and len(sentiments) <= 1:
+            key = sentiments[0] if sentiments else None
+            lower, upper = parse_bounds(start, end)
+            on_days = all(bound is None or (bound - self.first_day) % DAY_NS == 0 for bound in (lower, upper))
+            if on_days:
+                prefix = self.day_prefix.get(key)
+                if prefix is None:
+                    return 0
+                lo = 0 if lower is None else self._day_slot(lower)
+                hi = len(prefix) - 1 if upper is None else self._day_slot(upper)
+                return int(max(prefix[hi] - prefix[lo], 0))
+
+        positions = self.positions(start, end, versions, sentiments)
+        return self.size if positions is None else len(positions)
+
+    def select(
+        self,
+        df: pd.DataFrame,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        versions: Optional[Iterable[str]] = None,
+        sentiments: Optional[Iterable[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Sous-ensemble du DataFrame indexé respectant les filtres
+        (le DataFrame lui-même, sans copie, si aucun filtre n'est demandé).
+        """
+        positions = self.positions(start, end, versions, sentiments)
+        if positions is None:
+            return df
+        return df.take(positions)
@@ -0,0 +1,279 @@
+# heavy_hitters.py
+
+import heapq
+import itertools
+import threading
+from typing import Hashable, Iterable, Optional
+
+import pandas as pd
+
+from kpi_function.filters import parse_bounds
+
+
+DEFAULT_CAPACITY = 1000
+
+
+class SpaceSaving:
+    """
+    Résumé Space-Saving (Metwally et al.) : les éléments les plus fréquents d'un flux
+    en gardant au plus 'capacity' compteurs, quelle que soit la cardinalité du flux.
+
+    Garanties, pour un flux de 'total' éléments :
+    - le compte estimé d'un élément surestime son vrai compte d'au plus errors[élément],
+      lui-même borné par total / capacity ;
+    - tout élément absent du résumé a un vrai compte inférieur ou égal à floor ;
+    - tout élément de vrai compte supérieur à total / capacity est présent dans le résumé.
+
+    Le résumé se met à jour élément par élément (update) et se fusionne avec un autre
+    résumé (merge) en gardant ces garanties : on peut donc le construire par partition
+    (morceau de fichier, mois, ...) puis combiner les partitions.
+
+    Paramètres
+    ----------
+    capacity : int
+        Nombre maximal de compteurs.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("capacity doit être strictement positif.")
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        # Tas (compte, n°, élément) pour trouver le plus petit compteur ; les entrées
+        # périmées (compte qui a changé depuis) sont ignorées au moment du retrait
+        self._heap = []
+        self._seq = itertools.count()
+
+    @classmethod
+    def from_counts(cls, counts: pd.Series, capacity: int = DEFAULT_CAPACITY) -> "SpaceSaving":
+        """
+        Résumé d'une partition comptée exactement (ex. value_counts d'un morceau) :
+        on garde les 'capacity' éléments les plus fréquents, sans erreur.
+        """
+        summary = cls(capacity)
+        counts = counts[counts > 0]
+        summary.total = int(counts.sum())
+        kept = counts.nlargest(capacity, keep='first')
+        summary.counts = {item: int(count) for item, count in kept.items()}
+        summary.errors = dict.fromkeys(summary.counts, 0)
+        summary._rebuild_heap()
+        return summary
+
+    @property
+    def floor(self) -> int:
+        """
+        Borne supérieure du vrai compte de tout élément absent du résumé.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    @property
+    def error_bound(self) -> float:
+        """
+        Erreur maximale garantie sur n'importe quel compte estimé (total / capacity).
+        """
+        return self.total / self.capacity
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [(count, next(self._seq), item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self) -> tuple:
+        """
+        Retire le compteur le plus petit du tas (en sautant les entrées périmées).
+        """
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return item, count
+
+    def update(self, item: Hashable, count: int = 1) -> None:
+        """
+        Ajoute 'count' occurrences d'un élément. Si le résumé est plein et que l'élément
+        n'est pas suivi, il remplace le plus petit compteur et hérite de sa valeur (comme erreur).
+        """
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            victim, floor = self._pop_min()
+            del self.counts[victim]
+            del self.errors[victim]
+            self.counts[item] = floor + count
+            self.errors[item] = floor
+        heapq.heappush(self._heap, (self.counts[item], next(self._seq), item))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def update_many(self, items: Iterable[Hashable]) -> None:
+        """
+        Ajoute une occurrence de chaque élément (dans l'ordre).
+        """
+        for item in items:
+            self.update(item)
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """
+        Fusionne deux résumés en un nouveau résumé (de la capacité de self).
+
+        Un élément absent d'un des résumés y compte pour son 'floor' (vrai compte au plus
+        égal), ajouté au compte et à l'erreur : les garanties restent valables sur l'union des flux.
+        """
+        floor_a, floor_b = self.floor, other.floor
+        merged = SpaceSaving(self.capacity)
+        merged.total = self.total + other.total
+        candidates = {}
+        # Union dans un ordre déterministe (self puis other) : les ex-aequo gardés ne varient pas d'un run à l'autre
+        union = itertools.chain(self.counts, (item for item in other.counts if item not in self.counts))
+        for item in union:
+            count = self.counts.get(item, floor_a) + other.counts.get(item, floor_b)
+            error = self.errors.get(item, floor_a) + other.errors.get(item, floor_b)
+            candidates[item] = (count, error)
+        kept = heapq.nlargest(self.capacity, candidates.items(), key=lambda entry: entry[1][0])
+        merged.counts = {item: count for item, (count, _) in kept}
+        merged.errors = {item: error for item, (_, error) in kept}
+        merged._rebuild_heap()
+        return merged
+
+    def top(self, n: int) -> list:
+        """
+        Les n éléments les plus fréquents : liste de (élément, compte estimé, erreur maximale, garanti).
+
+        'garanti' indique que l'élément fait certainement partie du vrai top n : même avec
+        l'erreur maximale retirée, son compte dépasse celui du (n+1)-ième (ou le floor).
+        """
+        ranked = sorted(self.counts.items(), key=lambda entry: (-entry[1], str(entry[0])))
+        threshold = ranked[n][1] if len(ranked) > n else self.floor
+        return [
+            (item, count, self.errors[item], count - self.errors[item] >= threshold)
+            for item, count in ranked[:n]
+        ]
+
+
+class TopUsersSketch:
+    """
+    Résumés Space-Saving des auteurs d'avis, par cellule (sentiment, mois).
+
+    Les cellules qui respectent les filtres de sentiment et de période sont fusionnées
+    à la demande ; le résumé global est gardé à part. Chaque avis est ajouté au résumé
+    global et à celui de sa cellule (update) : on ne compte jamais tous les utilisateurs
+    du jeu en une fois, et le résumé se tient à jour avis par avis (voir DatasetStore.ingest).
+
+    Paramètres
+    ----------
+    df : pd.DataFrame, optionnel
+        DataFrame contenant au moins 'userName', 'sentiment' et 'at', ajouté à la construction.
+    capacity : int
+        Nombre de compteurs par résumé.
+    """
+
+    def __init__(self, df: Optional[pd.DataFrame] = None, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.cells = {}
+        self.overall = SpaceSaving(capacity)
+        # Les requêtes lisent les résumés pendant que les ingestions les mettent à jour
+        self._lock = threading.Lock()
+        if df is not None:
+            self.add(df)
+
+    def add(self, df: pd.DataFrame) -> None:
+        """
+        Ajoute les avis d'un DataFrame, un par un, dans l'ordre des lignes.
+        """
+        months = df['month'] if 'month' in df.columns else pd.to_datetime(df['at']).dt.to_period('M')
+        with self._lock:
+            for user, sentiment, month in zip(df['userName'], df['sentiment'].astype(str), months):
+                self._update(user, sentiment, month)
+
+    def update(self, user: str, sentiment: str, at) -> None:
+        """
+        Prend en compte un nouvel avis (résumé global et cellule de son mois).
+        """
+        with self._lock:
+            self._update(user, str(sentiment), pd.Period(at, freq='M'))
+
+    def _update(self, user: str, sentiment: str, month: pd.Period) -> None:
+        cell = self.cells.get((sentiment, month))
+        if cell is None:
+            cell = self.cells[(sentiment, month)] = SpaceSaving(self.capacity)
+        cell.update(user)
+        self.overall.update(user)
+
+    @staticmethod
+    def covers(start: Optional[str] = None, end: Optional[str] = None) -> bool:
+        """
+        Indique si les bornes 'start' / 'end' tombent sur des débuts de mois (ex. 'start=2024-03',
+        'end=2024-11' ou 'end=2024-11-30') : seules ces périodes sont des unions de cellules.
+        Retourne False si une date est invalide.
+        """
+        try:
+            bounds = parse_bounds(start, end)
+        except ValueError:
+            return False
+        return all(
+            bound is None or pd.Timestamp(bound).to_period('M').start_time.value == bound
+            for bound in bounds
+        )
+
+    def summary(
+        self,
+        sentiments: Optional[Iterable[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None
+    ) -> SpaceSaving:
+        """
+        Résumé des avis respectant les filtres : fusion des cellules des mois compris entre
+        'start' et 'end'. Lève ValueError si une date est invalide ou ne tombe pas sur
+        un début de mois (voir covers).
+        """
+        if not self.covers(start, end):
+            raise ValueError("Les bornes 'start' / 'end' doivent tomber sur des débuts de mois.")
+        lower, upper = parse_bounds(start, end)
+        sentiments = set(sentiments) if sentiments else None
+        with self._lock:
+            if sentiments is None and lower is None and upper is None:
+                return self.overall.merge(SpaceSaving(self.capacity))
+            merged = SpaceSaving(self.capacity)
+            for (sentiment, month), cell in self.cells.items():
+                if sentiments is not None and sentiment not in sentiments:
+                    continue
+                if lower is not None and month.start_time.value < lower:
+                    continue
+                if upper is not None and (month + 1).start_time.value > upper:
+                    continue
+                merged = merged.merge(cell)
+            return merged
+
+    def top_users(
+        self,
+        top_n: int = 10,
+        sentiments: Optional[Iterable[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        Top des utilisateurs par nombre d'avis (approché).
+        Lève ValueError si une borne est invalide ou ne tombe pas sur un début de mois.
+
+        Retour
+        ------
+        pd.DataFrame
+            DataFrame avec 'userName', 'review_count' (compte estimé, jamais sous-estimé),
+            'max_error' (surestimation maximale) et 'guaranteed' (certainement dans le vrai top).
+        """
+        rows = self.summary(sentiments, start, end).top(top_n)
+        return pd.DataFrame(rows, columns=['userName', 'review_count', 'max_error', 'guaranteed'])
+
+
+def exact_top_users(top_users: pd.DataFrame) -> pd.DataFrame:
+    """
+    Met un top exact (kpi.get_top_users_by_reviews) au format du mode approché :
+    erreur nulle et appartenance au top garantie.
+    """
+    return top_users.assign(max_error=0, guaranteed=True)
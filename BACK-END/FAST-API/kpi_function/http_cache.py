@@ -0,0 +1,117 @@
+# http_cache.py
+
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Iterable, Optional
+
+
+# Par défaut, le navigateur garde la réponse mais la revalide à chaque fois (ETag -> 304)
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+
+def make_etag(version: str, path: str, query_string: str = "") -> str:
+    """
+    Calcule l'ETag d'une réponse à partir de la version du dataset, du chemin et des paramètres.
+
+    La chaîne de requête est prise telle quelle : l'ordre des paramètres répétés
+    (ex. names=a&names=b) peut changer la réponse, il doit donc changer l'ETag.
+    """
+    digest = hashlib.sha1(f"{version}|{path}|{query_string}".encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Indique si l'en-tête If-None-Match contient l'ETag (comparaison faible, comme le veut la RFC 9110 :
+    un préfixe W/ est ignoré). '*' correspond à n'importe quelle réponse.
+    """
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def not_modified_since(if_modified_since: str, last_modified: float) -> bool:
+    """
+    Indique si la ressource n'a pas changé depuis la date If-Modified-Since (précision à la seconde).
+    Une date illisible est ignorée.
+    """
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(last_modified) <= since
+
+
+class ConditionalRequestMiddleware:
+    """
+    Middleware ASGI de requêtes conditionnelles pour les endpoints KPI.
+
+    Chaque réponse GET 200 reçoit un ETag (version du dataset + chemin + paramètres),
+    un Last-Modified (date du fichier de données) et un Cache-Control configurable.
+    Si le client renvoie un ETag connu (If-None-Match), ou à défaut une date
+    If-Modified-Since postérieure au fichier, on répond 304 sans appeler l'endpoint :
+    aucun calcul de KPI pour les tableaux de bord qui interrogent l'API en boucle.
+
+    Paramètres
+    ----------
+    app : ASGI app
+        Application à envelopper.
+    version_fn : Callable[[], str]
+        Version courante du dataset (ex. get_dataset_version).
+    last_modified_fn : Callable[[], float], optionnel
+        Date de modification des données (timestamp), pour Last-Modified / If-Modified-Since.
+    cache_control : str
+        Valeur de l'en-tête Cache-Control (par défaut 'no-cache' : revalidation systématique).
+    exempt_paths : Iterable[str]
+        Chemins dont la réponse ne dépend pas que du dataset (ex. '/cache_stats').
+    """
+
+    def __init__(
+        self,
+        app,
+        version_fn: Callable[[], str],
+        last_modified_fn: Optional[Callable[[], Optional[float]]] = None,
+        cache_control: str = DEFAULT_CACHE_CONTROL,
+        exempt_paths: Iterable[str] = ()
+    ):
+        self.app = app
+        self.version_fn = version_fn
+        self.last_modified_fn = last_modified_fn
+        self.cache_control = cache_control
+        self.exempt_paths = frozenset(exempt_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        etag = make_etag(self.version_fn(), scope["path"], scope.get("query_string", b"").decode("latin-1"))
+        last_modified = self.last_modified_fn() if self.last_modified_fn else None
+
+        headers = [(b"etag", etag.encode("latin-1"))]
+        if self.cache_control:
+            headers.append((b"cache-control", self.cache_control.encode("latin-1")))
+        if last_modified is not None:
+            headers.append((b"last-modified", formatdate(last_modified, usegmt=True).encode("latin-1")))
+
+        request_headers = dict(scope["headers"])
+        if_none_match = request_headers.get(b"if-none-match")
+        if_modified_since = request_headers.get(b"if-modified-since")
+        if if_none_match is not None:
+            not_modified = etag_matches(if_none_match.decode("latin-1"), etag)
+        elif if_modified_since is not None and last_modified is not None:
+            not_modified = not_modified_since(if_modified_since.decode("latin-1"), last_modified)
+        else:
+            not_modified = False
+
+        if not_modified:
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_headers(message):
+            # Les en-têtes de cache ne concernent que les réponses réussies (pas les erreurs 400/404)
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message = {**message, "headers": list(message.get("headers", [])) + headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -4,6 +4,26 @@ import pandas as pd
 from collections import Counter
 import re
 
+def _value_counts_by_appearance(series: pd.Series) -> pd.Series:
+    """
+    Équivalent de series.value_counts() qui se comporte de la même façon
+    pour une colonne 'object' ou 'category' :
+    - seules les valeurs présentes sont comptées (pas de catégories à 0),
+    - les ex-aequo restent dans leur ordre d'apparition (tri stable).
+    """
+    counts = series.groupby(series, observed=True, sort=False).size().rename('count')
+    return counts.sort_values(ascending=False, kind='stable')
+
+def _with_datetime_at(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Retourne un DataFrame dont la colonne 'at' est de type datetime, sans jamais
+    modifier le DataFrame reçu : s'il faut convertir, on travaille sur une copie.
+    Le serving frame (voir serving.build_serving_frame) a déjà le bon type : aucun coût.
+    """
+    if pd.api.types.is_datetime64_any_dtype(df['at']):
+        return df
+    return df.assign(at=pd.to_datetime(df['at']))
+
 def get_total_reviews(df: pd.DataFrame) -> int:
     """
     Retourne le nombre total d'avis dans le DataFrame.
@@ -54,7 +74,7 @@ def get_sentiment_ratio(df: pd.DataFrame) -> dict:
         Dictionnaire avec les proportions des sentiments en pourcentage.
     """
     total = df.shape[0]
-    sentiment_counts = df['sentiment'].value_counts().to_dict()
+    sentiment_counts = _value_counts_by_appearance(df['sentiment']).to_dict()
     sentiment_ratio = {k: round(v / total * 100, 2) for k, v in sentiment_counts.items()}
     return sentiment_ratio
 
@@ -74,8 +94,8 @@ def get_average_score_over_time(df: pd.DataFrame, freq: str = 'ME') -> pd.DataFr
     pd.DataFrame
         DataFrame avec la date et la note moyenne correspondante.
     """
-    # S'assurer que la colonne 'at' est de type datetime
-    df['at'] = pd.to_datetime(df['at'])
+    # S'assurer que la colonne 'at' est de type datetime (sans modifier le DataFrame partagé)
+    df = _with_datetime_at(df)
     
     # Grouper par la fréquence choisie et calculer la moyenne des scores
     average_score = df.resample(freq, on='at')['score'].mean().reset_index()
@@ -97,7 +117,7 @@ def get_reviews_by_version(df: pd.DataFrame) -> pd.DataFrame:
     pd.DataFrame
         DataFrame avec 'reviewCreatedVersion', 'review_count', et 'average_score'.
     """
-    grouped = df.groupby('reviewCreatedVersion').agg(
+    grouped = df.groupby('reviewCreatedVersion', observed=True).agg(
         review_count=pd.NamedAgg(column='content', aggfunc='count'),
         average_score=pd.NamedAgg(column='score', aggfunc='mean')
     ).reset_index()
@@ -187,7 +207,7 @@ def get_average_thumbs_up_per_sentiment(df: pd.DataFrame) -> pd.DataFrame:
     pd.DataFrame
         DataFrame avec 'sentiment' et 'average_thumbs_up'.
     """
-    average_thumbs = df.groupby('sentiment')['thumbsUpCount'].mean().reset_index()
+    average_thumbs = df.groupby('sentiment', observed=True)['thumbsUpCount'].mean().reset_index()
     average_thumbs.rename(columns={'thumbsUpCount': 'average_thumbs_up'}, inplace=True)
     return average_thumbs
 
@@ -205,11 +225,12 @@ def get_review_frequency_by_hour(df: pd.DataFrame) -> pd.DataFrame:
     pd.DataFrame
         DataFrame avec 'hour' et 'review_count'.
     """
-    # Extraire l'heure de la colonne 'at'
-    df['hour'] = pd.to_datetime(df['at']).dt.hour
+    # Heure de l'avis : pré-calculée dans le serving frame, sinon extraite de 'at'
+    # (dans une variable locale, sans ajouter de colonne au DataFrame partagé)
+    hours = df['hour'] if 'hour' in df.columns else pd.to_datetime(df['at']).dt.hour
     
     # Compter le nombre d'avis par heure
-    frequency = df['hour'].value_counts().sort_index().reset_index()
+    frequency = hours.value_counts().sort_index().reset_index()
     frequency.columns = ['hour', 'review_count']
     
     return frequency
@@ -230,7 +251,7 @@ def get_top_users_by_reviews(df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
     pd.DataFrame
         DataFrame avec 'userName' et 'review_count'.
     """
-    top_users = df['userName'].value_counts().head(top_n).reset_index()
+    top_users = _value_counts_by_appearance(df['userName']).head(top_n).reset_index()
     top_users.columns = ['userName', 'review_count']
     return top_users
 
@@ -266,7 +287,7 @@ def get_reviews_per_user(df: pd.DataFrame) -> pd.DataFrame:
     pd.DataFrame
         DataFrame avec 'userName' et 'review_count'.
     """
-    reviews_per_user = df['userName'].value_counts().reset_index()
+    reviews_per_user = _value_counts_by_appearance(df['userName']).reset_index()
     reviews_per_user.columns = ['userName', 'review_count']
     return reviews_per_user
 
@@ -284,7 +305,7 @@ def get_average_score_per_user(df: pd.DataFrame) -> pd.DataFrame:
     pd.DataFrame
         DataFrame avec 'userName' et 'average_score'.
     """
-    average_score = df.groupby('userName')['score'].mean().reset_index()
+    average_score = df.groupby('userName', observed=True)['score'].mean().reset_index()
     average_score.rename(columns={'score': 'average_score'}, inplace=True)
     return average_score
 
@@ -304,11 +325,11 @@ def get_sentiment_trends_by_version(df: pd.DataFrame, freq: str = 'M') -> pd.Dat
     pd.DataFrame
         DataFrame avec 'reviewCreatedVersion', 'at', 'sentiment', et 'count'.
     """
-    # S'assurer que la colonne 'at' est de type datetime
-    df['at'] = pd.to_datetime(df['at'])
+    # S'assurer que la colonne 'at' est de type datetime (sans modifier le DataFrame partagé)
+    df = _with_datetime_at(df)
     
     # Grouper par version, période, et sentiment, puis compter les occurrences
-    grouped = df.groupby(['reviewCreatedVersion', pd.Grouper(key='at', freq=freq), 'sentiment']).size().reset_index(name='count')
+    grouped = df.groupby(['reviewCreatedVersion', pd.Grouper(key='at', freq=freq), 'sentiment'], observed=True).size().reset_index(name='count')
     
     return grouped
 
@@ -332,12 +353,20 @@ def get_monthly_review_count(df: pd.DataFrame) -> pd.DataFrame:
     pd.DataFrame
         DataFrame avec deux colonnes : 'month' et 'review_count'.
     """
-    # Convertir la colonne 'at' en datetime si ce n'est pas déjà fait
-    df['at'] = pd.to_datetime(df['at'])
-
-    # Grouper par mois et compter les avis
-    monthly_reviews = df.resample('M', on='at').size().reset_index(name='review_count')
-    monthly_reviews['month'] = monthly_reviews['at'].dt.strftime('%Y-%m')
-    monthly_reviews = monthly_reviews[['month', 'review_count']]
+    # Mois de l'avis : pré-calculé dans le serving frame, sinon dérivé de 'at'
+    months = df['month'] if 'month' in df.columns else _with_datetime_at(df)['at'].dt.to_period('M')
+
+    # Grouper par mois et compter les avis, en gardant les mois sans avis (à 0)
+    # comme le faisait le resample mensuel
+    counts = months.value_counts()
+    if counts.empty:
+        return pd.DataFrame({'month': pd.Series(dtype=object), 'review_count': pd.Series(dtype='int64')})
+    all_months = pd.period_range(counts.index.min(), counts.index.max(), freq='M')
+    counts = counts.reindex(all_months, fill_value=0)
+
+    monthly_reviews = pd.DataFrame({
+        'month': all_months.strftime('%Y-%m'),
+        'review_count': counts.to_numpy()
+    })
     
     return monthly_reviews
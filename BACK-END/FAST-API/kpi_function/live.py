@@ -0,0 +1,248 @@
+# live.py
+
+import math
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+# KPI tenus à jour avis par avis (mêmes noms que les endpoints de main.py) ;
+# les autres KPI (séries temporelles, mots fréquents) sont calculés sur le serving frame
+LIVE_KPI_NAMES = (
+    'total_reviews',
+    'score_distribution',
+    'sentiment_ratio',
+    'reviews_by_version',
+    'thumbs_up_distribution',
+    'combined_sentiment_average',
+    'average_thumbs_up_per_sentiment',
+    'review_frequency_by_hour',
+    'top_users_by_reviews',
+    'score_thumbs_correlation',
+    'reviews_per_user',
+    'average_score_per_user',
+)
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value)) or value is pd.NaT
+
+
+class RunningCorrelation:
+    """
+    Moments bivariés tenus à jour par la méthode de Welford : moyennes, sommes des carrés
+    des écarts et co-moment. La corrélation de Pearson s'en déduit à tout moment,
+    sans relire les données et sans les erreurs d'arrondi de la formule naïve (sommes de x², y², xy).
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+
+    @classmethod
+    def from_arrays(cls, x: np.ndarray, y: np.ndarray) -> "RunningCorrelation":
+        """
+        Initialise les moments en une passe vectorisée (paires complètes uniquement).
+        """
+        moments = cls()
+        x, y = np.asarray(x, dtype='float64'), np.asarray(y, dtype='float64')
+        complete = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[complete], y[complete]
+        moments.n = len(x)
+        if moments.n:
+            moments.mean_x, moments.mean_y = float(x.mean()), float(y.mean())
+            dx, dy = x - moments.mean_x, y - moments.mean_y
+            moments.m2_x = float(dx @ dx)
+            moments.m2_y = float(dy @ dy)
+            moments.c_xy = float(dx @ dy)
+        return moments
+
+    def add(self, x: float, y: float) -> None:
+        """
+        Ajoute une paire (x, y) en O(1).
+        """
+        self.n += 1
+        dx, dy = x - self.mean_x, y - self.mean_y
+        self.mean_x += dx / self.n
+        self.mean_y += dy / self.n
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c_xy += dx * (y - self.mean_y)
+
+    def correlation(self) -> float:
+        """
+        Coefficient de corrélation de Pearson (NaN s'il n'est pas défini).
+        """
+        denominator = math.sqrt(self.m2_x * self.m2_y)
+        if self.n < 2 or denominator == 0:
+            return float('nan')
+        return self.c_xy / denominator
+
+
+class KPIAccumulators:
+    """
+    État des KPI sans filtre, mis à jour en O(1) à chaque avis ingéré.
+
+    On tient :
+    - le nombre d'avis, l'histogramme des notes, des 'thumbsUpCount' et des heures ;
+    - par sentiment : nombre d'avis et somme des 'thumbsUpCount' ;
+    - par version : nombre d'avis (avec texte), somme et nombre des notes ;
+    - par utilisateur : nombre d'avis, somme et nombre des notes ;
+    - la somme des 'combined_score' et les moments (score, thumbsUpCount) pour la corrélation.
+
+    Les dictionnaires gardent l'ordre d'apparition des valeurs : chaque KPI est reconstruit
+    avec le même résultat (mêmes valeurs, même ordre des ex-aequo) que sa fonction de kpi.py
+    sur l'ensemble des avis. Les lectures et les ajouts sont protégés par un verrou.
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Avis déjà chargés (serving frame), agrégés une fois en passes vectorisées.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._lock = threading.Lock()
+        self.total = len(df)
+        self.score_counts = self._counts(df['score'])
+        self.thumbs_counts = self._counts(df['thumbsUpCount'])
+        hours = df['hour'] if 'hour' in df.columns else pd.to_datetime(df['at']).dt.hour
+        self.hour_counts = self._counts(hours)
+
+        by_sentiment = df.groupby('sentiment', observed=True, sort=False)['thumbsUpCount'].agg(['size', 'sum', 'count'])
+        self.sentiments = {key: [int(size), float(total), int(count)] for key, (size, total, count) in by_sentiment.iterrows()}
+
+        by_version = df.groupby('reviewCreatedVersion', observed=True, sort=False).agg(
+            content=('content', 'count'), score_sum=('score', 'sum'), score_count=('score', 'count')
+        )
+        self.versions = {
+            key: [int(row.content), float(row.score_sum), int(row.score_count)]
+            for key, row in zip(by_version.index, by_version.itertuples())
+        }
+
+        by_user = df.groupby('userName', observed=True, sort=False)['score'].agg(['size', 'sum', 'count'])
+        self.users = {
+            key: [int(size), float(total), int(count)]
+            for key, size, total, count in zip(by_user.index, by_user['size'], by_user['sum'], by_user['count'])
+        }
+
+        combined = df['combined_score']
+        self.combined_sum = float(combined.sum())
+        self.combined_count = int(combined.count())
+        self.moments = RunningCorrelation.from_arrays(df['score'].to_numpy(), df['thumbsUpCount'].to_numpy())
+
+    @staticmethod
+    def _counts(series: pd.Series) -> dict:
+        counts = series.value_counts()
+        return {key: int(count) for key, count in counts.items()}
+
+    def add(self, review: dict) -> None:
+        """
+        Prend en compte un avis (dictionnaire avec les colonnes du jeu final) en O(1).
+        """
+        score, thumbs = review.get('score'), review.get('thumbsUpCount')
+        sentiment, version, user = review.get('sentiment'), review.get('reviewCreatedVersion'), review.get('userName')
+        at, content, combined = review.get('at'), review.get('content'), review.get('combined_score')
+        has_score, has_thumbs = not _is_missing(score), not _is_missing(thumbs)
+
+        with self._lock:
+            self.total += 1
+            if has_score:
+                self.score_counts[score] = self.score_counts.get(score, 0) + 1
+            if has_thumbs:
+                self.thumbs_counts[thumbs] = self.thumbs_counts.get(thumbs, 0) + 1
+            if not _is_missing(at):
+                hour = pd.Timestamp(at).hour
+                self.hour_counts[hour] = self.hour_counts.get(hour, 0) + 1
+            if not _is_missing(sentiment):
+                state = self.sentiments.setdefault(sentiment, [0, 0.0, 0])
+                state[0] += 1
+                if has_thumbs:
+                    state[1] += thumbs
+                    state[2] += 1
+            if not _is_missing(version):
+                state = self.versions.setdefault(version, [0, 0.0, 0])
+                state[0] += 0 if _is_missing(content) else 1
+                if has_score:
+                    state[1] += score
+                    state[2] += 1
+            if not _is_missing(user):
+                state = self.users.setdefault(user, [0, 0.0, 0])
+                state[0] += 1
+                if has_score:
+                    state[1] += score
+                    state[2] += 1
+            if not _is_missing(combined):
+                self.combined_sum += combined
+                self.combined_count += 1
+            if has_score and has_thumbs:
+                self.moments.add(float(score), float(thumbs))
+
+    @staticmethod
+    def _mean(total: float, count: int) -> float:
+        return total / count if count else float('nan')
+
+    def _users_by_count(self) -> list:
+        """
+        Utilisateurs par nombre d'avis décroissant, ex-aequo dans l'ordre d'apparition.
+        """
+        with self._lock:
+            counts = [(user, state[0]) for user, state in self.users.items()]
+        counts.sort(key=lambda item: -item[1])
+        return counts
+
+    def compute(self, name: str, top_n: Optional[int] = 10):
+        """
+        Calcule un KPI sans filtre à partir de l'état courant
+        (résultat identique à la fonction de kpi.py correspondante). Lève ValueError sinon.
+        """
+        if name == 'top_users_by_reviews':
+            ranked = self._users_by_count()
+            return pd.DataFrame(ranked[:top_n], columns=['userName', 'review_count'])
+        if name == 'reviews_per_user':
+            return pd.DataFrame(self._users_by_count(), columns=['userName', 'review_count'])
+
+        with self._lock:
+            if name == 'total_reviews':
+                return self.total
+            if name == 'score_distribution':
+                keys = sorted(self.score_counts)
+                return pd.DataFrame({'score': keys, 'count': [self.score_counts[key] for key in keys]})
+            if name == 'thumbs_up_distribution':
+                keys = sorted(self.thumbs_counts)
+                return pd.DataFrame({'thumbsUpCount': keys, 'count': [self.thumbs_counts[key] for key in keys]})
+            if name == 'review_frequency_by_hour':
+                keys = sorted(self.hour_counts)
+                return pd.DataFrame({'hour': keys, 'review_count': [self.hour_counts[key] for key in keys]})
+            if name == 'sentiment_ratio':
+                ranked = sorted(self.sentiments.items(), key=lambda item: -item[1][0])
+                return {key: round(state[0] / self.total * 100, 2) for key, state in ranked}
+            if name == 'average_thumbs_up_per_sentiment':
+                keys = sorted(self.sentiments)
+                return pd.DataFrame({
+                    'sentiment': keys,
+                    'average_thumbs_up': [self._mean(self.sentiments[key][1], self.sentiments[key][2]) for key in keys]
+                })
+            if name == 'reviews_by_version':
+                keys = sorted(self.versions)
+                return pd.DataFrame({
+                    'reviewCreatedVersion': keys,
+                    'review_count': [self.versions[key][0] for key in keys],
+                    'average_score': [self._mean(self.versions[key][1], self.versions[key][2]) for key in keys]
+                })
+            if name == 'average_score_per_user':
+                keys = sorted(self.users)
+                return pd.DataFrame({
+                    'userName': keys,
+                    'average_score': [self._mean(self.users[key][1], self.users[key][2]) for key in keys]
+                })
+            if name == 'combined_sentiment_average':
+                return self._mean(self.combined_sum, self.combined_count)
+            if name == 'score_thumbs_correlation':
+                return self.moments.correlation()
+        raise ValueError(f"KPI '{name}' non disponible en continu. KPI disponibles : {list(LIVE_KPI_NAMES)}.")
@@ -0,0 +1,41 @@
+# memory.py
+
+import os
+import sys
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows : pas de getrusage, le pic mémoire n'est pas mesuré
+    resource = None
+
+
+def _proc_status_bytes(field: str) -> Optional[int]:
+    """
+    Valeur d'un champ mémoire de /proc/self/status (ex. 'VmRSS'), en octets ; None hors Linux.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def process_memory() -> dict:
+    """
+    Mémoire résidente du processus (worker de l'API) : courante ('rss_bytes') et pic ('peak_rss_bytes').
+    C'est la RSS de chaque worker qui limite le nombre de workers par machine.
+    """
+    peak = _proc_status_bytes("VmHWM")
+    if peak is None and resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss est en octets sous macOS, en kilo-octets ailleurs
+        peak = peak if sys.platform == "darwin" else peak * 1024
+    return {
+        "pid": os.getpid(),
+        "rss_bytes": _proc_status_bytes("VmRSS"),
+        "peak_rss_bytes": peak,
+    }
@@ -0,0 +1,236 @@
+# metrics.py
+
+import bisect
+import threading
+import time
+from typing import Iterable, Optional
+
+from starlette.routing import Match
+
+
+# Bornes des histogrammes (en secondes pour les durées, en octets pour les tailles)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Libellé des requêtes qui ne correspondent à aucune route (évite d'avoir un libellé par URL inconnue)
+UNMATCHED_ROUTE = "<unmatched>"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    """
+    Formate les libellés au format Prometheus : {a="x",b="y"}.
+    """
+    parts = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    """
+    Formate une valeur (entiers sans décimales, '+Inf' pour l'infini).
+    """
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """
+    Base des métriques : nom, aide, noms des libellés et verrou.
+    """
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """
+    Compteur croissant, par combinaison de libellés.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = dict(self._values)
+        return self._header() + [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in sorted(values.items())
+        ]
+
+
+class Gauge(Counter):
+    """
+    Jauge (valeur qui monte et descend), ex. nombre de requêtes en cours.
+    """
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """
+    Histogramme cumulatif au format Prometheus (buckets 'le', somme et nombre d'observations).
+    Les quantiles (p50, p99, ...) se calculent côté Prometheus avec histogram_quantile().
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value: float, *labels) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Un compteur par bucket (non cumulé) + un pour '+Inf', la somme et le nombre
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            snapshot = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        lines = self._header()
+        for labels, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class APIMetrics:
+    """
+    Métriques de l'API, exposées au format texte Prometheus par render().
+
+    - http_requests_total{route, method, status} : nombre de requêtes ;
+    - http_request_duration_seconds{route, method} : latence complète (histogramme) ;
+    - http_requests_in_progress{route, method} : requêtes en cours ;
+    - http_response_size_bytes{route} : taille des réponses (histogramme) ;
+    - kpi_compute_duration_seconds{endpoint} : temps de la fonction de l'endpoint (calcul KPI ou cache) ;
+    - kpi_serialization_duration_seconds{endpoint} : temps de sérialisation JSON.
+
+    Les routes sont libellées par leur modèle ('/reviews_per_user') et non par l'URL
+    complète, pour garder un nombre de séries borné.
+    """
+
+    def __init__(self):
+        self.requests = Counter("http_requests_total", "Nombre de requêtes HTTP.", ("route", "method", "status"))
+        self.latency = Histogram(
+            "http_request_duration_seconds", "Latence des requêtes HTTP (secondes).", ("route", "method")
+        )
+        self.in_progress = Gauge("http_requests_in_progress", "Requêtes HTTP en cours.", ("route", "method"))
+        self.response_size = Histogram(
+            "http_response_size_bytes", "Taille des réponses HTTP (octets).", ("route",), buckets=SIZE_BUCKETS
+        )
+        self.compute = Histogram(
+            "kpi_compute_duration_seconds", "Durée de la fonction KPI de l'endpoint (secondes).", ("endpoint",)
+        )
+        self.serialization = Histogram(
+            "kpi_serialization_duration_seconds", "Durée de la sérialisation JSON (secondes).", ("endpoint",)
+        )
+
+    def observe_endpoint(self, endpoint: str, compute_seconds: float, serialization_seconds: Optional[float]) -> None:
+        """
+        Enregistre le temps de calcul et de sérialisation d'un endpoint (voir serialization.fast_json).
+        """
+        self.compute.observe(compute_seconds, endpoint)
+        if serialization_seconds is not None:
+            self.serialization.observe(serialization_seconds, endpoint)
+
+    def render(self) -> str:
+        """
+        Toutes les métriques au format texte Prometheus.
+        """
+        lines = []
+        for metric in (self.requests, self.latency, self.in_progress, self.response_size, self.compute, self.serialization):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI qui mesure chaque requête HTTP : latence, statut, taille de la réponse
+    et nombre de requêtes en cours, par route.
+
+    Paramètres
+    ----------
+    app : ASGI app
+        Application à envelopper.
+    metrics : APIMetrics
+        Registre des métriques.
+    routes : list
+        Routes de l'application (app.routes), pour retrouver le modèle de route d'une URL.
+    """
+
+    def __init__(self, app, metrics: APIMetrics, routes: list):
+        self.app = app
+        self.metrics = metrics
+        self.routes = routes
+
+    def _route_of(self, scope) -> str:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", UNMATCHED_ROUTE)
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route, method = self._route_of(scope), scope["method"]
+        status = 500
+        size = 0
+
+        async def send_and_measure(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        self.metrics.in_progress.inc(route, method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            self.metrics.latency.observe(time.perf_counter() - start, route, method)
+            self.metrics.in_progress.dec(route, method)
+            self.metrics.requests.inc(route, method, str(status))
+            self.metrics.response_size.observe(size, route)
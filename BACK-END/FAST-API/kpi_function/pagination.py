@@ -0,0 +1,89 @@
+# pagination.py
+
+import base64
+import json
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from kpi_function.serialization import dumps
+
+
+def encode_cursor(offset: int) -> str:
+    """
+    Encode une position dans le résultat en curseur opaque (base64 url-safe).
+    """
+    raw = json.dumps({"offset": offset}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Décode un curseur produit par encode_cursor et retourne la position.
+    Lève ValueError si le curseur est invalide.
+    """
+    try:
+        offset = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))["offset"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Curseur invalide.") from exc
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError("Curseur invalide.")
+    return offset
+
+
+def sort_frame(df: pd.DataFrame, sort_by: Optional[str], order: str = "desc") -> pd.DataFrame:
+    """
+    Trie un résultat KPI sur une colonne (tri stable : les ex-aequo gardent leur ordre).
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Résultat KPI à trier.
+    sort_by : str, optionnel
+        Colonne de tri ; None garde l'ordre d'origine.
+    order : str
+        'asc' ou 'desc'.
+    """
+    if sort_by is None:
+        return df
+    if sort_by not in df.columns:
+        raise ValueError(f"Tri impossible sur '{sort_by}' : colonnes disponibles {list(df.columns)}.")
+    if order not in ("asc", "desc"):
+        raise ValueError("L'ordre doit être 'asc' ou 'desc'.")
+    return df.sort_values(sort_by, ascending=(order == "asc"), kind="stable").reset_index(drop=True)
+
+
+def paginate(df: pd.DataFrame, offset: int = 0, limit: Optional[int] = None) -> tuple:
+    """
+    Découpe une page du résultat.
+
+    Retour
+    ------
+    tuple
+        (page : pd.DataFrame, next_cursor : str ou None s'il n'y a plus de page)
+    """
+    if offset < 0:
+        raise ValueError("offset doit être positif ou nul.")
+    if limit is None:
+        return df.iloc[offset:], None
+    if limit <= 0:
+        raise ValueError("limit doit être strictement positif.")
+    end = offset + limit
+    next_cursor = encode_cursor(end) if end < len(df) else None
+    return df.iloc[offset:end], next_cursor
+
+
+def iter_ndjson(df: pd.DataFrame, batch_size: int = 1000) -> Iterator[bytes]:
+    """
+    Génère le résultat au format NDJSON (un objet JSON par ligne), par paquets de
+    'batch_size' lignes : la réponse part au fil de la sérialisation, sans construire
+    la liste complète de dictionnaires ni le corps JSON entier en mémoire.
+    Les lignes sont sérialisées comme les autres réponses (serialization.dumps) :
+    une valeur manquante est écrite null, jamais NaN.
+    """
+    columns = df.columns.tolist()
+    for start in range(0, len(df), batch_size):
+        batch = df.iloc[start:start + batch_size]
+        batch = batch.astype(object).where(batch.notna(), None)
+        rows = zip(*(batch[col] for col in columns))
+        yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
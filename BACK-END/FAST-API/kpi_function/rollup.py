@@ -0,0 +1,172 @@
+# rollup.py
+
+import re
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Tick
+
+from kpi_function.filters import FrameIndex, parse_bounds
+
+
+HOUR_NS = 3600 * 10**9
+
+# Alias de fréquence dépréciés par pandas 2.2 ('M' -> 'ME', ...), avec multiple et ancrage éventuels
+DEPRECATED_FREQ = re.compile(r'(\d*)(M|Q|Y|A)(-[A-Z]{3})?')
+FREQ_ALIASES = {'M': 'ME', 'Q': 'QE', 'Y': 'YE', 'A': 'YE'}
+
+# Colonnes du cube : clés (heure, version, sentiment) puis agrégats additifs
+ROLLUP_KEYS = ['at', 'reviewCreatedVersion', 'sentiment']
+ROLLUP_MEASURES = ['count', 'score_sum', 'score_count', 'thumbs_sum', 'combined_sum']
+
+
+def build_hourly_rollup(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pré-agrège les avis à la maille (heure, version, sentiment).
+
+    Chaque ligne du cube contient le nombre d'avis et les sommes de 'score', 'thumbsUpCount'
+    et 'combined_score' : ces agrégats sont additifs, on peut donc les regrouper ensuite
+    à n'importe quelle fréquence égale ou plus large que l'heure (jour, semaine, mois, ...).
+    La colonne 'at' contient le début de l'heure. 'score_count' compte les notes renseignées
+    (la moyenne des notes ignore les notes manquantes, comme pandas).
+
+    Les versions et sentiments gardent le type de la colonne d'origine ('category' ou 'object') :
+    les regroupements sur le cube donnent le même ordre que sur les lignes brutes.
+    Les avis sans version sont conservés (ils comptent dans les séries qui ne regroupent pas par version).
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Serving frame (ou DataFrame avec 'at', 'reviewCreatedVersion', 'sentiment', 'score',
+        'thumbsUpCount' et 'combined_score').
+
+    Retour
+    ------
+    pd.DataFrame
+        Cube trié par heure, avec les colonnes ROLLUP_KEYS + ROLLUP_MEASURES.
+    """
+    hours = pd.to_datetime(df['at']).dt.floor('h')
+    grouped = df.groupby(
+        [hours, df['reviewCreatedVersion'], df['sentiment']], observed=True, dropna=False, sort=False
+    ).agg(
+        count=('score', 'size'),
+        score_sum=('score', 'sum'),
+        score_count=('score', 'count'),
+        thumbs_sum=('thumbsUpCount', 'sum'),
+        combined_sum=('combined_score', 'sum'),
+    )
+    rollup = grouped.reset_index()
+    rollup.columns = ROLLUP_KEYS + ROLLUP_MEASURES
+    rollup = rollup[rollup['at'].notna()]
+    return rollup.sort_values('at', kind='stable').reset_index(drop=True)
+
+
+def normalize_freq(freq: str) -> str:
+    """
+    Remplace les alias de fréquence dépréciés par pandas ('M', '3M', 'Q', 'Y', 'A-DEC', ...)
+    par leurs équivalents de fin de période ('ME', '3ME', 'QE', 'YE', 'YE-DEC', ...) :
+    le regroupement est le même, sans FutureWarning à chaque requête.
+    """
+    match = DEPRECATED_FREQ.fullmatch(freq) if isinstance(freq, str) else None
+    if match is None:
+        return freq
+    count, alias, anchor = match.groups()
+    return f"{count}{FREQ_ALIASES[alias]}{anchor or ''}"
+
+
+def is_hour_aligned(freq: str) -> bool:
+    """
+    Indique si une fréquence de regroupement peut être calculée depuis le cube horaire :
+    ses périodes doivent être faites d'heures entières ('h', '3h', 'D', 'W', 'M', ...).
+    Une fréquence plus fine ('15min') ou invalide renvoie False (calcul sur les lignes brutes).
+    """
+    try:
+        offset = to_offset(normalize_freq(freq))
+    except (TypeError, ValueError):
+        return False
+    if isinstance(offset, Tick):
+        return offset.nanos % HOUR_NS == 0
+    return True
+
+
+class HourlyRollup:
+    """
+    Cube horaire (heure x version x sentiment) du serving frame et son index de filtrage.
+
+    Les séries temporelles (note moyenne par période, tendances de sentiment par version,
+    nombre d'avis par mois) se calculent sur le cube : le coût dépend du nombre d'heures
+    couvertes, et non plus du nombre d'avis. Les filtres communs (période, version, sentiment)
+    s'appliquent au cube avec le même FrameIndex que pour les lignes brutes.
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Serving frame du snapshot.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.frame = build_hourly_rollup(df)
+        self.index = FrameIndex(self.frame)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Octets occupés par le cube et son index.
+        """
+        return int(self.frame.memory_usage(deep=True).sum()) + self.index.nbytes
+
+    def select(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        versions: Optional[Iterable[str]] = None,
+        sentiments: Optional[Iterable[str]] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        Lignes du cube respectant les filtres, ou None si les bornes de dates ne tombent pas
+        sur une heure pile (ex. 'YYYY-MM-DD HH:MM') : il faut alors filtrer les lignes brutes.
+        Lève ValueError si une date est invalide.
+        """
+        bounds = parse_bounds(start, end)
+        if any(bound is not None and bound % HOUR_NS for bound in bounds):
+            return None
+        return self.index.select(self.frame, start, end, versions, sentiments)
+
+
+def rollup_average_score_over_time(rollup: pd.DataFrame, freq: str = 'ME') -> pd.DataFrame:
+    """
+    Note moyenne par période, depuis le cube (même résultat que kpi.get_average_score_over_time).
+    Les périodes sans avis sont gardées, avec une moyenne NaN.
+    """
+    sums = rollup.resample(normalize_freq(freq), on='at')[['score_sum', 'score_count']].sum()
+    average = sums['score_sum'] / sums['score_count'].replace(0, np.nan)
+    return pd.DataFrame({'at': sums.index, 'average_score': average.to_numpy(dtype='float64')})
+
+
+def rollup_sentiment_trends_by_version(rollup: pd.DataFrame, freq: str = 'ME') -> pd.DataFrame:
+    """
+    Nombre d'avis par version, période et sentiment, depuis le cube
+    (même résultat que kpi.get_sentiment_trends_by_version).
+    """
+    grouped = rollup.groupby(
+        ['reviewCreatedVersion', pd.Grouper(key='at', freq=normalize_freq(freq)), 'sentiment'], observed=True
+    )['count'].sum()
+    grouped = grouped[grouped > 0]
+    return grouped.astype('int64').reset_index(name='count')
+
+
+def rollup_monthly_review_count(rollup: pd.DataFrame) -> pd.DataFrame:
+    """
+    Nombre d'avis par mois, depuis le cube (même résultat que kpi.get_monthly_review_count).
+    """
+    counts = rollup['count'].groupby(rollup['at'].dt.to_period('M')).sum()
+    if counts.empty:
+        return pd.DataFrame({'month': pd.Series(dtype=object), 'review_count': pd.Series(dtype='int64')})
+    all_months = pd.period_range(counts.index.min(), counts.index.max(), freq='M')
+    counts = counts.reindex(all_months, fill_value=0)
+    return pd.DataFrame({
+        'month': all_months.strftime('%Y-%m'),
+        'review_count': counts.to_numpy(dtype='int64')
+    })
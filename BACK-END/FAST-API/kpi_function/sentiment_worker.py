@@ -0,0 +1,276 @@
+# sentiment_worker.py
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import pandas as pd
+
+from kpi_function.metrics import Counter, Gauge, Histogram, LATENCY_BUCKETS
+
+try:
+    from pipeline.sentiment_note_gen import add_sentiment_columns
+except ImportError:  # TextBlob / emoji non installés : pas de calcul du sentiment dans l'API
+    add_sentiment_columns = None
+
+
+# Bornes de l'histogramme des tailles de lots (nombre d'avis)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class SentimentQueueFull(Exception):
+    """
+    La file du worker est restée pleine pendant tout le délai d'attente (contre-pression).
+    """
+
+
+class SentimentWorkerMetrics:
+    """
+    Métriques du worker de sentiment, au format texte Prometheus (ajoutées à /metrics).
+
+    - sentiment_queue_depth / sentiment_queue_capacity : avis en attente et taille de la file ;
+    - sentiment_reviews_total{status} : avis 'queued', 'rejected' (file pleine), 'scored' ou 'failed' ;
+    - sentiment_batch_size : nombre d'avis par lot (histogramme) ;
+    - sentiment_batch_duration_seconds : calcul du sentiment + publication d'un lot ;
+    - sentiment_review_latency_seconds : délai entre la mise en file et la publication d'un avis.
+    """
+
+    def __init__(self):
+        self.queue_depth = Gauge("sentiment_queue_depth", "Avis en attente dans la file du worker de sentiment.")
+        self.queue_capacity = Gauge("sentiment_queue_capacity", "Taille maximale de la file du worker de sentiment.")
+        self.reviews = Counter("sentiment_reviews_total", "Avis traités par le worker de sentiment.", ("status",))
+        self.batch_size = Histogram(
+            "sentiment_batch_size", "Nombre d'avis par lot du worker de sentiment.", buckets=BATCH_SIZE_BUCKETS
+        )
+        self.batch_duration = Histogram(
+            "sentiment_batch_duration_seconds", "Durée du calcul et de la publication d'un lot (secondes)."
+        )
+        self.review_latency = Histogram(
+            "sentiment_review_latency_seconds", "Délai entre la mise en file et la publication d'un avis (secondes).",
+            buckets=LATENCY_BUCKETS + (30.0, 60.0)
+        )
+
+    def render(self) -> str:
+        lines = []
+        for metric in (
+            self.queue_depth, self.queue_capacity, self.reviews, self.batch_size, self.batch_duration, self.review_latency
+        ):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class SentimentWorker:
+    """
+    Worker asyncio qui calcule le sentiment des avis bruts soumis à l'API, par petits lots,
+    puis publie les avis scorés dans le jeu servi.
+
+    Les avis sont mis dans une file bornée. Le worker prend le premier avis en attente puis
+    complète le lot jusqu'à 'batch_size' avis ou jusqu'à 'max_latency' secondes d'attente :
+    sous charge, les lots sont pleins (TextBlob amorti sur beaucoup d'avis), et un avis isolé
+    n'attend jamais plus de 'max_latency'. Le calcul (demojize + TextBlob + combined_sentiment,
+    via add_sentiment_columns du pipeline) et la publication tournent dans un thread dédié :
+    la boucle asyncio continue de servir les requêtes pendant ce temps.
+
+    Contre-pression : submit() attend au plus 'enqueue_timeout' secondes qu'il y ait de la place
+    pour tous les avis de la requête, puis lève SentimentQueueFull (aucun avis n'est mis en file).
+
+    Paramètres
+    ----------
+    publish : Callable[[pd.DataFrame], object]
+        Reçoit chaque lot scoré (colonnes du jeu final), ex. DatasetStore.ingest.
+    max_queue : int
+        Nombre maximal d'avis en attente.
+    batch_size : int
+        Nombre maximal d'avis par lot.
+    max_latency : float
+        Attente maximale (secondes) pour compléter un lot.
+    enqueue_timeout : float
+        Attente maximale (secondes) d'une place dans la file avant de refuser les avis.
+    alpha : float
+        Poids de la polarité du texte dans 'combined_score' (comme dans le pipeline).
+    positive_threshold, negative_threshold : float
+        Seuils de classification du sentiment (comme dans le pipeline).
+    cache_path : str, optionnel
+        Fichier SQLite du cache de polarités (voir PolarityCache), partagé avec le pipeline.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[pd.DataFrame], object],
+        max_queue: int = 10_000,
+        batch_size: int = 64,
+        max_latency: float = 0.5,
+        enqueue_timeout: float = 1.0,
+        alpha: float = 0.7,
+        positive_threshold: float = 0.1,
+        negative_threshold: float = -0.1,
+        cache_path: Optional[str] = None
+    ):
+        if max_queue <= 0 or batch_size <= 0:
+            raise ValueError("max_queue et batch_size doivent être strictement positifs.")
+        self.publish = publish
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.enqueue_timeout = enqueue_timeout
+        self.alpha = alpha
+        self.positive_threshold = positive_threshold
+        self.negative_threshold = negative_threshold
+        self.cache_path = cache_path
+        self.metrics = SentimentWorkerMetrics()
+        self.metrics.queue_capacity.set(max_queue)
+        self.batches = 0
+        self.last_error: Optional[str] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._space: Optional[asyncio.Condition] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def available(self) -> bool:
+        """
+        Le calcul du sentiment est possible (TextBlob et emoji installés).
+        """
+        return add_sentiment_columns is not None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        """
+        Démarre le worker dans la boucle asyncio courante (au démarrage de l'API).
+        """
+        if self.running or not self.available:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._space = asyncio.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sentiment-worker")
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="sentiment-worker")
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """
+        Arrête le worker après avoir publié les avis en attente (au plus 'drain_timeout' secondes).
+        """
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._executor.shutdown(wait=True)
+        self._task = None
+
+    async def submit(self, rows: list) -> int:
+        """
+        Met des avis bruts en file (tous ou aucun) et retourne la profondeur de la file.
+
+        Lève ValueError si la requête contient plus d'avis que la file ne peut en contenir,
+        RuntimeError si le worker ne tourne pas, SentimentQueueFull si la file reste pleine.
+        """
+        if not self.running:
+            raise RuntimeError("Le worker de sentiment n'est pas démarré.")
+        if len(rows) > self.max_queue:
+            raise ValueError(f"Trop d'avis dans une seule requête (maximum {self.max_queue}).")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.enqueue_timeout
+        async with self._space:
+            while self.max_queue - self._queue.qsize() < len(rows):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    self.metrics.reviews.inc("rejected", amount=len(rows))
+                    raise SentimentQueueFull(
+                        f"File du worker de sentiment pleine ({self._queue.qsize()}/{self.max_queue} avis)."
+                    )
+                try:
+                    await asyncio.wait_for(self._space.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            enqueued_at = time.perf_counter()
+            for row in rows:
+                self._queue.put_nowait((enqueued_at, row))
+        self.metrics.reviews.inc("queued", amount=len(rows))
+        self.metrics.queue_depth.set(self._queue.qsize())
+        return self._queue.qsize()
+
+    async def _next_batch(self) -> list:
+        """
+        Attend un avis puis complète le lot (batch_size avis ou max_latency secondes).
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_latency
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Des places se sont libérées : on réveille les requêtes en attente
+        async with self._space:
+            self._space.notify_all()
+        self.metrics.queue_depth.set(self._queue.qsize())
+        return batch
+
+    def _score_and_publish(self, rows: list) -> None:
+        """
+        Calcule 'combined_score' et 'sentiment' d'un lot puis le publie (thread du worker).
+        """
+        df = add_sentiment_columns(
+            pd.DataFrame(rows), alpha=self.alpha, positive_threshold=self.positive_threshold,
+            negative_threshold=self.negative_threshold, cache_path=self.cache_path
+        )
+        self.publish(df)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            started = time.perf_counter()
+            try:
+                await loop.run_in_executor(self._executor, self._score_and_publish, [row for _, row in batch])
+            except Exception as exc:  # un lot invalide ne doit pas arrêter le worker
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                self.metrics.reviews.inc("failed", amount=len(batch))
+            else:
+                published = time.perf_counter()
+                self.batches += 1
+                self.metrics.reviews.inc("scored", amount=len(batch))
+                self.metrics.batch_size.observe(len(batch))
+                self.metrics.batch_duration.observe(published - started)
+                for enqueued_at, _ in batch:
+                    self.metrics.review_latency.observe(published - enqueued_at)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def status(self) -> dict:
+        """
+        État du worker : réglages, profondeur de la file, nombre de lots et dernière erreur.
+        """
+        return {
+            "available": self.available,
+            "running": self.running,
+            "queue_depth": self.queue_depth(),
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "max_latency": self.max_latency,
+            "enqueue_timeout": self.enqueue_timeout,
+            "batches": self.batches,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,139 @@
+# serialization.py
+
+import datetime
+import functools
+import json
+import time
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur le module json standard
+    orjson = None
+
+
+# Formes de payload acceptées par les endpoints tabulaires
+PAYLOAD_SHAPES = ("records", "columns")
+
+# Fonction appelée après chaque endpoint décoré par fast_json, avec
+# (nom de l'endpoint, durée de la fonction, durée de la sérialisation ou None)
+_timing_hook: Optional[Callable[[str, float, Optional[float]], None]] = None
+
+
+def set_timing_hook(hook: Optional[Callable[[str, float, Optional[float]], None]]) -> None:
+    """
+    Installe la fonction qui reçoit les durées de calcul et de sérialisation
+    des endpoints (ex. APIMetrics.observe_endpoint). None la désactive.
+    """
+    global _timing_hook
+    _timing_hook = hook
+
+
+def _default(obj: Any) -> Any:
+    """
+    Conversion des types NumPy / pandas pour le module json standard (repli sans orjson).
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, pd.Period):
+        return str(obj)
+    raise TypeError(f"Type non sérialisable en JSON : {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Sérialise un payload en JSON (bytes UTF-8).
+
+    Avec orjson, les tableaux NumPy et les dates sont écrits directement,
+    sans passer par des listes Python intermédiaires.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class KPIJSONResponse(JSONResponse):
+    """
+    Réponse JSON rapide pour les KPI (orjson si disponible, sinon json standard).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_json(func: Callable) -> Callable:
+    """
+    Décorateur d'endpoint : renvoie directement une KPIJSONResponse.
+
+    FastAPI ne repasse alors pas le résultat dans jsonable_encoder (qui parcourt chaque
+    dictionnaire en Python) : la sérialisation est faite en une passe par dumps().
+    Les objets Response (ex. StreamingResponse) sont renvoyés tels quels.
+    Les durées de la fonction et de la sérialisation sont transmises au hook de set_timing_hook.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        computed = time.perf_counter()
+        if isinstance(result, Response):
+            response, serialization = result, None
+        else:
+            response = KPIJSONResponse(result)
+            serialization = time.perf_counter() - computed
+        if _timing_hook is not None:
+            _timing_hook(func.__name__, computed - start, serialization)
+        return response
+    return wrapper
+
+
+def frame_to_columns(df: pd.DataFrame) -> dict:
+    """
+    Convertit un DataFrame en payload colonne : {"col": [valeurs...], ...}
+    (forme attendue par ECharts, comme celle de /monthly_reviews).
+
+    Les colonnes numériques et dates restent des tableaux NumPy (sérialisés directement
+    par orjson) ; les autres sont converties en listes Python.
+    """
+    payload = {}
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_extension_array_dtype(values.dtype):
+            payload[col] = values.to_numpy()
+        elif pd.api.types.is_datetime64_any_dtype(values.dtype) and values.notna().all():
+            payload[col] = values.to_numpy()
+        else:
+            payload[col] = values.tolist()
+    return payload
+
+
+def frame_to_payload(df: pd.DataFrame, shape: str = "records") -> Any:
+    """
+    Convertit un résultat KPI tabulaire dans la forme demandée.
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Résultat KPI.
+    shape : str
+        'records' (par défaut) : liste d'objets, une par ligne ;
+        'columns' : un objet avec une liste de valeurs par colonne.
+    """
+    if shape == "columns":
+        return frame_to_columns(df)
+    if shape == "records":
+        return df.to_dict(orient="records")
+    raise ValueError(f"La forme doit être parmi {list(PAYLOAD_SHAPES)}.")
@@ -0,0 +1,121 @@
+# serving.py
+
+import pandas as pd
+
+
+# Colonnes dérivées ajoutées une fois pour toutes au chargement
+DERIVED_COLUMNS = ['hour', 'day', 'iso_week', 'month', 'version_major', 'version_minor', 'version_patch']
+
+# Part maximale de valeurs distinctes pour stocker une colonne texte en 'category' : au-delà
+# (ex. 'userName', presque un utilisateur par avis), le dictionnaire coûte plus cher que les chaînes
+CATEGORY_MAX_RATIO = 0.5
+
+# Colonnes jamais converties (textes libres)
+TEXT_COLUMNS = ['content']
+
+
+def parse_versions(versions: pd.Series) -> pd.DataFrame:
+    """
+    Découpe les versions de l'application ('4.556.10005') en trois entiers
+    (majeure, mineure, patch), pour pouvoir les trier et les comparer numériquement.
+    Les parties absentes ou non numériques valent <NA>.
+    """
+    # Sur une colonne 'category', on ne parse que les catégories puis on ré-indexe par les codes
+    if isinstance(versions.dtype, pd.CategoricalDtype):
+        parsed = parse_versions(pd.Series(versions.cat.categories))
+        codes = versions.cat.codes.to_numpy()
+        result = parsed.iloc[codes].reset_index(drop=True)
+        result.index = versions.index
+        result.loc[codes == -1, :] = pd.NA
+        return result
+
+    parts = versions.astype(str).str.split('.', n=2, expand=True).reindex(columns=[0, 1, 2])
+    result = pd.DataFrame(index=versions.index)
+    for i, name in enumerate(['version_major', 'version_minor', 'version_patch']):
+        result[name] = pd.to_numeric(parts[i], errors='coerce').astype('Int32')
+    return result
+
+
+def compact_dtypes(df: pd.DataFrame, float_tolerance: float = 0.0) -> pd.DataFrame:
+    """
+    Choisit pour chaque colonne le type le plus compact qui garde les mêmes valeurs :
+    - texte : 'category' si au plus CATEGORY_MAX_RATIO des valeurs sont distinctes, 'object' sinon
+      (les KPI donnent le même résultat avec les deux types) ; les colonnes TEXT_COLUMNS ne changent pas ;
+    - entiers (y compris 'Int32' nullable) : le plus petit type qui contient les valeurs (int8, int16, ...) ;
+    - flottants : float32 si chaque valeur est conservée à 'float_tolerance' près (en relatif,
+      au-delà de 1) ; avec la tolérance par défaut (0), seulement si la conversion est exacte.
+
+    Le DataFrame est modifié en place et retourné.
+    """
+    for col in df.columns:
+        values = df[col]
+        if col in TEXT_COLUMNS or values.empty:
+            continue
+        dtype = values.dtype
+        if dtype == object or isinstance(dtype, pd.CategoricalDtype):
+            is_category = isinstance(dtype, pd.CategoricalDtype)
+            labels = values.cat.categories if is_category else values
+            if pd.api.types.infer_dtype(labels, skipna=True) != 'string':
+                continue
+            if values.nunique() <= CATEGORY_MAX_RATIO * len(values):
+                if not is_category:
+                    df[col] = values.astype('category')
+            elif is_category:
+                df[col] = values.astype(object)
+        elif pd.api.types.is_integer_dtype(dtype):
+            df[col] = pd.to_numeric(values, downcast='integer')
+        elif pd.api.types.is_float_dtype(dtype) and dtype != 'float32':
+            narrowed = values.astype('float32')
+            error = (narrowed.astype('float64') - values).abs()
+            if (error.isna() | (error <= float_tolerance * values.abs().clip(lower=1))).all():
+                df[col] = narrowed
+    return df
+
+
+def build_serving_frame(df: pd.DataFrame, float_tolerance: float = 0.0) -> pd.DataFrame:
+    """
+    Construit le "serving frame" de l'API : une copie du jeu de données avec
+    les colonnes dérivées pré-calculées une seule fois au chargement.
+
+    Colonnes ajoutées
+    -----------------
+    - 'hour'  : heure de l'avis (0-23)
+    - 'day'   : date du jour (minuit)
+    - 'iso_week' : semaine ISO (lundi -> dimanche), en Period
+    - 'month' : mois, en Period
+    - 'version_major', 'version_minor', 'version_patch' : version de l'application parsée
+
+    Les fonctions KPI traitent ce DataFrame en lecture seule : FastAPI exécute les
+    endpoints synchrones dans un pool de threads, aucune fonction ne doit donc
+    modifier le DataFrame partagé.
+
+    Les types des colonnes sont ensuite réduits au plus compact (voir compact_dtypes).
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Jeu de données chargé (doit contenir 'at' et 'reviewCreatedVersion').
+    float_tolerance : float
+        Écart relatif accepté pour stocker les flottants en float32 (0 : conversion exacte uniquement).
+
+    Retour
+    ------
+    pd.DataFrame
+        Nouveau DataFrame (le DataFrame d'entrée n'est pas modifié).
+    """
+    frame = df.copy()
+    if not pd.api.types.is_datetime64_any_dtype(frame['at']):
+        frame['at'] = pd.to_datetime(frame['at'])
+
+    at = frame['at'].dt
+    frame['hour'] = at.hour.astype('int8')
+    frame['day'] = at.normalize()
+    # Les périodes 'W-SUN' se terminent le dimanche : elles commencent donc le lundi, comme les semaines ISO
+    frame['iso_week'] = at.to_period('W-SUN')
+    frame['month'] = at.to_period('M')
+
+    versions = parse_versions(frame['reviewCreatedVersion'])
+    for col in versions.columns:
+        frame[col] = versions[col]
+
+    return compact_dtypes(frame, float_tolerance)
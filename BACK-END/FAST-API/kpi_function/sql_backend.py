@@ -0,0 +1,851 @@
+# sql_backend.py
+#
+# Calcul des KPI par requêtes SQL sur une base embarquée (DuckDB ou SQLite) stockée dans un fichier,
+# à la place du serving frame pandas en mémoire. Chaque KPI renvoie exactement le même résultat
+# (mêmes colonnes, même ordre, mêmes ex-aequo) que sa fonction de kpi.py sur les lignes filtrées.
+# Avec ce backend, l'API ne construit pas le serving frame : SQLDatasetStore charge la base
+# directement depuis le fichier publié. La parité avec pandas est vérifiée par tests/test_sql_backend.py.
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from kpi_function import kpi
+from kpi_function.batch import BATCH_KPI_NAMES
+from kpi_function.benchmark import compare_results
+from kpi_function.cache import get_dataset_version
+from kpi_function.dataset import REQUIRED_COLUMNS, DatasetSnapshot, DatasetStore, validate_schema
+from kpi_function.filters import FrameIndex, parse_bounds
+from kpi_function.rollup import (
+    ROLLUP_KEYS,
+    ROLLUP_MEASURES,
+    is_hour_aligned,
+    rollup_average_score_over_time,
+    rollup_monthly_review_count,
+    rollup_sentiment_trends_by_version,
+)
+from pipeline.storage import REVIEW_KEY_COLUMNS, rows_contained_in
+
+try:
+    import duckdb
+except ImportError:  # DuckDB non installé : seul le moteur SQLite est disponible
+    duckdb = None
+
+# Erreurs des moteurs SQL (requête invalide, colonne absente du fichier chargé...)
+SQL_ERRORS = (sqlite3.Error,) + ((duckdb.Error,) if duckdb is not None else ())
+
+
+SQL_ENGINES = ('duckdb', 'sqlite')
+
+# Tous les KPI du lot (/kpis) ont leur requête SQL
+SQL_KPI_NAMES = BATCH_KPI_NAMES
+
+# Colonnes de la table 'reviews' et leur type SQL
+REVIEW_COLUMNS = {
+    'userName': 'VARCHAR',
+    'content': 'VARCHAR',
+    'score': 'INTEGER',
+    'thumbsUpCount': 'INTEGER',
+    'reviewCreatedVersion': 'VARCHAR',
+    'at': 'TIMESTAMP',
+    'combined_score': 'DOUBLE',
+    'sentiment': 'VARCHAR',
+}
+
+# Valeurs lues comme manquantes dans un CSV : les mêmes que pandas.read_csv
+CSV_NULL_STRINGS = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+]
+
+# Format des dates dans SQLite (texte à largeur fixe : l'ordre alphabétique est l'ordre chronologique)
+SQLITE_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+# Nombre de lignes lues à la fois quand le fichier est chargé morceau par morceau (SQLite)
+LOAD_CHUNK_ROWS = 200_000
+
+
+def _quote(name: str) -> str:
+    return f'"{name}"'
+
+
+def _to_sql_frame(df: pd.DataFrame, engine: str) -> pd.DataFrame:
+    """
+    Colonnes de la table 'reviews' extraites d'un DataFrame, prêtes à être insérées :
+    catégories en texte, valeurs manquantes en None et, pour SQLite, dates en texte.
+    """
+    frame = pd.DataFrame(index=df.index)
+    for col in REVIEW_COLUMNS:
+        values = df[col]
+        if col == 'at':
+            values = pd.to_datetime(values)
+            if engine == 'sqlite':
+                values = values.dt.strftime(SQLITE_TIMESTAMP_FORMAT)
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        frame[col] = values
+    return frame.astype(object).where(frame.notna(), None) if engine == 'sqlite' else frame
+
+
+class SQLKPIBackend:
+    """
+    Table 'reviews' dans une base DuckDB ou SQLite (fichier), et requêtes SQL des KPI.
+
+    La table est construite à partir du fichier publié par le pipeline : DuckDB le lit
+    directement (lecture parallèle, vectorisée, sans passer par pandas ni tout charger en mémoire),
+    SQLite le reçoit par morceaux. Le fichier est chargé dans une table à part, échangée
+    avec 'reviews' en une transaction : les requêtes en cours ne voient jamais une table partielle.
+    Les avis du journal et les avis ingérés sont insérés à la suite (voir SQLDatasetStore).
+    La version du fichier chargé et le nombre de lignes du journal ajoutées sont enregistrés
+    dans la base : au redémarrage, la table est réutilisée telle quelle si rien n'a changé.
+
+    Les filtres communs (période, versions, sentiments) deviennent une clause WHERE.
+    Les ex-aequo sont départagés par l'ordre d'insertion (rowid) : même ordre que les lignes
+    du DataFrame. Les séries temporelles sont agrégées à l'heure en SQL, puis regroupées
+    à la fréquence demandée avec les fonctions du cube horaire (voir rollup.py).
+
+    Paramètres
+    ----------
+    engine : str
+        'duckdb' ou 'sqlite'.
+    path : str
+        Fichier de la base (créé s'il n'existe pas).
+    """
+
+    def __init__(self, engine: str, path: str):
+        if engine not in SQL_ENGINES:
+            raise ValueError(f"Moteur SQL '{engine}' inconnu : choisir parmi {list(SQL_ENGINES)}.")
+        if engine == 'duckdb' and duckdb is None:
+            raise ValueError("Le moteur 'duckdb' demande le package duckdb (pip install duckdb).")
+        self.engine = engine
+        self.path = path
+        # Écritures (et, avec SQLite, toutes les requêtes) sérialisées sur la connexion partagée
+        self._lock = threading.RLock()
+        if engine == 'duckdb':
+            self._conn = duckdb.connect(path)
+        else:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            # WAL : les lectures ne sont pas bloquées pendant l'ajout de lignes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS kpi_meta (key VARCHAR PRIMARY KEY, value VARCHAR)")
+        self._create_table('reviews', replace=False)
+
+    # ------------------------------------------------------------------------
+    # Chargement de la table
+    # ------------------------------------------------------------------------
+    def _create_table(self, table: str, replace: bool) -> None:
+        columns = ", ".join(f"{_quote(col)} {sql_type}" for col, sql_type in REVIEW_COLUMNS.items())
+        with self._lock:
+            if replace:
+                self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+            self._commit()
+
+    def _commit(self) -> None:
+        if self.engine == 'sqlite':
+            self._conn.commit()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection().execute("SELECT value FROM kpi_meta WHERE key = ?", [key]).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM kpi_meta WHERE key = ?", [key])
+            self._conn.execute("INSERT INTO kpi_meta VALUES (?, ?)", [key, value])
+            self._commit()
+
+    def row_count(self) -> int:
+        if self.engine == 'duckdb':
+            return self._connection().execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
+
+    @property
+    def journal_rows(self) -> int:
+        """
+        Lignes du journal d'ingestion ajoutées à la suite du fichier chargé.
+        """
+        return int(self._get_meta('journal_rows') or 0)
+
+    @journal_rows.setter
+    def journal_rows(self, value: int) -> None:
+        self._set_meta('journal_rows', str(value))
+
+    def is_loaded(self, path: str, version: str) -> bool:
+        """
+        Indique si la table contient exactement la version 'version' du fichier 'path',
+        plus les lignes du journal enregistrées (rien d'autre : ni avis ingérés hors journal,
+        ni chargement interrompu).
+        """
+        file_rows = self._get_meta('file_rows')
+        return (
+            self._get_meta('source_path') == path
+            and self._get_meta('source_version') == version
+            and file_rows is not None
+            and self.row_count() == int(file_rows) + self.journal_rows
+        )
+
+    def load_file(self, path: str) -> None:
+        """
+        Remplace le contenu de la table par celui d'un fichier CSV, Parquet ou Feather
+        (le journal est à rajouter ensuite, voir SQLDatasetStore).
+        """
+        version = get_dataset_version(path)
+        ext = os.path.splitext(path)[1].lower()
+        with self._lock:
+            self._create_table('reviews_loading', replace=True)
+            if self.engine == 'duckdb' and ext in ('.csv', '.parquet'):
+                casts = ", ".join(
+                    f"CAST({_quote(col)} AS {sql_type}) AS {_quote(col)}" for col, sql_type in REVIEW_COLUMNS.items()
+                )
+                if ext == '.parquet':
+                    self._conn.execute(f"INSERT INTO reviews_loading SELECT {casts} FROM read_parquet(?)", [path])
+                else:
+                    self._conn.execute(
+                        f"INSERT INTO reviews_loading SELECT {casts} FROM read_csv(?, header = true, nullstr = ?)",
+                        [path, CSV_NULL_STRINGS]
+                    )
+            else:
+                for chunk in self._iter_file_chunks(path, ext):
+                    self._insert('reviews_loading', chunk)
+            file_rows = self._conn.execute("SELECT COUNT(*) FROM reviews_loading").fetchone()[0]
+            self._commit()
+            self._conn.execute("BEGIN TRANSACTION")
+            self._conn.execute("DROP TABLE IF EXISTS reviews")
+            self._conn.execute("ALTER TABLE reviews_loading RENAME TO reviews")
+            self._conn.execute("COMMIT")
+            self._set_meta('source_path', path)
+            self._set_meta('source_version', version)
+            self._set_meta('file_rows', str(file_rows))
+            self.journal_rows = 0
+
+    @staticmethod
+    def _iter_file_chunks(path: str, ext: str):
+        """
+        Lit le fichier par morceaux de LOAD_CHUNK_ROWS lignes (Feather : en une fois).
+        """
+        columns = list(REVIEW_COLUMNS)
+        if ext == '.csv':
+            yield from pd.read_csv(path, usecols=columns, chunksize=LOAD_CHUNK_ROWS)
+        elif ext == '.parquet':
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=LOAD_CHUNK_ROWS, columns=columns):
+                yield batch.to_pandas()
+        else:
+            yield pd.read_feather(path, columns=columns)
+
+    def _insert(self, table: str, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        frame = _to_sql_frame(df, self.engine)
+        with self._lock:
+            if self.engine == 'duckdb':
+                self._conn.register('incoming_reviews', frame)
+                try:
+                    casts = ", ".join(
+                        f"CAST({_quote(col)} AS {sql_type})" for col, sql_type in REVIEW_COLUMNS.items()
+                    )
+                    self._conn.execute(f"INSERT INTO {table} SELECT {casts} FROM incoming_reviews")
+                finally:
+                    self._conn.unregister('incoming_reviews')
+            else:
+                placeholders = ", ".join("?" for _ in REVIEW_COLUMNS)
+                self._conn.executemany(
+                    f"INSERT INTO {table} VALUES ({placeholders})", frame.itertuples(index=False, name=None)
+                )
+                self._conn.commit()
+
+    def append(self, df: pd.DataFrame) -> None:
+        """
+        Ajoute des avis (colonnes du jeu final) à la fin de la table.
+        """
+        self._insert('reviews', df)
+
+    def contains_reviews(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Indique, pour chaque ligne de 'df', si un avis identique (mêmes REVIEW_KEY_COLUMNS)
+        est déjà dans la table. Seuls les avis de la période couverte par 'df' sont relus.
+        """
+        at = pd.to_datetime(df['at']).dropna()
+        if at.empty:
+            return np.zeros(len(df), dtype=bool)
+        selected = ", ".join(_quote(col) for col in REVIEW_KEY_COLUMNS)
+        rows = self._query(
+            f"SELECT {selected} FROM reviews WHERE \"at\" >= ? AND \"at\" <= ?",
+            [self._timestamp_param(at.min().value), self._timestamp_param(at.max().value)]
+        )
+        return rows_contained_in(df, rows)
+
+    # ------------------------------------------------------------------------
+    # Requêtes
+    # ------------------------------------------------------------------------
+    def _connection(self):
+        # DuckDB : un curseur par requête (connexion dupliquée, utilisable depuis n'importe quel thread)
+        return self._conn.cursor() if self.engine == 'duckdb' else self._conn
+
+    def _query(self, sql: str, params: list) -> pd.DataFrame:
+        if self.engine == 'duckdb':
+            return self._connection().execute(sql, params).df()
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def _timestamp_param(self, value: int):
+        timestamp = pd.Timestamp(value)
+        if self.engine == 'sqlite':
+            return timestamp.strftime(SQLITE_TIMESTAMP_FORMAT)
+        return timestamp.to_pydatetime()
+
+    @staticmethod
+    def _values_clause(column: str, values: Iterable[str], params: list) -> str:
+        """
+        Condition sur une catégorie : valeur exacte, ou préfixe pour '4.556.x' / '4.556*'
+        (même règle que FrameIndex).
+        """
+        conditions = []
+        for value in values:
+            if value.endswith('.x') or value.endswith('*'):
+                prefix = value[:-1]
+                conditions.append(f"substr({_quote(column)}, 1, {len(prefix)}) = ?")
+                params.append(prefix)
+            else:
+                conditions.append(f"{_quote(column)} = ?")
+                params.append(value)
+        return "(" + " OR ".join(conditions) + ")"
+
+    def _where(
+        self,
+        start: Optional[str],
+        end: Optional[str],
+        versions: Optional[Iterable[str]],
+        sentiments: Optional[Iterable[str]],
+        *conditions: str
+    ) -> tuple:
+        """
+        Clause WHERE des filtres communs (et des conditions supplémentaires), avec ses paramètres.
+        Lève ValueError si une date est invalide.
+        """
+        clauses, params = list(conditions), []
+        if start or end:
+            lower, upper = parse_bounds(start, end)
+            if lower is not None:
+                clauses.append('"at" >= ?')
+                params.append(self._timestamp_param(lower))
+            if upper is not None:
+                clauses.append('"at" < ?')
+                params.append(self._timestamp_param(upper))
+        if versions:
+            clauses.append(self._values_clause('reviewCreatedVersion', versions, params))
+        if sentiments:
+            clauses.append(self._values_clause('sentiment', sentiments, params))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _hour_expr(self) -> str:
+        if self.engine == 'duckdb':
+            return 'hour("at")'
+        return "CAST(strftime('%H', \"at\") AS INTEGER)"
+
+    def _hour_start_expr(self) -> str:
+        if self.engine == 'duckdb':
+            return "date_trunc('hour', \"at\")"
+        return "strftime('%Y-%m-%d %H:00:00', \"at\")"
+
+    def hourly_rollup(self, start=None, end=None, versions=None, sentiments=None) -> pd.DataFrame:
+        """
+        Cube horaire (mêmes colonnes que rollup.build_hourly_rollup) des avis filtrés.
+        Les filtres portent sur les lignes : le cube est exact quelles que soient les bornes.
+        """
+        where, params = self._where(start, end, versions, sentiments, '"at" IS NOT NULL')
+        cube = self._query(
+            f"SELECT {self._hour_start_expr()} AS hour_start, \"reviewCreatedVersion\", sentiment, "
+            "COUNT(*) AS n, COALESCE(SUM(score), 0) AS score_sum, COUNT(score) AS score_count, "
+            "COALESCE(SUM(\"thumbsUpCount\"), 0) AS thumbs_sum, COALESCE(SUM(combined_score), 0) AS combined_sum "
+            f"FROM reviews{where} GROUP BY 1, 2, 3 ORDER BY 1",
+            params
+        )
+        cube.columns = ROLLUP_KEYS + ROLLUP_MEASURES
+        cube['at'] = pd.to_datetime(cube['at'])
+        return cube
+
+    def rows(
+        self,
+        columns: list,
+        start=None,
+        end=None,
+        versions=None,
+        sentiments=None,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Lignes filtrées (colonnes demandées uniquement), dans l'ordre d'insertion.
+        'offset' / 'limit' : plage de positions dans la table, avant les filtres. La table n'est
+        qu'allongée (jamais de suppression) : la position d'une ligne est son rowid moins le premier.
+        """
+        conditions = []
+        if offset or limit is not None:
+            first = self._query("SELECT MIN(rowid) AS first FROM reviews", [])['first'].iloc[0]
+            first = 0 if pd.isna(first) else int(first)
+            conditions.append(f"rowid >= {first + int(offset)}")
+            if limit is not None:
+                conditions.append(f"rowid < {first + int(offset) + int(limit)}")
+        where, params = self._where(start, end, versions, sentiments, *conditions)
+        selected = ", ".join(_quote(col) for col in columns)
+        rows = self._query(f"SELECT {selected} FROM reviews{where} ORDER BY rowid", params)
+        if 'at' in rows.columns:
+            rows['at'] = pd.to_datetime(rows['at'])
+        return rows
+
+    def _counts_by_appearance(self, column: str, where: str, params: list, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Nombre d'avis par valeur, décroissant, ex-aequo dans l'ordre d'apparition
+        (comme kpi._value_counts_by_appearance). La valeur NULL forme un groupe à part.
+        """
+        sql = (
+            f"SELECT {_quote(column)} AS value, COUNT(*) AS n FROM reviews{where} "
+            f"GROUP BY {_quote(column)} ORDER BY n DESC, MIN(rowid)"
+        )
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self._query(sql, params)
+
+    def compute(
+        self,
+        name: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        versions: Optional[Iterable[str]] = None,
+        sentiments: Optional[Iterable[str]] = None,
+        **params
+    ):
+        """
+        Calcule un KPI sur les avis filtrés (même résultat que la fonction de kpi.py
+        sur filter_frame). Lève ValueError si le KPI est inconnu ou si une date est invalide.
+
+        Paramètres
+        ----------
+        name : str
+            Nom du KPI (voir SQL_KPI_NAMES).
+        start, end, versions, sentiments :
+            Filtres communs, comme FrameIndex.select.
+        **params :
+            'freq' (séries temporelles) ou 'top_n' (top des utilisateurs).
+        """
+        filters = (start, end, versions, sentiments)
+
+        if name == 'total_reviews':
+            where, args = self._where(*filters)
+            return int(self._query(f"SELECT COUNT(*) AS n FROM reviews{where}", args)['n'].iloc[0])
+
+        if name in ('score_distribution', 'thumbs_up_distribution'):
+            column = 'score' if name == 'score_distribution' else 'thumbsUpCount'
+            where, args = self._where(*filters, f"{_quote(column)} IS NOT NULL")
+            return self._query(
+                f"SELECT {_quote(column)}, COUNT(*) AS \"count\" FROM reviews{where} "
+                f"GROUP BY {_quote(column)} ORDER BY {_quote(column)}",
+                args
+            )
+
+        if name == 'sentiment_ratio':
+            where, args = self._where(*filters)
+            counts = self._counts_by_appearance('sentiment', where, args)
+            total = int(counts['n'].sum())
+            counts = counts[counts['value'].notna()]
+            return {value: round(n / total * 100, 2) for value, n in zip(counts['value'], counts['n'])}
+
+        if name == 'reviews_by_version':
+            where, args = self._where(*filters, '"reviewCreatedVersion" IS NOT NULL')
+            return self._query(
+                "SELECT \"reviewCreatedVersion\", COUNT(content) AS review_count, AVG(score) AS average_score "
+                f"FROM reviews{where} GROUP BY \"reviewCreatedVersion\" ORDER BY \"reviewCreatedVersion\"",
+                args
+            )
+
+        if name == 'combined_sentiment_average':
+            where, args = self._where(*filters)
+            value = self._query(f"SELECT AVG(combined_score) AS v FROM reviews{where}", args)['v'].iloc[0]
+            return float('nan') if pd.isna(value) else float(value)
+
+        if name == 'average_thumbs_up_per_sentiment':
+            where, args = self._where(*filters, 'sentiment IS NOT NULL')
+            return self._query(
+                "SELECT sentiment, AVG(\"thumbsUpCount\") AS average_thumbs_up "
+                f"FROM reviews{where} GROUP BY sentiment ORDER BY sentiment",
+                args
+            )
+
+        if name == 'review_frequency_by_hour':
+            where, args = self._where(*filters, '"at" IS NOT NULL')
+            return self._query(
+                f"SELECT {self._hour_expr()} AS hour, COUNT(*) AS review_count "
+                f"FROM reviews{where} GROUP BY 1 ORDER BY 1",
+                args
+            )
+
+        if name in ('top_users_by_reviews', 'reviews_per_user'):
+            where, args = self._where(*filters, '"userName" IS NOT NULL')
+            limit = params.get('top_n', 10) if name == 'top_users_by_reviews' else None
+            counts = self._counts_by_appearance('userName', where, args, limit)
+            counts.columns = ['userName', 'review_count']
+            return counts
+
+        if name == 'average_score_per_user':
+            where, args = self._where(*filters, '"userName" IS NOT NULL')
+            return self._query(
+                "SELECT \"userName\", AVG(score) AS average_score "
+                f"FROM reviews{where} GROUP BY \"userName\" ORDER BY \"userName\"",
+                args
+            )
+
+        if name == 'score_thumbs_correlation':
+            # Deux passes (moyennes puis écarts centrés), comme pandas : pas de perte de précision
+            where, args = self._where(*filters, 'score IS NOT NULL', '"thumbsUpCount" IS NOT NULL')
+            row = self._query(
+                "WITH f AS (SELECT CAST(score AS DOUBLE) AS x, CAST(\"thumbsUpCount\" AS DOUBLE) AS y "
+                f"FROM reviews{where}), m AS (SELECT AVG(x) AS mx, AVG(y) AS my, COUNT(*) AS n FROM f) "
+                "SELECT m.n AS n, SUM((x - mx) * (y - my)) AS cxy, SUM((x - mx) * (x - mx)) AS sxx, "
+                "SUM((y - my) * (y - my)) AS syy FROM f CROSS JOIN m GROUP BY m.n",
+                args
+            )
+            if row.empty or row['n'].iloc[0] < 2:
+                return float('nan')
+            denominator = math.sqrt(row['sxx'].iloc[0] * row['syy'].iloc[0])
+            return float('nan') if denominator == 0 else float(row['cxy'].iloc[0] / denominator)
+
+        if name == 'monthly_reviews':
+            return rollup_monthly_review_count(self.hourly_rollup(*filters))
+
+        if name in ('average_score_over_time', 'sentiment_trends_by_version'):
+            default_freq = 'ME' if name == 'average_score_over_time' else 'M'
+            freq = params.get('freq', default_freq)
+            if is_hour_aligned(freq):
+                cube = self.hourly_rollup(*filters)
+                if name == 'average_score_over_time':
+                    return rollup_average_score_over_time(cube, freq)
+                return rollup_sentiment_trends_by_version(cube, freq)
+            # Fréquence plus fine que l'heure : calcul pandas sur les seules colonnes utiles
+            if name == 'average_score_over_time':
+                return kpi.get_average_score_over_time(self.rows(['at', 'score'], *filters), freq)
+            rows = self.rows(['reviewCreatedVersion', 'at', 'sentiment'], *filters)
+            return kpi.get_sentiment_trends_by_version(rows, freq)
+
+        raise ValueError(f"KPI inconnu : '{name}'. KPI disponibles : {list(SQL_KPI_NAMES)}.")
+
+    def compute_many(
+        self,
+        names: Iterable[str],
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        versions: Optional[Iterable[str]] = None,
+        sentiments: Optional[Iterable[str]] = None,
+        freq: str = 'M',
+        top_n: Optional[int] = 10
+    ) -> dict:
+        """
+        Calcule plusieurs KPI avec les mêmes filtres (équivalent de batch.compute_kpis) :
+        {nom: résultat}. Le cube horaire est calculé une seule fois pour les séries temporelles.
+        """
+        results = {}
+        cube = None
+        for name in names:
+            if name in ('average_score_over_time', 'sentiment_trends_by_version', 'monthly_reviews') \
+                    and (name == 'monthly_reviews' or is_hour_aligned(freq)):
+                if cube is None:
+                    cube = self.hourly_rollup(start, end, versions, sentiments)
+                if name == 'average_score_over_time':
+                    results[name] = rollup_average_score_over_time(cube, freq)
+                elif name == 'sentiment_trends_by_version':
+                    results[name] = rollup_sentiment_trends_by_version(cube, freq)
+                else:
+                    results[name] = rollup_monthly_review_count(cube)
+                continue
+            params = {'freq': freq} if name in ('average_score_over_time', 'sentiment_trends_by_version') else {}
+            if name == 'top_users_by_reviews':
+                params = {'top_n': top_n}
+            results[name] = self.compute(name, start, end, versions, sentiments, **params)
+        return results
+
+    def status(self) -> dict:
+        return {
+            "engine": self.engine,
+            "path": self.path,
+            "source_version": self._get_meta('source_version'),
+            "journal_rows": self.journal_rows,
+        }
+
+
+class SQLSnapshot:
+    """
+    Version du jeu de données servie par le backend SQL : métadonnées seules, les avis sont
+    dans la table 'reviews' (ni serving frame, ni index, ni cube horaire en mémoire).
+    Même interface que DatasetSnapshot pour l'API (tag, rows, text_frame, memory_report).
+    """
+
+    source_tag = DatasetSnapshot.source_tag
+    tag = DatasetSnapshot.tag
+
+    def __init__(
+        self,
+        backend: SQLKPIBackend,
+        path: str,
+        version: str,
+        last_modified: Optional[float],
+        ingest_seq: int = 0,
+        journal_rows: int = 0
+    ):
+        self.backend = backend
+        self.path = path
+        self.version = version
+        self.last_modified = last_modified
+        self.ingest_seq = ingest_seq
+        self.journal_rows = journal_rows
+        self.loaded_at = time.time()
+
+    @property
+    def rows(self) -> int:
+        return self.backend.row_count()
+
+    @staticmethod
+    def _table_columns(columns: Optional[list]) -> list:
+        return [col for col in (columns or REVIEW_COLUMNS) if col in REVIEW_COLUMNS]
+
+    def text_frame(self, start: int = 0, columns: Optional[list] = None, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Avis de la table à partir de la ligne 'start' (au plus 'limit'), dans l'ordre d'insertion,
+        limités aux colonnes de la table présentes dans 'columns'. La plage est lue en SQL.
+        """
+        return self.backend.rows(self._table_columns(columns), offset=start, limit=limit)
+
+    def iter_text_frames(self, start: int = 0, columns: Optional[list] = None):
+        """
+        Lignes à partir de 'start' par morceaux de LOAD_CHUNK_ROWS : (position du morceau, lignes).
+        La table n'est jamais lue en entier dans pandas.
+        """
+        for begin in range(start, self.rows, LOAD_CHUNK_ROWS):
+            yield begin, self.text_frame(begin, columns, LOAD_CHUNK_ROWS)
+
+    def text_rows(self, start: Optional[str] = None, end: Optional[str] = None, columns: Optional[list] = None) -> pd.DataFrame:
+        """
+        Avis de la période (bornes comme FrameIndex.select), lus en SQL.
+        """
+        return self.backend.rows(self._table_columns(columns), start, end)
+
+    def memory_report(self) -> dict:
+        """
+        Taille du jeu servi : aucun frame en mémoire, les avis sont dans le fichier de la base.
+        """
+        # Fichier de la base et son journal d'écriture (DuckDB : '.wal', SQLite : '-wal')
+        files = [self.backend.path, self.backend.path + '.wal', self.backend.path + '-wal']
+        return {
+            "rows": self.rows,
+            "frame_bytes": 0,
+            "kpi_backend": self.backend.engine,
+            "database_bytes": sum(os.path.getsize(path) for path in files if os.path.exists(path)),
+        }
+
+
+class SQLDatasetStore(DatasetStore):
+    """
+    DatasetStore du backend SQL : le fichier publié est chargé directement dans la base
+    (SQLKPIBackend.load_file), sans construire de serving frame, d'index ni de cube horaire.
+
+    Rechargement : même surveillance du fichier que DatasetStore. La table n'est rechargée que si
+    le fichier a changé depuis son dernier chargement (la base est réutilisée au redémarrage) ;
+    les avis du journal absents du fichier sont ensuite ajoutés à la suite, et ceux qu'il contient
+    désormais sont retirés du journal. Les ingestions attendent la fin du rechargement.
+
+    Ingestion : les avis sont ajoutés au journal puis à la table, visibles immédiatement
+    par toutes les requêtes (ni accumulateurs, ni compactage).
+
+    Paramètres
+    ----------
+    backend : SQLKPIBackend
+        Base dans laquelle les avis sont chargés.
+    path, reader, journal_path, writer :
+        Comme DatasetStore.
+    """
+
+    def __init__(
+        self,
+        backend: SQLKPIBackend,
+        path: str,
+        reader: Callable[[str], pd.DataFrame],
+        journal_path: Optional[str] = None,
+        writer: Optional[Callable[[pd.DataFrame, str], object]] = None
+    ):
+        super().__init__(path, reader, journal_path, writer)
+        self.backend = backend
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Aligne la base sur le fichier si sa version a changé (ou toujours si 'force').
+        Retourne True si le snapshot a été remplacé.
+        Lève l'erreur de chargement s'il n'y a encore aucun snapshot à servir.
+        """
+        with self._reload_lock:
+            version = get_dataset_version(self.path)
+            if not force and self.current is not None and version == self.current.version:
+                return False
+            try:
+                last_modified = os.stat(self.path).st_mtime
+                with self._ingest_lock:
+                    if not self.backend.is_loaded(self.path, version):
+                        self.backend.load_file(self.path)
+                    journal_rows = self._replay_journal()
+                    self.current = SQLSnapshot(
+                        self.backend, self.path, version, last_modified, self.sequence, journal_rows
+                    )
+            except (OSError, ValueError, *SQL_ERRORS) as exc:
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                if self.current is None:
+                    raise
+                return False
+            self.last_error = None
+            self.reload_count += 1
+            return True
+
+    def _replay_journal(self) -> int:
+        """
+        Aligne la fin de la table sur le journal : après un chargement du fichier, les avis
+        du journal qu'il contient déjà sont retirés du journal ; les lignes du journal pas encore
+        dans la table y sont ajoutées. Appelé sous _ingest_lock. Retourne le nombre de lignes du journal.
+        """
+        journal = None
+        if self.journal_path and os.path.exists(self.journal_path):
+            journal = self.reader(self.journal_path)
+            validate_schema(journal)
+        if self.backend.journal_rows > (len(journal) if journal is not None else 0):
+            # Journal raccourci depuis l'ajout de ses lignes à la table : on repart du fichier
+            self.backend.load_file(self.path)
+        added = self.backend.journal_rows
+        if journal is not None and added == 0:
+            folded = np.flatnonzero(self.backend.contains_reviews(journal))
+            self._truncate_journal(folded)
+            journal = journal.drop(index=journal.index[folded]).reset_index(drop=True)
+        if journal is not None and len(journal) > added:
+            self.backend.append(journal.iloc[added:])
+        self.journal_rows = len(journal) if journal is not None else 0
+        self.backend.journal_rows = self.journal_rows
+        return self.journal_rows
+
+    def ingest(self, reviews: pd.DataFrame) -> int:
+        """
+        Ajoute des avis (colonnes du jeu final) au journal puis à la table, où ils sont
+        visibles immédiatement. Retourne le numéro du dernier avis ingéré.
+        Lève ValueError si le schéma est invalide.
+        """
+        validate_schema(reviews)
+        reviews = reviews[REQUIRED_COLUMNS].reset_index(drop=True)
+        reviews = reviews.assign(at=pd.to_datetime(reviews['at']))
+        with self._ingest_lock:
+            if self.journal_path:
+                self.writer(reviews.copy(), self.journal_path)
+                self.journal_rows += len(reviews)
+            self.backend.append(reviews)
+            if self.journal_path:
+                self.backend.journal_rows = self.journal_rows
+            self.sequence += len(reviews)
+            self.last_ingest_at = time.time()
+            snapshot = self.current
+            self.current = SQLSnapshot(
+                self.backend, snapshot.path, snapshot.version, snapshot.last_modified,
+                self.sequence, snapshot.journal_rows
+            )
+            return self.sequence
+
+
+# ------------------------------------------------------------------------
+# Vérification de la parité avec les fonctions pandas de kpi.py
+# ------------------------------------------------------------------------
+PANDAS_KPI_FUNCTIONS = {
+    'total_reviews': kpi.get_total_reviews,
+    'score_distribution': kpi.get_score_distribution,
+    'sentiment_ratio': kpi.get_sentiment_ratio,
+    'average_score_over_time': kpi.get_average_score_over_time,
+    'reviews_by_version': kpi.get_reviews_by_version,
+    'thumbs_up_distribution': kpi.get_thumbs_up_distribution,
+    'combined_sentiment_average': kpi.get_combined_sentiment_average,
+    'average_thumbs_up_per_sentiment': kpi.get_average_thumbs_up_per_sentiment,
+    'review_frequency_by_hour': kpi.get_review_frequency_by_hour,
+    'top_users_by_reviews': kpi.get_top_users_by_reviews,
+    'score_thumbs_correlation': kpi.get_score_thumbs_correlation,
+    'reviews_per_user': kpi.get_reviews_per_user,
+    'average_score_per_user': kpi.get_average_score_per_user,
+    'sentiment_trends_by_version': kpi.get_sentiment_trends_by_version,
+    'monthly_reviews': kpi.get_monthly_review_count,
+}
+
+# Cas vérifiés par défaut : (filtres, paramètres)
+PARITY_CASES = [
+    ({}, {}),
+    ({}, {'freq': 'D', 'top_n': 25}),
+    ({}, {'freq': '15min'}),
+    ({'sentiments': ['negative']}, {}),
+    ({'start': '2024-11', 'end': '2024-12-15'}, {'freq': 'W'}),
+    ({'start': '2024-12-01 10:30'}, {'freq': 'h'}),
+    ({'versions': ['4.556.x', '4.555.10003'], 'sentiments': ['positive', 'neutral']}, {}),
+    ({'start': '1990-01', 'end': '1990-02'}, {}),
+]
+
+
+def _same_result(sql_result, pandas_result, rel_tol: float = 1e-9) -> Optional[str]:
+    """
+    None si les deux résultats sont identiques (flottants à 'rel_tol' près), sinon la différence.
+    """
+    if isinstance(sql_result, float) and isinstance(pandas_result, float):
+        if math.isnan(sql_result) and math.isnan(pandas_result):
+            return None
+        return None if math.isclose(sql_result, pandas_result, rel_tol=rel_tol) else f"{sql_result!r} != {pandas_result!r}"
+    if isinstance(sql_result, dict) and isinstance(pandas_result, dict):
+        return None if list(sql_result.items()) == list(pandas_result.items()) else f"{sql_result!r} != {pandas_result!r}"
+    comparison = compare_results(sql_result, pandas_result)
+    if comparison['status'] == 'identical':
+        return None
+    return f"{comparison['status']} : {comparison['detail']}"[:500]
+
+
+def check_parity(
+    backend: SQLKPIBackend,
+    frame: pd.DataFrame,
+    names: Optional[Iterable[str]] = None,
+    cases: Optional[list] = None
+) -> list:
+    """
+    Compare chaque KPI du backend SQL avec sa fonction pandas sur le même jeu de données,
+    pour plusieurs combinaisons de filtres et de paramètres (PARITY_CASES par défaut).
+
+    La table du backend doit contenir les mêmes avis, dans le même ordre, que 'frame'
+    (serving frame) : voir load_file et SQLDatasetStore.
+
+    Retour
+    ------
+    list
+        Un dictionnaire par vérification : 'kpi', 'filters', 'params' et 'difference'
+        (None si les résultats sont identiques).
+    """
+    names = list(names or SQL_KPI_NAMES)
+    index = FrameIndex(frame)
+    report = []
+    for filters, params in (cases or PARITY_CASES):
+        subset = index.select(frame, filters.get('start'), filters.get('end'), filters.get('versions'), filters.get('sentiments'))
+        for name in names:
+            kpi_params = {}
+            if name in ('average_score_over_time', 'sentiment_trends_by_version') and 'freq' in params:
+                kpi_params['freq'] = params['freq']
+            if name == 'top_users_by_reviews' and 'top_n' in params:
+                kpi_params['top_n'] = params['top_n']
+            expected = PANDAS_KPI_FUNCTIONS[name](subset, **kpi_params)
+            result = backend.compute(name, **filters, **kpi_params)
+            report.append({
+                'kpi': name, 'filters': filters, 'params': kpi_params,
+                'difference': _same_result(result, expected),
+            })
+    return report
+
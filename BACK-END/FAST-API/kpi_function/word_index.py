@@ -0,0 +1,279 @@
+# word_index.py
+
+import re
+import threading
+from collections import Counter
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+
+from kpi_function.filters import DAY_NS, matching_keys, parse_bounds
+
+
+# Petite liste de mots vides anglais (les avis sont majoritairement en anglais),
+# appliquée après le nettoyage de get_most_common_words (minuscules, lettres uniquement)
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers herself him himself his how i if in into is it its itself
+just me more most my myself no nor not now of off on once only or other our ours ourselves out
+over own same she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your yours yourself yourselves im ive dont
+""".split())
+
+
+def tokenize(text: str) -> list:
+    """
+    Découpe un texte en mots exactement comme get_most_common_words :
+    suppression des caractères non alphabétiques, passage en minuscules, split sur les espaces.
+    """
+    return re.sub(r'[^a-zA-Z\s]', '', text).lower().split()
+
+
+class WordIndex:
+    """
+    Index des fréquences de mots, construit une fois par fichier chargé puis complété
+    au fil des avis ajoutés au jeu servi (add), sans relire les textes déjà comptés.
+
+    On stocke, par sentiment :
+    - un Counter global et un Counter par version ; leurs listes (mot, fréquence) triées sont
+      gardées jusqu'au prochain ajout : sans période, n'importe quel 'top_n' (et les filtres
+      de version, familles '4.556.x' comprises) se lit par simple découpage ;
+    - un Counter par mois (toutes versions) et par (mois, version) : les mois entièrement
+      couverts par la période sont lus directement ;
+    - un Counter par (jour, version), additionnés seulement pour les mois partiellement couverts.
+
+    Les bornes de période sont appliquées comme pour les autres endpoints. Une borne plus fine
+    que le jour (ex. 'YYYY-MM-DD HH:MM') coupe un jour en deux : les avis de ce jour sont relus
+    ('edge_rows') et comptés directement.
+
+    Paramètres
+    ----------
+    source : str, optionnel
+        Identifiant du jeu indexé (ex. DatasetSnapshot.source_tag).
+    df : pd.DataFrame, optionnel
+        Premiers avis à indexer : au moins 'content', 'sentiment', 'reviewCreatedVersion' et 'at'.
+    """
+
+    def __init__(self, source: Optional[str] = None, df: Optional[pd.DataFrame] = None):
+        self.source = source
+        self.rows = 0
+        self.counts = {}
+        self.version_counts = {}
+        self.month_totals = {}
+        self.month_counts = {}
+        self.day_counts = {}
+        self.versions = []
+        self.first_day: Optional[int] = None
+        self.last_day: Optional[int] = None
+        self._sorted = {}
+        # Ajouts et lectures sous verrou : l'index est partagé entre les requêtes
+        self._lock = threading.Lock()
+        if df is not None:
+            self.add(df)
+
+    def add(self, df: pd.DataFrame, start: Optional[int] = None) -> bool:
+        """
+        Ajoute des avis à l'index. 'start' : position du premier de ces avis dans le jeu indexé ;
+        l'ajout est ignoré si l'index ne s'arrête pas à cette position (avis déjà comptés
+        par une autre requête). Retourne True si les avis ont été ajoutés.
+        """
+        with self._lock:
+            if start is not None and start != self.rows:
+                return False
+            self._add(df)
+            return True
+
+    def _add(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        # Compteurs par sentiment : même construction que get_most_common_words
+        # (concaténation dans l'ordre des lignes) pour garder le même ordre des ex-aequo
+        for sentiment, group in df.groupby('sentiment', observed=True, sort=False):
+            self.counts.setdefault(sentiment, Counter()).update(tokenize(' '.join(group['content'].astype(str))))
+
+        # Compteurs par version, par mois et par jour (les avis sans version comptent
+        # sans filtre de version, les avis sans date sans filtre de période)
+        days = df['day'] if 'day' in df.columns else pd.to_datetime(df['at']).dt.normalize()
+        keys = [df['sentiment'], df['reviewCreatedVersion'].astype(object), days]
+        for (sentiment, version, day), group in df.groupby(keys, observed=True, sort=False, dropna=False):
+            if pd.isna(sentiment):
+                continue
+            words = Counter(tokenize(' '.join(group['content'].astype(str))))
+            version = None if pd.isna(version) else str(version)
+            self.version_counts.setdefault((sentiment, version), Counter()).update(words)
+            if pd.isna(day):
+                continue
+            month = day.to_period('M').start_time.value
+            self.month_totals.setdefault((sentiment, month), Counter()).update(words)
+            self.month_counts.setdefault((sentiment, month), {}).setdefault(version, Counter()).update(words)
+            self.day_counts.setdefault((sentiment, day.value), {}).setdefault(version, Counter()).update(words)
+            self.first_day = day.value if self.first_day is None else min(self.first_day, day.value)
+            self.last_day = day.value if self.last_day is None else max(self.last_day, day.value)
+
+        self.versions = sorted({version for _, version in self.version_counts if version is not None})
+        self.rows += len(df)
+        self._sorted.clear()
+
+    def _sorted_counts(self, key: tuple, counts: Optional[Counter]) -> list:
+        """
+        Liste (mot, fréquence) triée d'un Counter de l'index, gardée jusqu'au prochain ajout.
+        """
+        if key not in self._sorted:
+            self._sorted[key] = counts.most_common() if counts else []
+        return self._sorted[key]
+
+    @staticmethod
+    def _merge_versions(total: Counter, cells: Optional[dict], versions: Optional[list]) -> None:
+        """
+        Ajoute à 'total' les compteurs {version: Counter} d'une cellule (toutes les versions si 'versions' vaut None).
+        """
+        if not cells:
+            return
+        if versions is None:
+            for counts in cells.values():
+                total.update(counts)
+            return
+        for version in versions:
+            counts = cells.get(version)
+            if counts:
+                total.update(counts)
+
+    def _edge_counts(
+        self,
+        sentiment: str,
+        versions: Optional[list],
+        lower: int,
+        upper: int,
+        edge_rows: Optional[Callable[[str, str], pd.DataFrame]]
+    ) -> Counter:
+        """
+        Mots des avis d'une partie de jour [lower, upper[ (borne plus fine que le jour),
+        relus avec 'edge_rows'. Lève ValueError si aucune source d'avis n'est fournie.
+        """
+        if edge_rows is None:
+            raise ValueError("Borne plus fine que le jour : les avis du jour doivent être relus ('edge_rows').")
+        day = pd.Timestamp(lower).strftime('%Y-%m-%d')
+        rows = edge_rows(day, day)
+        at = pd.to_datetime(rows['at'])
+        mask = (rows['sentiment'] == sentiment) & (at >= pd.Timestamp(lower)) & (at < pd.Timestamp(upper))
+        if versions is not None:
+            mask &= rows['reviewCreatedVersion'].astype(object).isin(versions)
+        return Counter(tokenize(' '.join(rows.loc[mask, 'content'].astype(str))))
+
+    def _period_counts(
+        self,
+        sentiment: str,
+        versions: Optional[list],
+        lower: Optional[int],
+        upper: Optional[int],
+        edge_rows: Optional[Callable[[str, str], pd.DataFrame]]
+    ) -> Counter:
+        """
+        Additionne les compteurs des avis de la période [lower, upper[ (nanosecondes) :
+        mois entiers, puis jours des mois partiels, puis parties de jour relues.
+        """
+        total = Counter()
+        if self.first_day is None:
+            return total
+        lower = self.first_day if lower is None else max(lower, self.first_day)
+        upper = self.last_day + DAY_NS if upper is None else min(upper, self.last_day + DAY_NS)
+        if lower >= upper:
+            return total
+
+        # Jours entiers de la période [day_lo, day_hi[ ; le reste est relu
+        day_lo = -(-lower // DAY_NS) * DAY_NS
+        day_hi = upper // DAY_NS * DAY_NS
+        if day_lo >= day_hi:
+            return self._edge_counts(sentiment, versions, lower, upper, edge_rows)
+        if lower < day_lo:
+            total.update(self._edge_counts(sentiment, versions, lower, day_lo, edge_rows))
+        if day_hi < upper:
+            total.update(self._edge_counts(sentiment, versions, day_hi, upper, edge_rows))
+
+        cursor = day_lo
+        while cursor < day_hi:
+            month = pd.Timestamp(cursor).to_period('M')
+            month_start, month_end = month.start_time.value, (month + 1).start_time.value
+            if cursor == month_start and month_end <= day_hi:
+                if versions is None:
+                    total.update(self.month_totals.get((sentiment, month_start), {}))
+                else:
+                    self._merge_versions(total, self.month_counts.get((sentiment, month_start)), versions)
+            else:
+                for day in range(cursor, min(month_end, day_hi), DAY_NS):
+                    self._merge_versions(total, self.day_counts.get((sentiment, day)), versions)
+            cursor = month_end
+        return total
+
+    def _counts(
+        self,
+        sentiment: str,
+        versions: Optional[Iterable[str]],
+        start: Optional[str],
+        end: Optional[str],
+        edge_rows: Optional[Callable[[str, str], pd.DataFrame]]
+    ) -> list:
+        """
+        Liste triée (mot, fréquence) des avis qui respectent les filtres.
+        Lève ValueError si une date est invalide.
+        """
+        matched = list(dict.fromkeys(matching_keys(self.versions, versions))) if versions else None
+        if start or end:
+            return self._period_counts(sentiment, matched, *parse_bounds(start, end), edge_rows).most_common()
+        if matched is None:
+            return self._sorted_counts((sentiment,), self.counts.get(sentiment))
+        if len(matched) == 1:
+            return self._sorted_counts((sentiment, matched[0]), self.version_counts.get((sentiment, matched[0])))
+        total = Counter()
+        for version in matched:
+            total.update(self.version_counts.get((sentiment, version), {}))
+        return total.most_common()
+
+    def most_common(
+        self,
+        sentiment: str,
+        top_n: Optional[int] = 10,
+        remove_stop_words: bool = False,
+        versions: Optional[Iterable[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        edge_rows: Optional[Callable[[str, str], pd.DataFrame]] = None
+    ) -> list:
+        """
+        Retourne les mots les plus fréquents pour un sentiment, à partir de l'index.
+
+        Paramètres
+        ----------
+        sentiment : str
+            Sentiment à filtrer ('positive', 'negative', 'neutral').
+        top_n : int, optionnel
+            Nombre de mots à retourner (None = tous).
+        remove_stop_words : bool
+            Ignore les mots vides (voir STOP_WORDS).
+        versions : Iterable[str], optionnel
+            Ne compter que les avis de ces versions de l'application ('4.556.x' : toute la famille).
+        start, end : str, optionnel
+            Bornes de période incluses ('YYYY-MM', 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM', ...).
+        edge_rows : Callable[[str, str], pd.DataFrame], optionnel
+            Relit les avis d'une période (ex. DatasetSnapshot.text_rows), pour les bornes
+            plus fines que le jour ; sans elle, ces bornes lèvent ValueError.
+
+        Retour
+        ------
+        list
+            Liste des mots les plus fréquents sous forme de tuples (mot, fréquence).
+        """
+        with self._lock:
+            counts = self._counts(sentiment, versions, start, end, edge_rows)
+
+        if remove_stop_words:
+            counts = (item for item in counts if item[0] not in STOP_WORDS)
+
+        result = []
+        for item in counts:
+            if top_n is not None and len(result) >= top_n:
+                break
+            result.append(item)
+        return result
@@ -1,9 +1,13 @@
 # main.py
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Query
 import pandas as pd
 
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 
 
 
@@ -16,7 +20,6 @@ from kpi_function.kpi import (
     get_reviews_by_version,
     get_thumbs_up_distribution,
     get_combined_sentiment_average,
-    get_most_common_words,
     get_average_thumbs_up_per_sentiment,
     get_review_frequency_by_hour,
     get_top_users_by_reviews,
@@ -26,12 +29,139 @@ from kpi_function.kpi import (
     get_sentiment_trends_by_version,
     get_monthly_review_count
 )
-from typing import List, Optional
+from kpi_function.batch import compute_kpis, parse_kpi_names
+from kpi_function.cache import KPICache
+from kpi_function.dataset import DatasetStore
+from kpi_function.heavy_hitters import DEFAULT_CAPACITY, TopUsersSketch, exact_top_users
+from kpi_function.http_cache import DEFAULT_CACHE_CONTROL, ConditionalRequestMiddleware
+from kpi_function.live import LIVE_KPI_NAMES
+from kpi_function.memory import process_memory
+from kpi_function.pagination import decode_cursor, iter_ndjson, paginate, sort_frame
+from kpi_function.metrics import PROMETHEUS_CONTENT_TYPE, APIMetrics, MetricsMiddleware
+from kpi_function.rollup import (
+    is_hour_aligned,
+    rollup_average_score_over_time,
+    rollup_monthly_review_count,
+    rollup_sentiment_trends_by_version,
+)
+from kpi_function.sql_backend import SQLDatasetStore, SQLKPIBackend
+from kpi_function.sentiment_worker import SentimentQueueFull, SentimentWorker
+from kpi_function.serialization import PAYLOAD_SHAPES, fast_json, frame_to_payload, set_timing_hook
+from kpi_function.word_index import WordIndex
+from pipeline.storage import append_dataset, read_dataset
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
+import os
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Le worker de sentiment vit dans la boucle asyncio du serveur
+    sentiment_worker.start()
+    yield
+    await sentiment_worker.stop()
+
+app = FastAPI(lifespan=lifespan)
+
+# Fichier de données publié par le pipeline : le plus récent de la version Parquet (typée,
+# sans re-parsing) et du CSV, pour suivre le dernier run du pipeline quel que soit son --format ;
+# à date égale, le Parquet est préféré. UBER_DATA_PATH permet de forcer un fichier.
+DATA_CANDIDATES = [
+    "Assets/Datas/archive_uber/uber_data_final.parquet",
+    "Assets/Datas/archive_uber/uber_data_final.csv",
+]
+DATA_PATH = os.getenv("UBER_DATA_PATH") or max(
+    (path for path in DATA_CANDIDATES if os.path.exists(path)),
+    key=lambda path: (os.stat(path).st_mtime_ns, -DATA_CANDIDATES.index(path)),
+    default=DATA_CANDIDATES[-1]
+)
 
-app = FastAPI()
+# Avis ingérés par POST /reviews : sauvegardés dans un journal CSV à côté du fichier de données
+# (relu au démarrage), INGEST_JOURNAL_PATH vide pour ne pas les sauvegarder. Ils sont ajoutés au
+# serving frame au plus toutes les INGEST_COMPACT_INTERVAL secondes (voir DatasetStore.ingest).
+INGEST_JOURNAL_PATH = os.getenv(
+    "INGEST_JOURNAL_PATH", os.path.join(os.path.dirname(DATA_PATH), "uber_data_ingested.csv")
+)
 
+# Moteur de calcul des KPI : 'pandas' (serving frame en mémoire, par défaut), 'duckdb' ou 'sqlite'
+# (requêtes SQL sur une base embarquée dans KPI_SQL_PATH, chargée directement depuis le fichier publié,
+# voir SQLKPIBackend : aucun serving frame n'est alors construit)
+KPI_BACKEND = os.getenv("KPI_BACKEND", "pandas")
+KPI_SQL_PATH = os.getenv("KPI_SQL_PATH") or os.path.join(os.path.dirname(DATA_PATH), f"uber_kpi.{KPI_BACKEND}")
+sql_backend = None if KPI_BACKEND == "pandas" else SQLKPIBackend(KPI_BACKEND, KPI_SQL_PATH)
+
+# Jeu de données servi : rechargé à chaud quand le pipeline republie le fichier (voir DatasetStore).
+# Les types du serving frame sont réduits au chargement (category, petits entiers) ; les flottants
+# passent en float32 si l'écart relatif reste sous SERVING_FLOAT32_TOLERANCE (0 : conversion exacte).
+# SERVING_LAZY_CONTENT=1 garde les textes des avis hors du frame (relus pour l'index des mots).
+# TOP_USERS_SKETCH_CAPACITY : compteurs des résumés Space-Saving des auteurs d'avis (mode approché
+# de /top_users_by_reviews), construits au chargement puis tenus à jour à chaque ingestion.
+# Avec le backend SQL, le fichier est chargé dans la base à la place (voir SQLDatasetStore).
+TOP_USERS_SKETCH_CAPACITY = int(os.getenv("TOP_USERS_SKETCH_CAPACITY", str(DEFAULT_CAPACITY)))
+if sql_backend is None:
+    dataset_store = DatasetStore(
+        DATA_PATH,
+        read_dataset,
+        journal_path=INGEST_JOURNAL_PATH or None,
+        writer=append_dataset,
+        compact_interval=float(os.getenv("INGEST_COMPACT_INTERVAL", "5")),
+        lazy_content=os.getenv("SERVING_LAZY_CONTENT", "0") == "1",
+        float_tolerance=float(os.getenv("SERVING_FLOAT32_TOLERANCE", "0")),
+        top_users_capacity=TOP_USERS_SKETCH_CAPACITY
+    )
+else:
+    dataset_store = SQLDatasetStore(
+        sql_backend,
+        DATA_PATH,
+        read_dataset,
+        journal_path=INGEST_JOURNAL_PATH or None,
+        writer=append_dataset
+    )
+
+# Worker de sentiment des avis bruts (POST /reviews/raw) : file bornée à SENTIMENT_QUEUE_SIZE avis,
+# lots d'au plus SENTIMENT_BATCH_SIZE avis complétés pendant au plus SENTIMENT_BATCH_LATENCY secondes,
+# requêtes refusées (503) si la file reste pleine SENTIMENT_ENQUEUE_TIMEOUT secondes.
+# SENTIMENT_CACHE_PATH : cache SQLite des polarités (optionnel, le même que celui du pipeline).
+# SENTIMENT_ALPHA, SENTIMENT_POSITIVE_THRESHOLD et SENTIMENT_NEGATIVE_THRESHOLD : fusion et seuils
+# de classification, à garder identiques à ceux du pipeline.
+sentiment_worker = SentimentWorker(
+    dataset_store.ingest,
+    max_queue=int(os.getenv("SENTIMENT_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("SENTIMENT_BATCH_SIZE", "64")),
+    max_latency=float(os.getenv("SENTIMENT_BATCH_LATENCY", "0.5")),
+    enqueue_timeout=float(os.getenv("SENTIMENT_ENQUEUE_TIMEOUT", "1")),
+    alpha=float(os.getenv("SENTIMENT_ALPHA", "0.7")),
+    positive_threshold=float(os.getenv("SENTIMENT_POSITIVE_THRESHOLD", "0.1")),
+    negative_threshold=float(os.getenv("SENTIMENT_NEGATIVE_THRESHOLD", "-0.1")),
+    cache_path=os.getenv("SENTIMENT_CACHE_PATH") or None
+)
+
+def current_version() -> str:
+    """
+    Version du jeu de données actuellement chargé (et non du fichier sur disque) :
+    caches et ETags suivent le snapshot réellement servi et les avis ingérés depuis.
+    """
+    return dataset_store.version()
+
+# Cache des résultats KPI : indexé par la version du jeu de données chargé,
+# il est purgé automatiquement quand un nouveau fichier publié par le pipeline est chargé
+kpi_cache = KPICache(
+    version_fn=current_version,
+    maxsize=int(os.getenv("KPI_CACHE_MAXSIZE", "256"))
+)
 
 
+
+# Requêtes conditionnelles : ETag / Last-Modified liés à la version du dataset, réponse 304
+# sans calcul si le client a déjà la bonne version. KPI_CACHE_CONTROL règle l'en-tête Cache-Control
+# (ex. 'public, max-age=60'). Ajouté avant CORS pour que les 304 reçoivent aussi les en-têtes CORS.
+app.add_middleware(
+    ConditionalRequestMiddleware,
+    version_fn=current_version,
+    last_modified_fn=dataset_store.last_modified,
+    cache_control=os.getenv("KPI_CACHE_CONTROL", DEFAULT_CACHE_CONTROL),
+    exempt_paths=["/cache_stats", "/admin/dataset", "/admin/sentiment_worker", "/metrics", "/debug/memory"]
+)
+
 # Configuration CORS
 origins = [
     "http://localhost",
@@ -50,160 +180,611 @@ app.add_middleware(
    
 )
 
-# Charger le DataFrame nettoyé et enrichi au démarrage de l'API
+# Métriques par route (latence, statut, taille, requêtes en cours) exposées sur /metrics.
+# Ajouté en dernier : c'est le middleware le plus externe, il mesure donc aussi les 304.
+api_metrics = APIMetrics()
+app.add_middleware(MetricsMiddleware, metrics=api_metrics, routes=app.routes)
+set_timing_hook(api_metrics.observe_endpoint)
+
+# Charger le DataFrame nettoyé et enrichi au démarrage de l'API.
+# Le snapshot contient le "serving frame" (colonnes dérivées : heure, jour, semaine ISO, mois,
+# version parsée, calculées une seule fois) et son index de filtrage ; il est partagé en lecture seule.
+# Chaque requête récupère dataset_store.current une seule fois et garde ce snapshot jusqu'au bout.
+# Avec le backend SQL, c'est la base qui est chargée (ou réutilisée si le fichier n'a pas changé).
 try:
-    df = pd.read_csv("Assets/Datas/archive_uber/uber_data_final.csv")
-    df['at'] = pd.to_datetime(df['at'])
+    dataset_store.reload(force=True)
 except FileNotFoundError:
     raise HTTPException(status_code=404, detail="Fichier uber_data_final.csv non trouvé dans le dossier data/")
 
+# Surveillance du fichier (un os.stat toutes les DATA_WATCH_INTERVAL secondes, 0 pour désactiver)
+dataset_store.start_watcher(float(os.getenv("DATA_WATCH_INTERVAL", "30")))
+
+def filter_frame(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = None,
+    sentiment: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Sous-ensemble du serving frame correspondant aux filtres communs des endpoints :
+        - start / end : période incluse ('YYYY-MM', 'YYYY-MM-DD', ...)
+        - version : une ou plusieurs versions (paramètre répétable, '4.556.x' pour une famille)
+        - sentiment : un ou plusieurs sentiments (paramètre répétable)
+    Sans filtre, le serving frame est renvoyé tel quel (aucune copie).
+    """
+    snapshot = dataset_store.current
+    try:
+        return snapshot.index.select(snapshot.frame, start, end, version, sentiment)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Les dates 'start' et 'end' doivent être au format 'YYYY-MM' ou 'YYYY-MM-DD'.")
+
+def sql_kpi(
+    name: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = None,
+    sentiment: Optional[List[str]] = None,
+    **params
+):
+    """
+    Calcule un KPI avec le backend SQL (KPI_BACKEND 'duckdb' ou 'sqlite').
+    Retourne None si le backend pandas est utilisé.
+    """
+    if sql_backend is None:
+        return None
+    try:
+        return sql_backend.compute(name, start, end, version, sentiment, **params)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Les dates 'start' et 'end' doivent être au format 'YYYY-MM' ou 'YYYY-MM-DD'.")
+
+def live_or_frame(
+    name: str,
+    compute,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = None,
+    sentiment: Optional[List[str]] = None,
+    **params
+):
+    """
+    Calcule un KPI : sur les accumulateurs si des avis ingérés ne sont pas encore dans
+    le serving frame et qu'aucun filtre n'est demandé (nouveaux avis visibles immédiatement),
+    sinon avec le backend SQL s'il est configuré, ou avec 'compute' sur le serving frame filtré.
+    """
+    if not (start or end or version or sentiment):
+        accumulators = dataset_store.live_accumulators()
+        if accumulators is not None:
+            return accumulators.compute(name, **params)
+    if sql_backend is not None:
+        return sql_kpi(name, start, end, version, sentiment, **params)
+    return compute(filter_frame(start, end, version, sentiment), **params)
+
+def filter_rollup(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = None,
+    sentiment: Optional[List[str]] = None,
+    freq: Optional[str] = None
+) -> Optional[pd.DataFrame]:
+    """
+    Lignes du cube horaire (heure x version x sentiment) correspondant aux filtres communs,
+    pour les séries temporelles. Retourne None si le cube ne peut pas répondre
+    (fréquence plus fine que l'heure, bornes à la minute) : on calcule alors sur filter_frame.
+    """
+    if freq is not None and not is_hour_aligned(freq):
+        return None
+    try:
+        return dataset_store.current.rollup.select(start, end, version, sentiment)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Les dates 'start' et 'end' doivent être au format 'YYYY-MM' ou 'YYYY-MM-DD'.")
+
+# Index des fréquences de mots : construit au premier appel, une fois par fichier chargé
+# (version et journal, voir DatasetSnapshot.source_tag), puis complété par les avis ajoutés ensuite
+word_index_cache = KPICache(version_fn=lambda: dataset_store.current.source_tag, maxsize=1)
+WORD_INDEX_COLUMNS = ['content', 'sentiment', 'reviewCreatedVersion', 'at', 'day']
+
+def get_word_index(snapshot) -> WordIndex:
+    """
+    Retourne l'index des mots du snapshot : celui du fichier chargé, complété par les lignes
+    ajoutées depuis (lues par morceaux à partir de la dernière ligne indexée).
+    """
+    index = word_index_cache.get_or_compute("word_index", {}, lambda: WordIndex(snapshot.source_tag))
+    if index.source != snapshot.source_tag:
+        # Rechargement pendant la requête : index à part pour ce snapshot
+        index = WordIndex(snapshot.source_tag)
+    try:
+        for start, rows in snapshot.iter_text_frames(index.rows, WORD_INDEX_COLUMNS):
+            index.add(rows, start)
+    except ValueError:
+        # Textes gardés hors du frame et fichier republié : le rechargement est en cours
+        raise HTTPException(status_code=503, detail="Jeu de données en cours de rechargement, réessayez.")
+    return index
+
+def to_payload(result_df: pd.DataFrame, shape: str):
+    """
+    Convertit un résultat KPI tabulaire en payload JSON :
+    'records' (liste d'objets, par défaut) ou 'columns' ({"col": [...]}, pratique pour ECharts).
+    """
+    if shape not in PAYLOAD_SHAPES:
+        raise HTTPException(status_code=400, detail=f"Le paramètre 'shape' doit être parmi {list(PAYLOAD_SHAPES)}.")
+    return frame_to_payload(result_df, shape)
+
 @app.get("/")
+@fast_json
 def read_root():
     """
     Endpoint racine pour vérifier que l'API fonctionne.
     """
     return {"message": "Bienvenue sur l'API des KPI Uber!"}
 
+@app.get("/cache_stats")
+@fast_json
+def cache_stats():
+    """
+    Endpoint pour consulter l'état du cache des KPI (taille, hits, misses).
+    """
+    return kpi_cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Endpoint Prometheus : métriques de l'API au format texte.
+    """
+    return PlainTextResponse(
+        api_metrics.render() + sentiment_worker.metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE
+    )
+
+@app.get("/admin/dataset")
+@fast_json
+def dataset_status():
+    """
+    Endpoint pour consulter le jeu de données servi (version, nombre de lignes, dernier rechargement)
+    et, avec KPI_BACKEND 'duckdb' ou 'sqlite', l'état de la base SQL.
+    """
+    status = dataset_store.status()
+    if sql_backend is not None:
+        status["kpi_backend"] = sql_backend.status()
+    return status
+
+@app.get("/debug/memory")
+@fast_json
+def debug_memory():
+    """
+    Endpoint pour consulter la mémoire du worker : RSS du processus, octets et type de chaque
+    colonne du serving frame, index, cube horaire et textes des avis (dans le frame ou relus à la demande).
+    """
+    memory = process_memory()
+    memory["dataset"] = dataset_store.current.memory_report()
+    return memory
+
+@app.get("/admin/sentiment_worker")
+@fast_json
+def sentiment_worker_status():
+    """
+    Endpoint pour consulter le worker de sentiment (réglages, profondeur de la file, dernière erreur).
+    """
+    return sentiment_worker.status()
+
+@app.post("/admin/reload")
+@fast_json
+def reload_dataset(force: bool = False, wait: bool = False):
+    """
+    Endpoint pour recharger le jeu de données sans redémarrer l'API.
+    Le nouveau fichier est chargé et validé en arrière-plan puis échangé d'un coup ;
+    les requêtes en cours terminent sur l'ancien snapshot.
+    Paramètres :
+        - force : recharger même si la version du fichier n'a pas changé
+        - wait : attendre la fin du rechargement avant de répondre
+    """
+    if wait:
+        dataset_store.reload(force=force)
+    else:
+        dataset_store.reload_in_background(force=force)
+    return dataset_store.status()
+
 @app.get("/total_reviews")
-def total_reviews():
+@fast_json
+@kpi_cache.cached
+def total_reviews(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir le nombre total d'avis.
-    """
-    total = get_total_reviews(df)
+    Avec des filtres, le total est lu dans l'index (cumuls journaliers) sans extraire les lignes.
+    """
+    snapshot = dataset_store.current
+    if not (start or end or version or sentiment) or sql_backend is not None:
+        total = live_or_frame("total_reviews", get_total_reviews, start, end, version, sentiment)
+    else:
+        try:
+            total = snapshot.index.count(start, end, version, sentiment)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Les dates 'start' et 'end' doivent être au format 'YYYY-MM' ou 'YYYY-MM-DD'.")
     return {"total_reviews": total}
 
 @app.get("/score_distribution")
-def score_distribution():
+@fast_json
+@kpi_cache.cached
+def score_distribution(
+    shape: str = "records",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir la distribution des scores.
     """
-    distribution_df = get_score_distribution(df)
-    return distribution_df.to_dict(orient="records")
+    distribution_df = live_or_frame("score_distribution", get_score_distribution, start, end, version, sentiment)
+    return to_payload(distribution_df, shape)
 
 @app.get("/sentiment_ratio")
-def sentiment_ratio():
+@fast_json
+@kpi_cache.cached
+def sentiment_ratio(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir la proportion des sentiments.
     """
-    ratio = get_sentiment_ratio(df)
+    ratio = live_or_frame("sentiment_ratio", get_sentiment_ratio, start, end, version, sentiment)
     return ratio
 
 @app.get("/average_score_over_time")
-def average_score_over_time(freq: Optional[str] = 'M'):
+@fast_json
+@kpi_cache.cached
+def average_score_over_time(
+    freq: Optional[str] = 'M',
+    shape: str = "records",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir la note moyenne des avis par période.
     Paramètre 'freq' : fréquence de regroupement (e.g., 'D', 'W', 'M').
     """
-    avg_score_df = get_average_score_over_time(df, freq)
-    return avg_score_df.to_dict(orient="records")
+    avg_score_df = sql_kpi("average_score_over_time", start, end, version, sentiment, freq=freq)
+    if avg_score_df is None:
+        # Calcul sur le cube horaire : le coût dépend du nombre d'heures, pas du nombre d'avis
+        cube = filter_rollup(start, end, version, sentiment, freq)
+        if cube is not None:
+            avg_score_df = rollup_average_score_over_time(cube, freq)
+        else:
+            avg_score_df = get_average_score_over_time(filter_frame(start, end, version, sentiment), freq)
+    return to_payload(avg_score_df, shape)
 
 @app.get("/reviews_by_version")
-def reviews_by_version():
+@fast_json
+@kpi_cache.cached
+def reviews_by_version(
+    shape: str = "records",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir le nombre d'avis et la note moyenne par version de l'application.
     """
-    reviews_version_df = get_reviews_by_version(df)
-    return reviews_version_df.to_dict(orient="records")
+    reviews_version_df = live_or_frame("reviews_by_version", get_reviews_by_version, start, end, version, sentiment)
+    return to_payload(reviews_version_df, shape)
 
 @app.get("/thumbs_up_distribution")
-def thumbs_up_distribution():
+@fast_json
+@kpi_cache.cached
+def thumbs_up_distribution(
+    shape: str = "records",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir la distribution des 'thumbsUpCount'.
     """
-    thumbs_up_df = get_thumbs_up_distribution(df)
-    return thumbs_up_df.to_dict(orient="records")
+    thumbs_up_df = live_or_frame("thumbs_up_distribution", get_thumbs_up_distribution, start, end, version, sentiment)
+    return to_payload(thumbs_up_df, shape)
 
 @app.get("/combined_sentiment_average")
-def combined_sentiment_average():
+@fast_json
+@kpi_cache.cached
+def combined_sentiment_average(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir la moyenne des scores combinés.
     """
-    avg_combined = get_combined_sentiment_average(df)
+    avg_combined = live_or_frame("combined_sentiment_average", get_combined_sentiment_average, start, end, version, sentiment)
     return {"average_combined_score": round(avg_combined, 2)}
 
 @app.get("/most_common_words")
-def most_common_words(sentiment: str, top_n: Optional[int] = 10):
+@fast_json
+@kpi_cache.cached
+def most_common_words(
+    sentiment: str,
+    top_n: Optional[int] = 10,
+    remove_stop_words: bool = False,
+    version: Optional[List[str]] = Query(None),
+    start: Optional[str] = None,
+    end: Optional[str] = None
+):
     """
     Endpoint pour obtenir les mots les plus fréquents dans les avis d'un certain sentiment.
     Paramètres :
         - sentiment : 'positive', 'negative', ou 'neutral'
         - top_n : nombre de mots à retourner (par défaut 10)
+        - remove_stop_words : ignorer les mots vides ('the', 'and', ...)
+        - version : filtrer sur une ou plusieurs versions (paramètre répétable)
+        - start / end : période incluse ('YYYY-MM', 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM', ...)
+    Les réponses sont lues dans l'index des mots (voir WordIndex), sans relire les textes,
+    sauf ceux du jour coupé par une borne plus fine que le jour.
     """
     if sentiment not in ['positive', 'negative', 'neutral']:
         raise HTTPException(status_code=400, detail="Le sentiment doit être 'positive', 'negative' ou 'neutral'.")
-    
-    common_words = get_most_common_words(df, sentiment, top_n)
+
+    snapshot = dataset_store.current
+    try:
+        common_words = get_word_index(snapshot).most_common(
+            sentiment, top_n, remove_stop_words=remove_stop_words, versions=version, start=start, end=end,
+            edge_rows=lambda day_start, day_end: snapshot.text_rows(day_start, day_end, WORD_INDEX_COLUMNS)
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Les dates 'start' et 'end' doivent être au format 'YYYY-MM' ou 'YYYY-MM-DD'.")
     return {"common_words": common_words}
 
 @app.get("/average_thumbs_up_per_sentiment")
-def average_thumbs_up_per_sentiment():
+@fast_json
+@kpi_cache.cached
+def average_thumbs_up_per_sentiment(
+    shape: str = "records",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir la moyenne des 'thumbsUpCount' par catégorie de sentiment.
     """
-    avg_thumbs_df = get_average_thumbs_up_per_sentiment(df)
-    return avg_thumbs_df.to_dict(orient="records")
+    avg_thumbs_df = live_or_frame("average_thumbs_up_per_sentiment", get_average_thumbs_up_per_sentiment, start, end, version, sentiment)
+    return to_payload(avg_thumbs_df, shape)
 
 @app.get("/review_frequency_by_hour")
-def review_frequency_by_hour():
+@fast_json
+@kpi_cache.cached
+def review_frequency_by_hour(
+    shape: str = "records",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir la fréquence des avis par heure de la journée.
     """
-    frequency_df = get_review_frequency_by_hour(df)
-    return frequency_df.to_dict(orient="records")
+    frequency_df = live_or_frame("review_frequency_by_hour", get_review_frequency_by_hour, start, end, version, sentiment)
+    return to_payload(frequency_df, shape)
 
 @app.get("/top_users_by_reviews")
-def top_users_by_reviews(top_n: Optional[int] = 10):
+@fast_json
+@kpi_cache.cached
+def top_users_by_reviews(
+    top_n: Optional[int] = 10,
+    shape: str = "records",
+    approximate: bool = False,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir les utilisateurs ayant laissé le plus grand nombre d'avis.
     Paramètre 'top_n' : nombre d'utilisateurs à retourner (par défaut 10)
-    """
-    top_users_df = get_top_users_by_reviews(df, top_n)
-    return top_users_df.to_dict(orient="records")
+    Paramètre 'approximate' : top calculé sur des résumés Space-Saving (sans compter tous
+    les utilisateurs), avec pour chaque utilisateur 'max_error' (surestimation maximale
+    de 'review_count') et 'guaranteed' (certainement dans le vrai top). Les résumés étant tenus
+    par mois, les bornes 'start' / 'end' doivent tomber sur des débuts de mois (ex. 'start=2024-03',
+    'end=2024-11') ; sinon, avec un filtre de version ou un 'top_n' supérieur à la capacité
+    des résumés, ou avec le backend SQL (un GROUP BY, sans frame à résumer), le top exact est
+    renvoyé dans le même format (erreur nulle).
+    """
+    # Résumés du frame et des avis en attente de compactage (tenus à jour à chaque ingestion)
+    sketch = dataset_store.top_users
+    if (
+        approximate and sketch is not None and not version and top_n is not None
+        and top_n <= sketch.capacity and TopUsersSketch.covers(start, end)
+    ):
+        return to_payload(sketch.top_users(top_n, sentiment, start, end), shape)
+
+    top_users_df = live_or_frame(
+        "top_users_by_reviews", get_top_users_by_reviews, start, end, version, sentiment, top_n=top_n
+    )
+    if approximate:
+        top_users_df = exact_top_users(top_users_df)
+    return to_payload(top_users_df, shape)
 
 @app.get("/score_thumbs_correlation")
-def score_thumbs_correlation():
+@fast_json
+@kpi_cache.cached
+def score_thumbs_correlation(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir le coefficient de corrélation entre 'score' et 'thumbsUpCount'.
     """
-    correlation = get_score_thumbs_correlation(df)
+    correlation = live_or_frame("score_thumbs_correlation", get_score_thumbs_correlation, start, end, version, sentiment)
     return {"score_thumbs_correlation": round(correlation, 2)}
 
+# Clés de tri acceptées par les endpoints par utilisateur -> colonne du résultat
+USER_SORT_COLUMNS = {
+    "count": "review_count",
+    "score": "average_score",
+    "user": "userName",
+}
+
+def per_user_response(
+    name: str,
+    compute,
+    sort_by: Optional[str],
+    order: str,
+    limit: Optional[int],
+    offset: int,
+    cursor: Optional[str],
+    format: str,
+    shape: str = "records",
+    filters: Optional[dict] = None
+):
+    """
+    Réponse commune des endpoints par utilisateur (une ligne par 'userName').
+
+    Le tableau trié est mis en cache (par version du dataset et par tri), puis on en renvoie :
+    - sans pagination ni format : la liste complète, comme avant ;
+    - avec 'limit' / 'offset' / 'cursor' : une page {"items", "next_cursor", "total"} ;
+    - avec format='ndjson' : un flux NDJSON (une ligne JSON par utilisateur) envoyé au fil
+      de la sérialisation, le curseur suivant étant dans l'en-tête 'X-Next-Cursor'.
+    'filters' contient les filtres communs (start, end, version, sentiment).
+    """
+    filters = filters or {}
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="Le format doit être 'json' ou 'ndjson'.")
+    if sort_by is not None and sort_by not in USER_SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Le tri doit être parmi {list(USER_SORT_COLUMNS)}.")
+
+    try:
+        if cursor is not None:
+            offset = decode_cursor(cursor)
+        table = kpi_cache.get_or_compute(
+            name, {"sort_by": sort_by, "order": order, **filters},
+            lambda: sort_frame(live_or_frame(name, compute, **filters), USER_SORT_COLUMNS.get(sort_by), order)
+        )
+        page, next_cursor = paginate(table, offset, limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    if format == "ndjson":
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return StreamingResponse(iter_ndjson(page), media_type="application/x-ndjson", headers=headers)
+    if limit is None and offset == 0:
+        return to_payload(page, shape)
+    return {"items": to_payload(page, shape), "next_cursor": next_cursor, "total": len(table)}
+
 @app.get("/reviews_per_user")
-def reviews_per_user():
+@fast_json
+def reviews_per_user(
+    limit: Optional[int] = None,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    order: str = "desc",
+    format: str = "json",
+    shape: str = "records",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir le nombre d'avis laissés par chaque utilisateur.
+    Paramètres (optionnels) :
+        - limit / offset / cursor : pagination ('cursor' = 'next_cursor' de la page précédente)
+        - sort_by : 'count' ou 'user', order : 'asc' ou 'desc'
+        - format : 'json' (par défaut) ou 'ndjson' (réponse en flux)
+        - start / end / version / sentiment : filtres communs
     """
-    reviews_user_df = get_reviews_per_user(df)
-    return reviews_user_df.to_dict(orient="records")
+    return per_user_response(
+        "reviews_per_user", get_reviews_per_user, sort_by, order, limit, offset, cursor, format, shape,
+        {"start": start, "end": end, "version": version, "sentiment": sentiment}
+    )
 
 @app.get("/average_score_per_user")
-def average_score_per_user():
+@fast_json
+def average_score_per_user(
+    limit: Optional[int] = None,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    order: str = "desc",
+    format: str = "json",
+    shape: str = "records",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir la note moyenne attribuée par chaque utilisateur.
+    Paramètres (optionnels) :
+        - limit / offset / cursor : pagination ('cursor' = 'next_cursor' de la page précédente)
+        - sort_by : 'score' ou 'user', order : 'asc' ou 'desc'
+        - format : 'json' (par défaut) ou 'ndjson' (réponse en flux)
+        - start / end / version / sentiment : filtres communs
     """
-    avg_score_user_df = get_average_score_per_user(df)
-    return avg_score_user_df.to_dict(orient="records")
+    return per_user_response(
+        "average_score_per_user", get_average_score_per_user, sort_by, order, limit, offset, cursor, format, shape,
+        {"start": start, "end": end, "version": version, "sentiment": sentiment}
+    )
 
 @app.get("/sentiment_trends_by_version")
-def sentiment_trends_by_version(freq: Optional[str] = 'M'):
+@fast_json
+@kpi_cache.cached
+def sentiment_trends_by_version(
+    freq: Optional[str] = 'M',
+    shape: str = "records",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir les tendances de sentiment par version de l'application.
     Paramètre 'freq' : fréquence de regroupement temporel (e.g., 'D', 'W', 'M').
     """
-    sentiment_trends_df = get_sentiment_trends_by_version(df, freq)
+    sentiment_trends_df = sql_kpi("sentiment_trends_by_version", start, end, version, sentiment, freq=freq)
+    if sentiment_trends_df is None:
+        cube = filter_rollup(start, end, version, sentiment, freq)
+        if cube is not None:
+            sentiment_trends_df = rollup_sentiment_trends_by_version(cube, freq)
+        else:
+            sentiment_trends_df = get_sentiment_trends_by_version(filter_frame(start, end, version, sentiment), freq)
     # Convertir les dates en format string pour une meilleure compatibilité JSON
     sentiment_trends_df['at'] = sentiment_trends_df['at'].dt.strftime('%Y-%m-%d')
-    return sentiment_trends_df.to_dict(orient="records")
+    return to_payload(sentiment_trends_df, shape)
 
 
 
 
 @app.get("/monthly_reviews")
-def monthly_reviews():
+@fast_json
+@kpi_cache.cached
+def monthly_reviews(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
     """
     Endpoint pour obtenir le nombre d'avis pour chaque mois.
     """
-    monthly_reviews_df = get_monthly_review_count(df)
+    monthly_reviews_df = sql_kpi("monthly_reviews", start, end, version, sentiment)
+    if monthly_reviews_df is None:
+        cube = filter_rollup(start, end, version, sentiment)
+        if cube is not None:
+            monthly_reviews_df = rollup_monthly_review_count(cube)
+        else:
+            monthly_reviews_df = get_monthly_review_count(filter_frame(start, end, version, sentiment))
     
     
     # Préparer les données pour ECharts
@@ -214,3 +795,143 @@ def monthly_reviews():
     
     
     return data
+
+def format_kpi(name: str, result, shape: str = "records"):
+    """
+    Met en forme le résultat d'un KPI exactement comme son endpoint dédié.
+    """
+    if name == "total_reviews":
+        return {"total_reviews": result}
+    if name == "combined_sentiment_average":
+        return {"average_combined_score": round(result, 2)}
+    if name == "score_thumbs_correlation":
+        return {"score_thumbs_correlation": round(result, 2)}
+    if name == "sentiment_ratio":
+        return result
+    if name == "monthly_reviews":
+        return {"months": result["month"].tolist(), "review_counts": result["review_count"].tolist()}
+    if name == "sentiment_trends_by_version":
+        result = result.assign(at=result["at"].dt.strftime('%Y-%m-%d'))
+    return to_payload(result, shape)
+
+@app.get("/kpis")
+@fast_json
+@kpi_cache.cached
+def kpis(
+    names: Optional[List[str]] = Query(None),
+    freq: Optional[str] = 'M',
+    top_n: Optional[int] = 10,
+    shape: str = "records",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    version: Optional[List[str]] = Query(None),
+    sentiment: Optional[List[str]] = Query(None)
+):
+    """
+    Endpoint pour obtenir plusieurs KPI en une seule requête.
+    Paramètres :
+        - names : KPI à calculer, séparés par des virgules ou répétés
+          (ex. names=sentiment_ratio,top_users_by_reviews) ; tous par défaut
+        - freq, top_n, shape : comme pour les endpoints dédiés
+        - start / end / version / sentiment : filtres communs, appliqués à tous les KPI du lot
+    Les KPI qui regroupent sur les mêmes clés (sentiment, utilisateur, mois) partagent
+    une seule passe de groupby ; chaque entrée de la réponse a le format de son endpoint.
+    """
+    if shape not in PAYLOAD_SHAPES:
+        raise HTTPException(status_code=400, detail=f"Le paramètre 'shape' doit être parmi {list(PAYLOAD_SHAPES)}.")
+    try:
+        requested = parse_kpi_names(names)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    # Sans filtre, les KPI tenus à jour en continu incluent les avis pas encore compactés
+    accumulators = None if (start or end or version or sentiment) else dataset_store.live_accumulators()
+    live_names = [name for name in requested if accumulators is not None and name in LIVE_KPI_NAMES]
+    other_names = [name for name in requested if name not in live_names]
+    if sql_backend is not None:
+        try:
+            results = sql_backend.compute_many(other_names, start, end, version, sentiment, freq=freq, top_n=top_n)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Les dates 'start' et 'end' doivent être au format 'YYYY-MM' ou 'YYYY-MM-DD'.")
+    else:
+        subset = filter_frame(start, end, version, sentiment)
+        cube = filter_rollup(start, end, version, sentiment)
+        results = compute_kpis(subset, other_names, freq=freq, top_n=top_n, rollup=cube)
+    results.update({name: accumulators.compute(name, top_n=top_n) for name in live_names})
+    return {name: format_kpi(name, results[name], shape) for name in requested}
+
+class RawReviewIn(BaseModel):
+    """
+    Avis brut, au format du jeu nettoyé (sans sentiment).
+    'at' vaut l'heure courante (UTC) s'il est absent ; une date avec fuseau est ramenée en UTC.
+    """
+    userName: str
+    content: str
+    score: int = Field(ge=1, le=5)
+    thumbsUpCount: int = Field(default=0, ge=0)
+    reviewCreatedVersion: Optional[str] = None
+    at: Optional[datetime] = None
+
+class ReviewIn(RawReviewIn):
+    """
+    Avis à ingérer, au format du jeu final publié par le pipeline (sentiment déjà calculé).
+    """
+    combined_score: float
+    sentiment: Literal["positive", "negative", "neutral"]
+
+def review_rows(reviews: List[RawReviewIn]) -> List[dict]:
+    """
+    Avis reçus sous forme de lignes, avec 'at' renseigné et ramené en UTC sans fuseau
+    (comme les dates du jeu de données). Lève une 400 si la liste est vide.
+    """
+    if not reviews:
+        raise HTTPException(status_code=400, detail="La liste d'avis est vide.")
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = []
+    for review in reviews:
+        row = review.model_dump()
+        at = row["at"] or now
+        if at.tzinfo is not None:
+            at = at.astimezone(timezone.utc).replace(tzinfo=None)
+        row["at"] = at
+        rows.append(row)
+    return rows
+
+@app.post("/reviews", status_code=201)
+def ingest_reviews(reviews: List[ReviewIn]):
+    """
+    Endpoint pour ajouter des avis sans relancer le pipeline ni redémarrer l'API.
+    Corps : une liste d'avis (voir ReviewIn).
+    Les KPI sans filtre les prennent en compte immédiatement (accumulateurs mis à jour en O(1)
+    par avis) ; les KPI filtrés, les séries temporelles et les mots fréquents après le compactage
+    dans le serving frame (au plus INGEST_COMPACT_INTERVAL secondes).
+    """
+    rows = review_rows(reviews)
+    try:
+        sequence = dataset_store.ingest(pd.DataFrame(rows))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"ingested": len(rows), "sequence": sequence, "pending_reviews": dataset_store.status()["pending_reviews"]}
+
+@app.post("/reviews/raw", status_code=202)
+async def submit_raw_reviews(reviews: List[RawReviewIn]):
+    """
+    Endpoint pour soumettre des avis bruts : le sentiment ('combined_score', 'sentiment') est
+    calculé en arrière-plan par le worker de sentiment, par lots, puis les avis sont publiés
+    comme avec POST /reviews. La réponse est immédiate (202) ; l'avancement se suit
+    sur /admin/sentiment_worker et /metrics.
+    Si la file reste pleine, la requête est refusée (503, en-tête Retry-After) : le client réessaie plus tard.
+    """
+    rows = review_rows(reviews)
+    if not sentiment_worker.available:
+        raise HTTPException(status_code=503, detail="Calcul du sentiment indisponible (TextBlob ou emoji non installé).")
+    try:
+        depth = await sentiment_worker.submit(rows)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except SentimentQueueFull as exc:
+        retry_after = max(1, round(sentiment_worker.max_latency + sentiment_worker.enqueue_timeout))
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": str(retry_after)})
+    return {"queued": len(rows), "queue_depth": depth}
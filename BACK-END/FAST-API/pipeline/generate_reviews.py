@@ -0,0 +1,293 @@
+import argparse
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from storage import FORMAT_EXTENSIONS, DatasetWriter
+
+
+# ------------------------------------------------------------------------
+# Générateur d'avis synthétiques au schéma brut (celui de uber_data.csv),
+# pour tester le pipeline et l'API à des volumes bien plus grands que le jeu réel.
+# Les paramètres par défaut reprennent les proportions observées sur uber_data.csv.
+# ------------------------------------------------------------------------
+
+RAW_COLUMNS = [
+    'userName', 'userImage', 'content', 'score', 'thumbsUpCount',
+    'reviewCreatedVersion', 'at', 'replyContent', 'repliedAt', 'appVersion',
+]
+
+# Répartition des notes (uber_data.csv : 66 % de 5, 22 % de 1)
+SCORE_PROBABILITIES = {1: 0.218, 2: 0.026, 3: 0.028, 4: 0.067, 5: 0.661}
+
+# Taux de valeurs manquantes par colonne
+MISSING_RATES = {
+    'userImage': 1.0,
+    'reviewCreatedVersion': 0.145,  # appVersion manque sur les mêmes lignes
+    'replyContent': 0.99725,        # repliedAt manque sur les mêmes lignes
+}
+
+# Part des avis à 0 pouce levé ; les autres suivent une loi de Pareto (queue lourde)
+THUMBS_ZERO_RATE = 0.954
+THUMBS_PARETO_SHAPE = 1.1
+THUMBS_MAX = 100_000
+
+# Textes courts très dupliqués ("Good" représente ~8 % des avis réels), avec leur poids
+SHORT_TEXTS = {
+    'positive': [
+        ("Good", 985), ("Nice", 309), ("Excellent", 205), ("Good service", 179), ("Very good", 171),
+        ("Great", 121), ("Best", 76), ("Good experience", 71), ("Good 👍", 71), ("good", 64),
+        ("Awesome", 50), ("Super", 40), ("Best app", 35), ("Very nice", 30), ("👍", 25),
+    ],
+    'negative': [
+        ("Bad", 60), ("Worst app", 45), ("Worst", 40), ("Very bad", 35), ("Poor service", 25),
+        ("Bad service", 25), ("Useless", 20), ("Scam", 15), ("Not good", 15), ("👎", 10),
+    ],
+    'neutral': [
+        ("Ok", 40), ("Okay", 25), ("Average", 15), ("Not bad", 15), ("Fine", 10),
+    ],
+}
+SHORT_TEXT_RATE = 0.45
+
+# Nombre de textes longs distincts composés par tonalité et par morceau
+LONG_TEXT_POOL = 5000
+
+# Fragments des avis plus longs, combinés aléatoirement
+PHRASES = {
+    'positive': [
+        "the driver was very friendly", "quick pickup", "clean car", "fair price",
+        "easy to use", "always on time", "great experience overall", "the app works smoothly",
+        "very professional driver", "I use it every day", "safe and comfortable ride",
+    ],
+    'negative': [
+        "the driver cancelled my ride", "I was overcharged", "waited more than 20 minutes",
+        "customer support never answered", "the app keeps crashing", "the price doubled",
+        "the driver took a longer route", "refund still not received", "unsafe driving",
+    ],
+    'neutral': [
+        "the ride was okay", "prices are a bit high", "sometimes the wait is long",
+        "it does the job", "the map is not always accurate", "average experience",
+    ],
+}
+
+REPLY_TEXTS = [
+    "We're sorry to hear about your experience. Please reach out through the Help section of the app.",
+    "Thanks for your feedback! We're glad you enjoy riding with us.",
+    "We'd like to look into this. Please contact us via the app so we can help.",
+]
+
+# Vagues de versions : une nouvelle version tous les RELEASE_INTERVAL_DAYS jours,
+# adoptée progressivement (retard d'adoption géométrique, en nombre de versions)
+FIRST_MINOR_VERSION = 500
+RELEASE_INTERVAL_DAYS = 7
+ADOPTION_PROBABILITY = 0.45
+
+# Heures des avis : plus d'activité en journée et en soirée qu'en pleine nuit
+HOUR_WEIGHTS = np.array([2, 1, 1, 1, 1, 2, 3, 4, 5, 5, 5, 5, 6, 6, 6, 6, 6, 7, 8, 8, 8, 7, 5, 3], dtype=float)
+
+
+def _sentiment_of_scores(scores: np.ndarray) -> np.ndarray:
+    """
+    Tonalité du texte associée à la note (pour que texte et note restent cohérents).
+    """
+    return np.where(scores >= 4, 'positive', np.where(scores <= 2, 'negative', 'neutral'))
+
+
+def _make_contents(rng: np.random.Generator, tones: np.ndarray) -> np.ndarray:
+    """
+    Textes des avis : textes courts tirés selon leur fréquence réelle (nombreux doublons),
+    ou phrases plus longues composées de 1 à 6 fragments. Les textes longs sont tirés
+    dans un lot de LONG_TEXT_POOL textes composés une fois par morceau (pas de boucle par ligne).
+    """
+    contents = np.empty(len(tones), dtype=object)
+    short = rng.random(len(tones)) < SHORT_TEXT_RATE
+    for tone in SHORT_TEXTS:
+        rows = np.flatnonzero(tones == tone)
+        if len(rows) == 0:
+            continue
+        texts, weights = zip(*SHORT_TEXTS[tone])
+        weights = np.array(weights, dtype=float)
+        short_rows = rows[short[rows]]
+        contents[short_rows] = np.array(texts, dtype=object)[
+            rng.choice(len(texts), size=len(short_rows), p=weights / weights.sum())
+        ]
+        phrases = PHRASES[tone]
+        pool = []
+        for _ in range(LONG_TEXT_POOL):
+            text = ", ".join(phrases[i] for i in rng.choice(len(phrases), size=rng.integers(1, 7)))
+            pool.append(text[0].upper() + text[1:] + ".")
+        long_rows = rows[~short[rows]]
+        contents[long_rows] = np.array(pool, dtype=object)[rng.integers(0, LONG_TEXT_POOL, len(long_rows))]
+    return contents
+
+
+def _make_versions(rng: np.random.Generator, at: pd.DatetimeIndex, start: pd.Timestamp) -> np.ndarray:
+    """
+    Version de l'application au moment de l'avis : la dernière version publiée,
+    moins un retard d'adoption (la plupart des utilisateurs ont 0 à 2 versions de retard).
+    """
+    released = ((at - start).days // RELEASE_INTERVAL_DAYS).to_numpy()
+    lag = rng.geometric(ADOPTION_PROBABILITY, size=len(at)) - 1
+    minor = FIRST_MINOR_VERSION + np.maximum(released - lag, 0)
+    # Le numéro de build est fixé par version (même version -> même chaîne)
+    build = 10000 + (minor * 7919) % 6
+    return np.char.add(np.char.add("4.", minor.astype(str)), np.char.add(".", build.astype(str))).astype(object)
+
+
+def generate_reviews_chunk(
+    rng: np.random.Generator,
+    n_rows: int,
+    start: pd.Timestamp,
+    days: int,
+    n_users: int,
+    user_skew: float = 1.1
+) -> pd.DataFrame:
+    """
+    Génère un morceau de n_rows avis au schéma brut.
+    """
+    # Utilisateurs : loi de Zipf tronquée à n_users (quelques utilisateurs très actifs,
+    # une longue traîne d'utilisateurs à un seul avis) ; les rangs trop grands sont re-tirés
+    users = rng.zipf(user_skew, size=n_rows)
+    too_large = users > n_users
+    while too_large.any():
+        users[too_large] = rng.zipf(user_skew, size=too_large.sum())
+        too_large = users > n_users
+    users -= 1
+    user_names = np.char.add("User_", users.astype(str)).astype(object)
+
+    scores = rng.choice(
+        list(SCORE_PROBABILITIES), size=n_rows, p=np.array(list(SCORE_PROBABILITIES.values()))
+    ).astype(np.int64)
+
+    thumbs = np.zeros(n_rows, dtype=np.int64)
+    liked = rng.random(n_rows) >= THUMBS_ZERO_RATE
+    thumbs[liked] = np.minimum(np.floor(rng.pareto(THUMBS_PARETO_SHAPE, liked.sum()) + 1), THUMBS_MAX)
+
+    day_offsets = rng.integers(0, days, size=n_rows)
+    hours = rng.choice(24, size=n_rows, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    seconds = day_offsets * 86400 + hours * 3600 + rng.integers(0, 3600, size=n_rows)
+    at = start + pd.to_timedelta(seconds, unit='s')
+
+    versions = _make_versions(rng, at, start)
+    versions[rng.random(n_rows) < MISSING_RATES['reviewCreatedVersion']] = None
+
+    replied = rng.random(n_rows) >= MISSING_RATES['replyContent']
+    reply_content = np.full(n_rows, None, dtype=object)
+    reply_content[replied] = np.array(REPLY_TEXTS, dtype=object)[rng.integers(0, len(REPLY_TEXTS), replied.sum())]
+    replied_at = pd.Series(pd.NaT, index=range(n_rows), dtype='datetime64[ns]')
+    replied_at[replied] = at[replied] + pd.to_timedelta(rng.integers(1, 72 * 3600, replied.sum()), unit='s')
+
+    user_images = np.full(n_rows, None, dtype=object)
+    has_image = rng.random(n_rows) >= MISSING_RATES['userImage']
+    user_images[has_image] = np.char.add(
+        "https://play-lh.googleusercontent.com/a/", users[has_image].astype(str)
+    )
+
+    return pd.DataFrame({
+        'userName': user_names,
+        # Types 'string' : colonnes parfois vides sur tout un morceau, le schéma Parquet reste stable
+        'userImage': pd.array(user_images, dtype='string'),
+        'content': _make_contents(rng, _sentiment_of_scores(scores)),
+        'score': scores,
+        'thumbsUpCount': thumbs,
+        'reviewCreatedVersion': versions,
+        'at': at,
+        'replyContent': pd.array(reply_content, dtype='string'),
+        'repliedAt': replied_at.to_numpy(),
+        'appVersion': versions.copy(),
+    }, columns=RAW_COLUMNS)
+
+
+def generate_reviews(
+    n_rows: int,
+    seed: int = 0,
+    chunk_size: int = 100_000,
+    start: str = "2024-01-01",
+    days: int = 365,
+    n_users: Optional[int] = None,
+    user_skew: float = 1.1
+) -> Iterator[pd.DataFrame]:
+    """
+    Génère n_rows avis synthétiques, morceau par morceau (jamais plus de chunk_size lignes en mémoire).
+
+    À graine et chunk_size identiques, la sortie est identique d'un run à l'autre :
+    chaque morceau a son propre générateur aléatoire, dérivé de la graine.
+
+    Paramètres
+    ----------
+    n_rows : int
+        Nombre total d'avis.
+    seed : int
+        Graine aléatoire.
+    chunk_size : int
+        Taille des morceaux générés.
+    start : str
+        Date du premier jour couvert.
+    days : int
+        Nombre de jours couverts.
+    n_users : int, optionnel
+        Nombre maximal d'utilisateurs distincts (par défaut n_rows / 2).
+    user_skew : float
+        Exposant de la loi de Zipf des utilisateurs (> 1 ; plus il est grand, plus l'activité
+        est concentrée sur quelques utilisateurs).
+
+    Retour
+    ------
+    Iterator[pd.DataFrame]
+        Morceaux au schéma brut (colonnes RAW_COLUMNS).
+    """
+    start = pd.Timestamp(start)
+    n_users = n_users or max(n_rows // 2, 1)
+    n_chunks = -(-n_rows // chunk_size)
+    for i, child in enumerate(np.random.SeedSequence(seed).spawn(n_chunks)):
+        rows = min(chunk_size, n_rows - i * chunk_size)
+        yield generate_reviews_chunk(np.random.default_rng(child), rows, start, days, n_users, user_skew)
+
+
+def write_synthetic_reviews(
+    output_path: str,
+    n_rows: int,
+    seed: int = 0,
+    chunk_size: int = 100_000,
+    output_format: Optional[str] = None,
+    **kwargs
+) -> str:
+    """
+    Écrit n_rows avis synthétiques dans un fichier (CSV, Parquet ou Feather), en streaming :
+    la mémoire utilisée ne dépend que de chunk_size, pas de n_rows.
+
+    Retour
+    ------
+    str
+        Chemin du fichier écrit.
+    """
+    with DatasetWriter(output_path, fmt=output_format) as writer:
+        for i, chunk in enumerate(generate_reviews(n_rows, seed=seed, chunk_size=chunk_size, **kwargs)):
+            writer.write(chunk)
+            print(f"Morceau {i + 1} : {writer.rows} lignes écrites")
+    return writer.path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère des avis Uber synthétiques au schéma brut.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Nombre d'avis à générer.")
+    parser.add_argument("--seed", type=int, default=0, help="Graine aléatoire.")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Taille des morceaux écrits.")
+    parser.add_argument("--start", default="2024-01-01", help="Premier jour couvert (YYYY-MM-DD).")
+    parser.add_argument("--days", type=int, default=365, help="Nombre de jours couverts.")
+    parser.add_argument("--users", type=int, default=None, help="Nombre maximal d'utilisateurs (rows / 2 par défaut).")
+    parser.add_argument(
+        "--format", dest="output_format", default=None, choices=list(FORMAT_EXTENSIONS),
+        help="Format du fichier (déduit de l'extension par défaut)."
+    )
+    parser.add_argument(
+        "--output", default="Assets/Datas/archive_uber/uber_data_synthetic.csv",
+        help="Fichier de sortie."
+    )
+    args = parser.parse_args()
+
+    path = write_synthetic_reviews(
+        args.output, args.rows, seed=args.seed, chunk_size=args.chunk_size,
+        output_format=args.output_format, start=args.start, days=args.days, n_users=args.users
+    )
+    print("Fichier de sortie généré :", path)
@@ -1,54 +1,60 @@
+import argparse
+import json
+import os
+from typing import Optional
+
 import pandas as pd
-from sentiment_note_gen import generate_sentiment_with_score_csv
+from profiling import NullProfiler, RunProfiler
+from sentiment_note_gen import add_sentiment_columns, generate_sentiment_with_score_csv
+from storage import (
+    FORMAT_EXTENSIONS,
+    REVIEW_KEY_COLUMNS,
+    DatasetWriter,
+    append_dataset,
+    read_dataset,
+    rows_contained_in,
+    with_format,
+    write_dataset
+)
 
 
-def clean_uber_data_notebook_style(
-    input_csv: str = "../Assets/Datas/archive_uber/uber_data.csv",
-    output_csv: str = "../Assets/Datas/archive_uber/uber_data_cleaned.csv"
-) -> pd.DataFrame:
+def clean_reviews(df: pd.DataFrame, profiler=None) -> pd.DataFrame:
     """
-    les étapes de nettoyage Uber Reviews.
-    
-    1. Lecture du fichier CSV d'entrée
-    2. Drop des colonnes inutiles ('userImage')
-    3. Fusion de 'reviewCreatedVersion' et 'appVersion'
-    4. Suppression de 'appVersion' (devenue redondante)
-    5. Conversion de 'at' en datetime
-    6. Conversion de 'repliedAt' en datetime (si besoin)
-    7. Gérer les manquants dans 'replyContent' (remplir par 'No reply')
-    8. Vérification du type pour 'score' et 'thumbsUpCount'
-    9. (Optionnel) Création de la colonne 'response_time_hours'
-    10. Supprimer les colonnes 'replyContent' et 'repliedAt' (finalement jugées inutiles)
-    11. Supprimer les lignes qui restent vides (df.dropna)
-    12. Sauvegarder le résultat dans un CSV final
+    Étapes 2 à 11 du nettoyage (voir clean_uber_data_notebook_style), appliquées
+    à un DataFrame brut déjà chargé. Le DataFrame est modifié en place et retourné.
+    'profiler' (RunProfiler, optionnel) mesure chaque étape.
     """
+    profiler = profiler or NullProfiler()
 
-    # 1. Lecture du CSV
-    df = pd.read_csv(input_csv)
-    
     # 2. Drop des colonnes inutiles
     #    (Comme dans le notebook : "df.drop(columns=['userImage'], inplace=True)  # On n'en a pas besoin")
     if 'userImage' in df.columns:
         df.drop(columns=['userImage'], inplace=True)  # On n'en a pas besoin
+    profiler.lap("2. suppression de userImage", rows_out=len(df))
 
     # 3. Gérer les versions : si 'reviewCreatedVersion' est vide, on met 'appVersion'
     df['reviewCreatedVersion'] = df['reviewCreatedVersion'].fillna(df['appVersion'])
+    profiler.lap("3. fusion des versions", rows_out=len(df))
 
     # 4. Choisir de supprimer 'appVersion' après ce merge si elles sont redondantes
     if 'appVersion' in df.columns:
         df.drop(columns=['appVersion'], inplace=True)
+    profiler.lap("4. suppression de appVersion", rows_out=len(df))
 
     # 5. Convertir la colonne 'at' en datetime
     df['at'] = pd.to_datetime(df['at'], errors='coerce')
+    profiler.lap("5. conversion de at", rows_out=len(df))
 
     # 6. Convertir la colonne 'repliedAt' en datetime (si besoin)
     if 'repliedAt' in df.columns:
         df['repliedAt'] = pd.to_datetime(df['repliedAt'], errors='coerce')
+    profiler.lap("6. conversion de repliedAt", rows_out=len(df))
 
     # 7. Gérer les manquants dans 'replyContent'
     #    (remplir par 'No reply')
     if 'replyContent' in df.columns:
         df['replyContent'] = df['replyContent'].fillna('No reply')
+    profiler.lap("7. remplissage de replyContent", rows_out=len(df))
 
     # 8. Vérification du type sur 'score' et 'thumbsUpCount'
     #    (conversion en int, en remplissant éventuellement par 0)
@@ -56,6 +62,7 @@ def clean_uber_data_notebook_style(
         df['score'] = df['score'].astype(int)
     if 'thumbsUpCount' in df.columns:
         df['thumbsUpCount'] = df['thumbsUpCount'].fillna(0).astype(int)
+    profiler.lap("8. types de score et thumbsUpCount", rows_out=len(df))
 
     # (Comme dans le notebook, un petit df.info() et df.head() pouvaient suivre ici,
     #  mais on les commente ou on les supprime dans la fonction.)
@@ -71,47 +78,383 @@ def clean_uber_data_notebook_style(
         cols_to_drop_final.append('replyContent')
     if 'repliedAt' in df.columns:
         cols_to_drop_final.append('repliedAt')
-    
+
     if cols_to_drop_final:
         df.drop(columns=cols_to_drop_final, inplace=True)
+    profiler.lap("10. suppression de replyContent et repliedAt", rows_out=len(df))
 
     # "apres avoir supprimer un, supprimer les ligne qui ont les cases vides"
     df.dropna(inplace=True)
+    profiler.lap("11. suppression des lignes incomplètes", rows_out=len(df))
+
+    return df
+
+
+def load_watermark(watermark_path: str) -> Optional[pd.Timestamp]:
+    """
+    Lit la "high-water mark" du mode incrémental : le plus grand 'at' déjà traité.
+
+    Seul le fichier de watermark du pipeline fait foi : le jeu final contient aussi les avis
+    ingérés par l'API (voir fold_ingest_journal), dont le 'at' peut dépasser celui d'avis bruts
+    jamais traités. Retourne None sans fichier de watermark (run complet).
+    """
+    if os.path.exists(watermark_path):
+        with open(watermark_path, encoding="utf-8") as f:
+            return pd.Timestamp(json.load(f)["at"])
+    return None
+
+
+def save_watermark(watermark_path: str, watermark: pd.Timestamp) -> None:
+    """
+    Enregistre la watermark de façon atomique (fichier temporaire puis os.replace),
+    pour ne jamais laisser un fichier à moitié écrit si le run est interrompu.
+    """
+    tmp_path = watermark_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"at": watermark.isoformat()}, f)
+    os.replace(tmp_path, watermark_path)
+
+
+def fold_ingest_journal(output_file: str, journal_path: Optional[str]) -> int:
+    """
+    Ajoute au jeu final les avis ingérés par l'API (journal, voir DatasetStore.ingest)
+    qui n'y sont pas encore (comparaison sur REVIEW_KEY_COLUMNS).
+
+    Le pipeline ne modifie pas le journal : quand l'API recharge le jeu republié, elle retire
+    elle-même du journal les avis qu'il contient désormais, ce qui le garde petit.
+
+    Retour
+    ------
+    int
+        Nombre d'avis ajoutés au jeu final.
+    """
+    if not journal_path or not os.path.exists(journal_path) or not os.path.exists(output_file):
+        return 0
+    journal = read_dataset(journal_path)
+    existing = read_dataset(output_file, columns=REVIEW_KEY_COLUMNS)
+    new_rows = journal[~rows_contained_in(journal, existing)]
+    if len(new_rows):
+        append_dataset(new_rows, output_file)
+        print(f"Journal d'ingestion : {len(new_rows)} avis ajoutés au jeu final")
+    return len(new_rows)
+
+
+def clean_uber_data_streaming(
+    input_csv: str,
+    output_csv: str,
+    output_file: str,
+    chunk_size: int,
+    output_format: str = "csv",
+    workers: int = 1,
+    polarity_cache: Optional[str] = None,
+    watermark: Optional[pd.Timestamp] = None,
+    profiler=None,
+    positive_threshold: float = 0.1,
+    negative_threshold: float = -0.1
+) -> tuple:
+    """
+    Variante "streaming" du pipeline pour les fichiers plus gros que la RAM.
+
+    Le CSV d'entrée est lu par morceaux de 'chunk_size' lignes (pd.read_csv(chunksize=...)).
+    Chaque morceau passe par les mêmes étapes de nettoyage (clean_reviews), est ajouté au
+    fichier nettoyé, puis reçoit ses colonnes de sentiment et est ajouté au fichier final.
+    Le pic mémoire dépend donc de 'chunk_size' et non de la taille du fichier.
+
+    Si 'watermark' est fournie (mode incrémental), seules les lignes plus récentes sont
+    traitées et ajoutées aux fichiers existants (CSV uniquement, voir DatasetWriter).
+
+    Retour
+    ------
+    tuple
+        (aperçu des 5 premières lignes finales, plus grand 'at' traité ou None)
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size doit être strictement positif.")
+    profiler = profiler or NullProfiler()
+
+    append = watermark is not None
+    preview = None
+    max_at = None
+    rows_in = 0
+    cache_stats = {}
+
+    with DatasetWriter(output_csv, fmt=output_format, append=append) as cleaned_writer, \
+            DatasetWriter(output_file, fmt=output_format, append=append) as final_writer:
+        for i, chunk in enumerate(pd.read_csv(input_csv, chunksize=chunk_size)):
+            rows_in += len(chunk)
+            if watermark is not None:
+                chunk = chunk[pd.to_datetime(chunk['at'], errors='coerce') > watermark].copy()
+            profiler.lap("1. lecture du CSV", rows_out=len(chunk), rows_in=0)
+
+            # 2. à 11. Nettoyage du morceau
+            chunk = clean_reviews(chunk, profiler)
+            if chunk.empty:
+                continue
+
+            # 12. Écriture incrémentale du morceau nettoyé, puis du morceau avec sentiment
+            cleaned_writer.write(chunk)
+            profiler.lap("12. écriture du fichier nettoyé", rows_out=len(chunk))
+            chunk = add_sentiment_columns(
+                chunk,
+                alpha=0.7,
+                positive_threshold=positive_threshold,
+                negative_threshold=negative_threshold,
+                workers=workers,
+                chunk_size=max(1, len(chunk) // max(workers, 1)),
+                cache_path=polarity_cache,
+                profiler=profiler,
+                cache_stats=cache_stats
+            )
+            final_writer.write(chunk)
+            profiler.lap("sentiment : écriture", rows_out=len(chunk))
+
+            chunk_max = chunk['at'].max()
+            max_at = chunk_max if max_at is None else max(max_at, chunk_max)
+            if preview is None:
+                preview = chunk.head(5)
+            print(f"Morceau {i + 1} : {rows_in} lignes lues, {final_writer.rows} lignes écrites")
+            if cache_stats:
+                print("Cache de polarité :", cache_stats)
+
+    print("Fichier de sortie généré traitemnt data de base :", cleaned_writer.path)
+    print("Fichier de sortie généré avec les sentiement traiter :", final_writer.path)
+    return preview, max_at
+
+
+def clean_uber_data_notebook_style(
+    input_csv: str = "../Assets/Datas/archive_uber/uber_data.csv",
+    output_csv: str = "../Assets/Datas/archive_uber/uber_data_cleaned.csv",
+    output_format: str = "csv",
+    workers: int = 1,
+    polarity_cache: Optional[str] = None,
+    incremental: bool = False,
+    watermark_path: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    profiler: Optional[RunProfiler] = None,
+    positive_threshold: float = 0.1,
+    negative_threshold: float = -0.1,
+    ingest_journal: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    les étapes de nettoyage Uber Reviews.
+
+    1. Lecture du fichier CSV d'entrée
+    2. Drop des colonnes inutiles ('userImage')
+    3. Fusion de 'reviewCreatedVersion' et 'appVersion'
+    4. Suppression de 'appVersion' (devenue redondante)
+    5. Conversion de 'at' en datetime
+    6. Conversion de 'repliedAt' en datetime (si besoin)
+    7. Gérer les manquants dans 'replyContent' (remplir par 'No reply')
+    8. Vérification du type pour 'score' et 'thumbsUpCount'
+    9. (Optionnel) Création de la colonne 'response_time_hours'
+    10. Supprimer les colonnes 'replyContent' et 'repliedAt' (finalement jugées inutiles)
+    11. Supprimer les lignes qui restent vides (df.dropna)
+    12. Sauvegarder le résultat dans un CSV final
+
+    'output_format' choisit le format des fichiers écrits ('csv', 'parquet' ou 'feather').
+    Les formats colonnes conservent les types (category, datetime64, petits entiers)
+    et évitent de re-parser le CSV au démarrage de l'API ; le CSV reste le format par défaut.
+    'workers' est transmis à generate_sentiment_with_score_csv (scoring multi-cœurs si > 1).
+    'polarity_cache' est le fichier SQLite du cache de polarités (None = pas de cache).
+    'positive_threshold' / 'negative_threshold' sont les seuils de classification du sentiment
+    (voir classify_combined_batch), à garder identiques à ceux du worker de l'API.
+
+    Mode incrémental ('incremental=True') :
+    seules les lignes dont 'at' est strictement postérieur à la watermark (dernier 'at' traité)
+    sont nettoyées et scorées, puis ajoutées à la fin des fichiers nettoyé et final existants.
+    La watermark est stockée dans 'watermark_path' (par défaut '<fichier final>.watermark.json')
+    et mise à jour une fois les fichiers écrits, après chaque run (complet ou non).
+    Sans fichier de watermark (premier run), tout est traité comme en mode complet.
+    La fonction retourne alors uniquement les nouvelles lignes nettoyées.
+
+    Mode streaming ('chunk_size' renseigné) : le fichier d'entrée est traité par morceaux
+    de 'chunk_size' lignes et les sorties sont écrites au fil de l'eau
+    (voir clean_uber_data_streaming). Le jeu complet n'étant jamais en mémoire,
+    la fonction retourne seulement un aperçu des premières lignes.
+
+    'profiler' (RunProfiler, optionnel) mesure chaque étape : temps réel, temps CPU,
+    pic de mémoire et lignes en entrée / sortie (voir profiling.py).
+
+    'ingest_journal' : journal des avis ingérés par l'API. Ses avis absents du jeu final y sont
+    ajoutés à la fin du run (voir fold_ingest_journal) ; l'API les retire ensuite du journal.
+    """
+    profiler = profiler or NullProfiler()
+
+    output_file = with_format("Assets/Datas/archive_uber/uber_data_final.csv", output_format)
+    if watermark_path is None:
+        watermark_path = os.path.splitext(output_file)[0] + ".watermark.json"
+    watermark = load_watermark(watermark_path) if incremental else None
+
+    if chunk_size:
+        preview, max_at = clean_uber_data_streaming(
+            input_csv=input_csv,
+            output_csv=output_csv,
+            output_file=output_file,
+            chunk_size=chunk_size,
+            output_format=output_format,
+            workers=workers,
+            polarity_cache=polarity_cache,
+            watermark=watermark,
+            profiler=profiler,
+            positive_threshold=positive_threshold,
+            negative_threshold=negative_threshold
+        )
+        fold_ingest_journal(output_file, ingest_journal)
+        profiler.lap("13. ajout du journal d'ingestion", rows_in=0)
+        if max_at is not None:
+            save_watermark(watermark_path, max_at)
+        return preview if preview is not None else pd.DataFrame()
+
+    # 1. Lecture du CSV
+    df = pd.read_csv(input_csv)
+
+    # En mode incrémental, on ne garde que les avis plus récents que la watermark
+    if watermark is not None:
+        df = df[pd.to_datetime(df['at'], errors='coerce') > watermark].copy()
+        print(f"Mode incrémental : {len(df)} nouvelles lignes après {watermark}")
+    profiler.lap("1. lecture du CSV", rows_out=len(df), rows_in=0)
+
+    # 2. à 11. Nettoyage
+    df = clean_reviews(df, profiler)
+
+    if watermark is not None and df.empty:
+        print("Aucun nouvel avis à traiter.")
+        fold_ingest_journal(output_file, ingest_journal)
+        profiler.lap("13. ajout du journal d'ingestion", rows_in=0)
+        return df
+
+    # 12. Sauvegarde du DataFrame final (CSV, Parquet ou Feather selon output_format)
+    if watermark is not None:
+        output_csv = append_dataset(df, with_format(output_csv, output_format))
+    else:
+        output_csv = write_dataset(df, output_csv, fmt=output_format)
+    profiler.lap("12. écriture du fichier nettoyé", rows_out=len(df))
 
-    # 12. Sauvegarde du DataFrame final
-    df.to_csv(output_csv, index=False)
-    
     #  message pour confirmer que tout s'est bien passé
     print("Fichier de sortie généré traitemnt data de base :", output_csv)
-    
-    
-    input_file = "Assets/Datas/archive_uber/uber_data_cleaned.csv"
-    output_file = "Assets/Datas/archive_uber/uber_data_final.csv"
-
-    # Appel de la fonction, avec un alpha à 70%
-    df_result = generate_sentiment_with_score_csv(
-        input_csv=input_file,
-        output_csv=output_file,
-        alpha=0.7
-    )
-    
+
+
+    input_file = output_csv
+
+    if watermark is not None:
+        # Seules les nouvelles lignes passent par le calcul du sentiment, puis sont ajoutées au jeu final
+        cache_stats = {}
+        df_result = add_sentiment_columns(
+            df.copy(),
+            alpha=0.7,
+            positive_threshold=positive_threshold,
+            negative_threshold=negative_threshold,
+            workers=workers,
+            cache_path=polarity_cache,
+            profiler=profiler,
+            cache_stats=cache_stats
+        )
+        if cache_stats:
+            print("Cache de polarité :", cache_stats)
+        append_dataset(df_result, output_file)
+        profiler.lap("sentiment : écriture", rows_out=len(df_result))
+    else:
+        # Appel de la fonction, avec un alpha à 70%
+        df_result = generate_sentiment_with_score_csv(
+            input_csv=input_file,
+            output_csv=output_file,
+            alpha=0.7,
+            positive_threshold=positive_threshold,
+            negative_threshold=negative_threshold,
+            workers=workers,
+            cache_path=polarity_cache,
+            profiler=profiler
+        )
+
+    # 13. Avis ingérés par l'API depuis le dernier run
+    fold_ingest_journal(output_file, ingest_journal)
+    profiler.lap("13. ajout du journal d'ingestion", rows_in=0)
+
+    # La watermark est aussi mise à jour après un run complet : un run incrémental
+    # lancé ensuite ne ré-ajoutera pas des avis déjà présents dans le jeu final
+    if df['at'].notna().any():
+        save_watermark(watermark_path, df['at'].max())
+
     #  message pour confirmer que tout s'est bien passé
     print("Fichier de sortie généré avec les sentiement traiter :", output_file)
     print("Aperçu du DataFrame :")
     print(df_result.head(5))
 
-    
-    
-    
+
+
+
     return df
 
 
 
 if __name__ == "__main__":
     # Appel direct de la fonction pour tester
-    
+    parser = argparse.ArgumentParser(description="Pipeline de nettoyage et de sentiment des avis Uber.")
+    parser.add_argument(
+        "--format", dest="output_format", default="csv", choices=list(FORMAT_EXTENSIONS),
+        help="Format des fichiers générés (csv par défaut, parquet/feather pour un chargement typé et rapide)."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Nombre de processus pour le calcul du sentiment (1 = séquentiel)."
+    )
+    parser.add_argument(
+        "--polarity-cache", default="Assets/Datas/archive_uber/polarity_cache.sqlite",
+        help="Fichier SQLite du cache de polarités TextBlob (réutilisé d'un run à l'autre)."
+    )
+    parser.add_argument(
+        "--no-polarity-cache", action="store_true",
+        help="Désactive le cache de polarités : tous les textes sont re-scorés."
+    )
+    parser.add_argument(
+        "--positive-threshold", type=float, default=0.1,
+        help="Au-dessus de ce combined_score, l'avis est classé 'positive'."
+    )
+    parser.add_argument(
+        "--negative-threshold", type=float, default=-0.1,
+        help="En dessous de ce combined_score, l'avis est classé 'negative'."
+    )
+    parser.add_argument(
+        "--ingest-journal", default="Assets/Datas/archive_uber/uber_data_ingested.csv",
+        help="Journal des avis ingérés par l'API (POST /reviews), ajoutés au jeu final à chaque run."
+    )
+    parser.add_argument(
+        "--no-ingest-journal", action="store_true",
+        help="N'ajoute pas les avis du journal d'ingestion au jeu final."
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Ne traite que les avis plus récents que la watermark et les ajoute aux fichiers existants."
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=None,
+        help="Traitement en streaming par morceaux de N lignes (fichiers plus gros que la RAM)."
+    )
+    parser.add_argument(
+        "--profile-report", default=None,
+        help="Écrit un rapport JSON par étape (temps réel, CPU, pic mémoire, lignes) dans ce fichier."
+    )
+    parser.add_argument(
+        "--cprofile-dir", default=None,
+        help="Avec --profile-report : écrit aussi un fichier cProfile (.prof) par étape dans ce dossier."
+    )
+    args = parser.parse_args()
+
+    profiler = RunProfiler(cprofile_dir=args.cprofile_dir) if args.profile_report else None
     clean_uber_data_notebook_style(
         input_csv="Assets/Datas/archive_uber/uber_data.csv",
-        output_csv="Assets/Datas/archive_uber/uber_data_cleaned.csv"
+        output_csv="Assets/Datas/archive_uber/uber_data_cleaned.csv",
+        output_format=args.output_format,
+        workers=args.workers,
+        polarity_cache=None if args.no_polarity_cache else args.polarity_cache,
+        incremental=args.incremental,
+        chunk_size=args.chunk_size,
+        profiler=profiler,
+        positive_threshold=args.positive_threshold,
+        negative_threshold=args.negative_threshold,
+        ingest_journal=None if args.no_ingest_journal else args.ingest_journal
     )
-    print("Traitement effectué.")
\ No newline at end of file
+    if profiler is not None:
+        profiler.write_report(args.profile_report)
+        print("Rapport de profilage :", args.profile_report)
+    print("Traitement effectué.")
@@ -0,0 +1,163 @@
+import hashlib
+import sqlite3
+import time
+from typing import Callable
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalise un texte d'avis avant le calcul de sa clé de cache.
+
+    On se contente de retirer les espaces en début/fin et de fusionner les espaces
+    multiples : TextBlob découpe sur les espaces, la polarité est donc inchangée.
+    La casse et la ponctuation sont conservées car elles peuvent modifier la polarité.
+    """
+    return " ".join(text.split())
+
+
+def text_key(text: str) -> str:
+    """
+    Clé de cache d'un texte : empreinte SHA-1 du texte normalisé.
+    """
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class PolarityCache:
+    """
+    Cache persistant (SQLite) des polarités TextBlob, indexé par l'empreinte du texte normalisé.
+
+    Beaucoup d'avis Uber sont des textes courts identiques ("Good", "Nice", ...) :
+    - dans un même run, chaque texte distinct n'est scoré qu'une fois ;
+    - d'un run à l'autre, seuls les textes jamais vus sont scorés.
+
+    La taille est bornée par 'max_entries' : au-delà, les entrées les moins
+    récemment utilisées sont supprimées.
+
+    Paramètres
+    ----------
+    path : str
+        Chemin du fichier SQLite (créé s'il n'existe pas).
+    max_entries : int
+        Nombre maximal de textes conservés (par défaut 1 000 000).
+    """
+
+    def __init__(self, path: str, max_entries: int = 1_000_000):
+        if max_entries <= 0:
+            raise ValueError("max_entries doit être strictement positif.")
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS polarity ("
+            " key TEXT PRIMARY KEY,"
+            " polarity REAL NOT NULL,"
+            " used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_polarity_used_at ON polarity(used_at)")
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Ferme la connexion SQLite.
+        """
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM polarity").fetchone()[0]
+
+    def _lookup(self, keys: list) -> dict:
+        """
+        Renvoie {clé: polarité} pour les clés présentes, et marque ces entrées comme utilisées.
+        Les requêtes sont découpées pour rester sous la limite de paramètres de SQLite.
+        """
+        found = {}
+        now = time.time()
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, polarity FROM polarity WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            found.update(rows)
+            self._conn.execute(
+                f"UPDATE polarity SET used_at = ? WHERE key IN ({placeholders})", [now, *batch]
+            )
+        return found
+
+    def _store(self, items: dict) -> None:
+        """
+        Enregistre les nouvelles polarités puis applique la borne de taille (éviction LRU).
+        """
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO polarity (key, polarity, used_at) VALUES (?, ?, ?)",
+            [(key, polarity, now) for key, polarity in items.items()]
+        )
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM polarity WHERE key IN ("
+                " SELECT key FROM polarity ORDER BY used_at LIMIT ?)",
+                (excess,)
+            )
+
+    def polarities(self, texts: list, scorer: Callable[[list], list]) -> list:
+        """
+        Renvoie la polarité de chaque texte, en ne scorant que les textes absents du cache.
+
+        Paramètres
+        ----------
+        texts : list
+            Textes des avis. Les valeurs qui ne sont pas des chaînes valent 0.0 (neutre),
+            comme dans get_text_polarity, et ne sont pas mises en cache.
+        scorer : Callable[[list], list]
+            Fonction qui calcule les polarités d'une liste de textes distincts
+            (séquentielle ou multi-processus).
+
+        Retour
+        ------
+        list
+            Polarités alignées sur 'texts'.
+        """
+        keys = [text_key(text) if isinstance(text, str) else None for text in texts]
+
+        # Un seul représentant par texte distinct
+        unique = {}
+        for text, key in zip(texts, keys):
+            if key is not None and key not in unique:
+                unique[key] = text
+
+        known = self._lookup(list(unique))
+        missing = [key for key in unique if key not in known]
+        self.hits += len(unique) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            scored = scorer([unique[key] for key in missing])
+            new_items = dict(zip(missing, scored))
+            self._store(new_items)
+            known.update(new_items)
+        self._conn.commit()
+
+        return [known[key] if key is not None else 0.0 for key in keys]
+
+    def stats(self) -> dict:
+        """
+        Statistiques du cache : hits/misses (textes distincts) et taille actuelle.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self),
+            "max_entries": self.max_entries,
+        }
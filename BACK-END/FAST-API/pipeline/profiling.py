@@ -0,0 +1,219 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows : pas de getrusage, le pic mémoire n'est pas mesuré
+    resource = None
+
+
+def _reset_peak_rss() -> bool:
+    """
+    Remet à zéro le pic de mémoire résidente du processus (Linux : /proc/self/clear_refs).
+    Retourne False si ce n'est pas possible : le pic mesuré est alors celui de tout le processus.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """
+    Pic de mémoire résidente du processus, en octets (VmHWM sous Linux, sinon getrusage).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilo-octets ailleurs
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _children_cpu_seconds() -> float:
+    """
+    Temps CPU cumulé des processus enfants terminés (ex. pool de calcul du sentiment).
+    """
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class NullProfiler:
+    """
+    Profileur inactif : lap() et record() ne font rien. Utilisé quand aucun rapport n'est demandé.
+    """
+
+    def lap(self, name: str, rows_out: Optional[int] = None, rows_in: Optional[int] = None) -> None:
+        pass
+
+    def record(self, name: str, time_s: float, part_of: str, calls: Optional[int] = None) -> None:
+        pass
+
+
+class RunProfiler:
+    """
+    Mesure chaque étape du pipeline : temps réel, temps CPU (processus et enfants),
+    pic de mémoire résidente et nombre de lignes en entrée / sortie.
+
+    Fonctionne comme un chronomètre à tours : lap(nom) clôt l'étape qui vient de se terminer
+    (tout ce qui s'est passé depuis le lap précédent). Une étape appelée plusieurs fois
+    (mode streaming : une fois par morceau) est cumulée sous le même nom. record() ajoute
+    des sous-étapes chronométrées à l'intérieur d'une étape (ex. demojize et TextBlob).
+
+    Paramètres
+    ----------
+    cprofile_dir : str, optionnel
+        Dossier où écrire un fichier cProfile (.prof) par étape, lisible avec pstats
+        ou snakeviz. Le rapport contient alors aussi les fonctions les plus coûteuses
+        de chaque étape (ex. demojize vs TextBlob dans le calcul du sentiment).
+        Les processus du pool (workers > 1) ne sont pas profilés par cProfile.
+    """
+
+    def __init__(self, cprofile_dir: Optional[str] = None):
+        self.cprofile_dir = cprofile_dir
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.stages = {}
+        self._stats = {}
+        self._rows = None
+        self._t0 = time.perf_counter()
+        self._start_mark()
+
+    def _start_mark(self) -> None:
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._children_cpu = _children_cpu_seconds()
+        self._peak_scope = "stage" if _reset_peak_rss() else "process"
+        self._profile = None
+        if self.cprofile_dir:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def lap(self, name: str, rows_out: Optional[int] = None, rows_in: Optional[int] = None) -> None:
+        """
+        Clôt l'étape 'name' (depuis le lap précédent) et démarre la mesure de la suivante.
+
+        Paramètres
+        ----------
+        name : str
+            Nom de l'étape (ex. '5. conversion de at').
+        rows_out : int, optionnel
+            Nombre de lignes après l'étape ; le nombre de lignes en entrée est
+            celui en sortie de l'étape précédente.
+        rows_in : int, optionnel
+            Nombre de lignes en entrée, s'il ne vient pas de l'étape précédente
+            (ex. 0 pour la lecture d'un morceau en mode streaming).
+        """
+        if self._profile is not None:
+            self._profile.disable()
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        children_cpu = _children_cpu_seconds() - self._children_cpu
+        peak = _peak_rss_bytes()
+
+        stage = self.stages.setdefault(name, {
+            "calls": 0, "wall_time_s": 0.0, "cpu_time_s": 0.0, "children_cpu_time_s": 0.0,
+            "peak_rss_bytes": None, "peak_rss_scope": self._peak_scope, "rows_in": None, "rows_out": None,
+        })
+        stage["calls"] += 1
+        stage["wall_time_s"] += wall
+        stage["cpu_time_s"] += cpu
+        stage["children_cpu_time_s"] += children_cpu
+        if peak is not None:
+            stage["peak_rss_bytes"] = max(stage["peak_rss_bytes"] or 0, peak)
+        if rows_in is None:
+            rows_in = self._rows
+        if rows_in is not None:
+            stage["rows_in"] = (stage["rows_in"] or 0) + rows_in
+        if rows_out is not None:
+            stage["rows_out"] = (stage["rows_out"] or 0) + rows_out
+            self._rows = rows_out
+
+        if self._profile is not None:
+            if name in self._stats:
+                self._stats[name].add(self._profile)
+            else:
+                self._stats[name] = pstats.Stats(self._profile)
+        self._start_mark()
+
+    def record(self, name: str, time_s: float, part_of: str, calls: Optional[int] = None) -> None:
+        """
+        Ajoute une sous-étape mesurée à l'intérieur d'une étape (ex. demojize et TextBlob, dont
+        les appels s'alternent texte par texte et ne peuvent pas être séparés par lap()).
+
+        Paramètres
+        ----------
+        name : str
+            Nom de la sous-étape.
+        time_s : float
+            Temps cumulé des appels ; en mode parallèle, somme des temps de tous les processus.
+        part_of : str
+            Nom de l'étape qui contient la sous-étape.
+        calls : int, optionnel
+            Nombre d'appels mesurés (ex. textes scorés).
+        """
+        stage = self.stages.setdefault(name, {"part_of": part_of, "calls": 0, "time_s": 0.0})
+        stage["calls"] += calls or 0
+        stage["time_s"] += time_s
+
+    def _top_functions(self, name: str, limit: int = 15) -> list:
+        """
+        Fonctions les plus coûteuses d'une étape (temps cumulé), d'après cProfile.
+        """
+        stats = self._stats[name]
+        entries = []
+        for (filename, line, function), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            entries.append({
+                "function": f"{os.path.basename(filename)}:{line}({function})",
+                "calls": ncalls,
+                "own_time_s": tottime,
+                "cumulative_time_s": cumtime,
+            })
+        entries.sort(key=lambda entry: entry["cumulative_time_s"], reverse=True)
+        return entries[:limit]
+
+    def report(self) -> dict:
+        """
+        Rapport du run : une entrée par étape, dans l'ordre d'exécution.
+        """
+        stages = []
+        for name, stage in self.stages.items():
+            entry = {"stage": name, **stage}
+            if name in self._stats:
+                entry["top_functions"] = self._top_functions(name)
+            stages.append(entry)
+        return {
+            "started_at": self.started_at,
+            "total_wall_time_s": time.perf_counter() - self._t0,
+            "stages": stages,
+        }
+
+    def write_report(self, path: str) -> None:
+        """
+        Écrit le rapport JSON et, si demandé, un fichier cProfile par étape.
+        """
+        if self._profile is not None:
+            self._profile.disable()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+        if self.cprofile_dir:
+            os.makedirs(self.cprofile_dir, exist_ok=True)
+            for i, (name, stats) in enumerate(self._stats.items()):
+                slug = re.sub(r"[^a-zA-Z0-9]+", "_", name).strip("_")
+                stats.dump_stats(os.path.join(self.cprofile_dir, f"{i + 1:02d}_{slug}.prof"))
@@ -1,11 +1,366 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Optional
+
+import numpy as np
 import pandas as pd
 from textblob import TextBlob
 import emoji
+try:
+    from polarity_cache import PolarityCache
+    from profiling import NullProfiler
+    from storage import read_dataset, write_dataset
+except ImportError:  # importé depuis l'API (package 'pipeline') et non lancé comme script du pipeline
+    from pipeline.polarity_cache import PolarityCache
+    from pipeline.profiling import NullProfiler
+    from pipeline.storage import read_dataset, write_dataset
+
+
+# ------------------------------------------------------------------------
+# Fonctions de scoring (au niveau du module pour pouvoir être envoyées
+# aux processus du pool en mode parallèle)
+# ------------------------------------------------------------------------
+
+# Temps cumulé (secondes) de demojize et de TextBlob et nombre de textes scorés dans ce processus,
+# lus et remis à zéro par pop_polarity_timings (rapport de profilage du pipeline)
+_POLARITY_TIMINGS = {"demojize": 0.0, "textblob": 0.0, "texts": 0}
+
+
+def pop_polarity_timings() -> dict:
+    """
+    Retourne les temps cumulés de demojize / TextBlob depuis le dernier appel, puis les remet à zéro.
+    """
+    timings = dict(_POLARITY_TIMINGS)
+    _POLARITY_TIMINGS.update(demojize=0.0, textblob=0.0, texts=0)
+    return timings
+
+
+def _add_polarity_timings(timings: dict) -> None:
+    """
+    Ajoute aux compteurs du processus les temps mesurés ailleurs (processus du pool).
+    """
+    for key, value in timings.items():
+        _POLARITY_TIMINGS[key] += value
+
+
+def get_text_polarity(text: str) -> float:
+    """
+    Calcule la polarité d'un texte via TextBlob.
+    -1.0 = très négatif
+     0.0 = neutre
+     1.0 = très positif
+
+    On "demojise" le texte pour transformer les émojis en code du style :smiley:
+    afin que TextBlob puisse éventuellement déceler une intention.
+    """
+    if not isinstance(text, str):
+        # Si le contenu n'est pas une chaîne, on renvoie 0.0 par défaut (neutre)
+        return 0.0
+
+    # Transforme les éventuels émojis en code textuel
+    started = time.perf_counter()
+    text_no_emoji = emoji.demojize(text)
+    demojized = time.perf_counter()
+
+    # Détermine la polarité via TextBlob
+    polarity = TextBlob(text_no_emoji).sentiment.polarity
+    _POLARITY_TIMINGS["demojize"] += demojized - started
+    _POLARITY_TIMINGS["textblob"] += time.perf_counter() - demojized
+    _POLARITY_TIMINGS["texts"] += 1
+    return polarity
+
+
+def scale_score(score_value: float) -> float:
+    """
+    Convertit la note sur 5 en un intervalle [-1, +1].
+    Exemple:
+      - score=1 => -1.0
+      - score=3 =>  0.0
+      - score=5 => +1.0
+
+    Formule utilisée: (score - 3) / 2
+    """
+    return (score_value - 3) / 2
+
+
+def combined_sentiment(text: str, score_value: float, alpha: float = 0.7) -> float:
+    """
+    Calcule un score numérique qui prend en compte à la fois:
+    - La polarité textuelle (entre -1 et +1, calculée par TextBlob).
+    - La note de l'utilisateur (entre 1 et 5, qu'on convertit en [-1..+1]).
+
+    On fait une moyenne pondérée:
+      combined = alpha * polarité_texte + (1 - alpha) * polarité_score
+
+    alpha est le poids qu'on donne à la polarité du texte.
+    (1 - alpha) est donc le poids accordé à la note.
+
+    Retourne un float, qui peut être positif ou négatif.
+    """
+    pol_text = get_text_polarity(text)
+    pol_score = scale_score(score_value)
+    return alpha * pol_text + (1 - alpha) * pol_score
+
+
+def classify_combined(value: float) -> str:
+    """
+    Cette fonction prend un score numérique (value),
+    et détermine s'il doit être considéré comme 'positive', 'negative'
+    ou 'neutral', selon les seuils choisis.
+
+    On a fixé deux seuils simples :
+    - Si value est supérieur à 0.1, on renvoie 'positive'.
+    - Si value est inférieur à -0.1, on renvoie 'negative'.
+    - Sinon, on considère que c'est 'neutral'.
+
+    Pourquoi ces valeurs de 0.1 et -0.1 ?
+    -------------------------------------
+    On laisse une petite "zone tampon" entre -0.1 et +0.1
+    pour capturer tout ce qui est jugé ni franchement positif,
+    ni franchement négatif. On peut ainsi éviter de dire
+    qu'un avis est "positif" ou "négatif" quand la valeur
+    est très proche de zéro.
+
+    Ces seuils restent arbitraires et peuvent être ajustés
+    en fonction des besoins et de la sensibilité souhaitée.
+    Par exemple, on pourrait choisir 0.05 ou 0.2 comme limites.
+    L'essentiel est de trouver un compromis cohérent avec
+    la façon dont on veut catégoriser les retours utilisateurs.
+    """
+    if value > 0.1:
+        return "positive"
+    elif value < -0.1:
+        return "negative"
+    else:
+        return "neutral"
+
+
+def _polarity_chunk(texts: list) -> tuple:
+    """
+    Tâche exécutée dans un processus du pool : polarité TextBlob d'un morceau de textes,
+    avec les temps de demojize / TextBlob du morceau (renvoyés au processus principal).
+    """
+    pop_polarity_timings()
+    polarities = [get_text_polarity(text) for text in texts]
+    return polarities, pop_polarity_timings()
+
+
+def _run_chunks_in_pool(task: Callable, chunks: list, total: int, workers: int, verbose: bool) -> list:
+    """
+    Exécute 'task' sur chaque morceau dans un pool de processus et concatène
+    les résultats dans l'ordre des morceaux (et non dans l'ordre de fin des processus).
+    'task' retourne (résultats du morceau, temps de demojize / TextBlob) : les temps
+    sont ajoutés à ceux du processus principal.
+    """
+    results = [None] * len(chunks)
+    done = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(task, chunk): i for i, chunk in enumerate(chunks)}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i], timings = future.result()
+            _add_polarity_timings(timings)
+            done += len(results[i])
+            if verbose:
+                print(f"Sentiment : {done}/{total} avis traités ({done * 100 // max(total, 1)}%)")
+
+    return [value for chunk in results for value in chunk]
+
+
+def compute_polarities(
+    texts: list,
+    workers: int = 1,
+    chunk_size: int = 2000,
+    verbose: bool = True
+) -> list:
+    """
+    Calcule la polarité TextBlob de chaque texte, sur un cœur ou sur plusieurs.
+
+    En mode parallèle (workers > 1), les textes sont découpés en morceaux de 'chunk_size'
+    lignes, envoyés à un pool de 'workers' processus (demojize + TextBlob sont du pur
+    Python, un pool de threads serait bridé par le GIL). Chaque résultat est rangé à
+    l'index de son morceau : la sortie est déterministe et dans l'ordre des textes,
+    quel que soit l'ordre de fin des processus. La progression est affichée si 'verbose'.
+
+    Sert aussi de fonction de scoring pour PolarityCache.
+
+    Retour
+    ------
+    list
+        Polarités alignées sur 'texts'.
+    """
+    if workers <= 1:
+        return [get_text_polarity(text) for text in texts]
+    if chunk_size <= 0:
+        raise ValueError("chunk_size doit être strictement positif.")
+    chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+    return _run_chunks_in_pool(_polarity_chunk, chunks, len(texts), workers, verbose)
+
+
+def combined_scores_batch(polarities, scores, alpha: float = 0.7) -> np.ndarray:
+    """
+    Version vectorisée de combined_sentiment, à partir de polarités déjà calculées.
+
+    combined = alpha * polarité_texte + (1 - alpha) * (score - 3) / 2
+
+    Paramètres
+    ----------
+    polarities : array-like
+        Polarités TextBlob (entre -1 et +1), par exemple lues dans le PolarityCache.
+    scores : array-like
+        Notes 1 à 5, alignées sur 'polarities'.
+    alpha : float
+        Poids de la polarité du texte.
+
+    Retour
+    ------
+    np.ndarray
+        Tableau float64 des 'combined_score'.
+    """
+    polarities = np.asarray(polarities, dtype='float64')
+    scores = np.asarray(scores, dtype='float64')
+    return alpha * polarities + (1 - alpha) * ((scores - 3) / 2)
+
+
+def classify_combined_batch(
+    values,
+    positive_threshold: float = 0.1,
+    negative_threshold: float = -0.1
+) -> np.ndarray:
+    """
+    Version vectorisée de classify_combined, avec des seuils ajustables.
+
+    - value > positive_threshold  -> 'positive'
+    - value < negative_threshold  -> 'negative'
+    - sinon                       -> 'neutral'
+
+    Retour
+    ------
+    np.ndarray
+        Tableau des labels ('positive', 'negative', 'neutral').
+    """
+    values = np.asarray(values, dtype='float64')
+    return np.select(
+        [values > positive_threshold, values < negative_threshold],
+        ["positive", "negative"],
+        default="neutral"
+    ).astype(object)
+
+
+def fuse_sentiment(
+    polarities,
+    scores,
+    alpha: float = 0.7,
+    positive_threshold: float = 0.1,
+    negative_threshold: float = -0.1
+) -> tuple:
+    """
+    Fusion polarité + note et classification en une seule passe vectorisée.
+
+    Le coût est celui de quelques opérations NumPy : avec des polarités déjà connues
+    (PolarityCache), on peut relancer la fusion avec un autre 'alpha' ou d'autres seuils
+    en quelques millisecondes, sans repasser par TextBlob.
+
+    Retour
+    ------
+    tuple
+        (combined_score : np.ndarray, sentiment : np.ndarray)
+    """
+    combined = combined_scores_batch(polarities, scores, alpha)
+    labels = classify_combined_batch(combined, positive_threshold, negative_threshold)
+    return combined, labels
+
+
+# Étape du rapport de profilage qui couvre le calcul des polarités
+POLARITY_STAGE = "sentiment : polarités (demojize + TextBlob)"
+
+
+def add_sentiment_columns(
+    df: pd.DataFrame,
+    alpha: float = 0.7,
+    positive_threshold: float = 0.1,
+    negative_threshold: float = -0.1,
+    workers: int = 1,
+    chunk_size: int = 2000,
+    cache_path: Optional[str] = None,
+    cache_max_entries: int = 1_000_000,
+    profiler=None,
+    cache_stats: Optional[dict] = None
+) -> pd.DataFrame:
+    """
+    Ajoute les colonnes 'combined_score' et 'sentiment' à un DataFrame déjà en mémoire
+    (doit contenir 'content' et 'score'). C'est le cœur de generate_sentiment_with_score_csv,
+    réutilisable sans passer par un fichier (ex. mode incrémental du pipeline).
+
+    Les paramètres ont le même sens que dans generate_sentiment_with_score_csv.
+    'cache_stats' (dict, optionnel) reçoit les statistiques du cache de polarités : rien n'est
+    affiché ici, la fonction tourne aussi dans l'API (worker de sentiment, un appel par lot).
+    Le DataFrame est modifié en place et retourné.
+    """
+    profiler = profiler or NullProfiler()
+
+    # ------------------------------------------------------------------------
+    # Contrôle d'existence des colonnes dans le CSV
+    # ------------------------------------------------------------------------
+    if 'content' not in df.columns or 'score' not in df.columns:
+        raise ValueError(
+            "Le fichier CSV doit contenir les colonnes 'content' et 'score'."
+        )
+
+    # ------------------------------------------------------------------------
+    # Calcul du sentiment combiné (polarité du texte + note)
+    # ------------------------------------------------------------------------
+    # Polarité de chaque texte (seule étape coûteuse : demojize + TextBlob)
+    pop_polarity_timings()
+    if cache_path:
+        # Polarités via le cache : seuls les textes distincts inconnus passent par TextBlob
+        with PolarityCache(cache_path, max_entries=cache_max_entries) as cache:
+            polarities = cache.polarities(
+                df['content'].tolist(),
+                scorer=lambda texts: compute_polarities(
+                    texts, workers=min(workers, os.cpu_count() or 1), chunk_size=chunk_size
+                )
+            )
+            if cache_stats is not None:
+                cache_stats.update(cache.stats())
+    else:
+        polarities = compute_polarities(
+            df['content'].tolist(),
+            workers=min(workers, os.cpu_count() or 1),
+            chunk_size=chunk_size
+        )
+    profiler.lap(POLARITY_STAGE, rows_out=len(df))
+    # demojize et TextBlob s'alternent texte par texte : leurs temps cumulés sont des sous-étapes
+    timings = pop_polarity_timings()
+    profiler.record("sentiment : demojize", timings["demojize"], POLARITY_STAGE, calls=timings["texts"])
+    profiler.record("sentiment : TextBlob", timings["textblob"], POLARITY_STAGE, calls=timings["texts"])
+
+    # On crée une nouvelle colonne 'combined_score' pour garder la valeur numérique,
+    # et la colonne 'sentiment' pour catégoriser le résultat final (calcul vectorisé)
+    combined, labels = fuse_sentiment(
+        polarities, df['score'].to_numpy(), alpha=alpha,
+        positive_threshold=positive_threshold, negative_threshold=negative_threshold
+    )
+    df['combined_score'] = combined
+    df['sentiment'] = labels
+    profiler.lap("sentiment : fusion et classification", rows_out=len(df))
+
+    return df
+
 
 def generate_sentiment_with_score_csv(
     input_csv: str,
     output_csv: str = "uber_data_with_combined_sentiment.csv",
-    alpha: float = 0.7
+    alpha: float = 0.7,
+    positive_threshold: float = 0.1,
+    negative_threshold: float = -0.1,
+    workers: int = 1,
+    chunk_size: int = 2000,
+    cache_path: Optional[str] = None,
+    cache_max_entries: int = 1_000_000,
+    profiler=None
 ) -> pd.DataFrame:
     """
     Cette fonction lit un fichier CSV qui doit contenir au moins les colonnes 'content' (le texte de l'avis)
@@ -13,6 +368,8 @@ def generate_sentiment_with_score_csv(
     à la fois la polarité du texte (via TextBlob) et la note numérique de l'utilisateur.
 
     Le résultat est ensuite enregistré dans un nouveau CSV (output_csv).
+    L'entrée comme la sortie peuvent aussi être en Parquet ou Feather :
+    le format est déduit de l'extension du fichier.
     On ajoute :
       - 'combined_score' : la valeur numérique résultante de la combinaison.
       - 'sentiment' : le label final ("positive", "negative" ou "neutral"),
@@ -27,12 +384,29 @@ def generate_sentiment_with_score_csv(
     alpha : float
         Coefficient de pondération de la polarité du texte.
         (1 - alpha) sera la pondération attribuée à la note utilisateur (score).
+    positive_threshold, negative_threshold : float
+        Seuils de classification (voir classify_combined_batch) : au-dessus de 'positive_threshold'
+        l'avis est 'positive', en dessous de 'negative_threshold' il est 'negative'.
+    workers : int
+        Nombre de processus pour le calcul du sentiment. 1 (par défaut) garde le calcul
+        sur un seul cœur ; au-delà, les avis sont répartis par morceaux sur un pool de processus
+        (voir compute_polarities). Le résultat est identique dans les deux cas.
+    chunk_size : int
+        Nombre d'avis par morceau en mode parallèle.
+    cache_path : str, optionnel
+        Fichier SQLite du cache de polarités (voir PolarityCache). Si fourni, chaque texte
+        distinct n'est scoré qu'une fois par run, et seuls les textes jamais vus sont scorés
+        d'un run à l'autre. Par défaut (None), pas de cache.
+    cache_max_entries : int
+        Nombre maximal de textes conservés dans le cache (éviction LRU au-delà).
+    profiler : RunProfiler, optionnel
+        Mesure les étapes (lecture, polarités, fusion, écriture) pour le rapport du pipeline.
 
     Retourne:
     ---------
     pd.DataFrame
         Le DataFrame final, contenant notamment les colonnes 'combined_score' et 'sentiment'.
-    
+
     Remarques:
     ----------
     - On utilise la librairie 'emoji' pour "demojiser" le texte et permettre à TextBlob
@@ -44,124 +418,32 @@ def generate_sentiment_with_score_csv(
     """
 
     # ------------------------------------------------------------------------
-    # Contrôle d'existence des colonnes dans le CSV
-    # ------------------------------------------------------------------------
-    df = pd.read_csv(input_csv)
-    if 'content' not in df.columns or 'score' not in df.columns:
-        raise ValueError(
-            "Le fichier CSV doit contenir les colonnes 'content' et 'score'."
-        )
-    
+    # Lecture puis calcul du sentiment (voir add_sentiment_columns)
     # ------------------------------------------------------------------------
-    # Sous-fonction get_text_polarity: calcule la polarité du texte
-    # ------------------------------------------------------------------------
-    def get_text_polarity(text: str) -> float:
-        """
-        Calcule la polarité d'un texte via TextBlob.
-        -1.0 = très négatif
-         0.0 = neutre
-         1.0 = très positif
-
-        On "demojise" le texte pour transformer les émojis en code du style :smiley:
-        afin que TextBlob puisse éventuellement déceler une intention.
-        """
-        if not isinstance(text, str):
-            # Si le contenu n'est pas une chaîne, on renvoie 0.0 par défaut (neutre)
-            return 0.0
-        
-        # Transforme les éventuels émojis en code textuel
-        text_no_emoji = emoji.demojize(text)
-        
-        # Détermine la polarité via TextBlob
-        return TextBlob(text_no_emoji).sentiment.polarity
-
-    # ------------------------------------------------------------------------
-    # Sous-fonction scale_score: transforme un score 1..5 en une échelle -1..+1
-    # ------------------------------------------------------------------------
-    def scale_score(score_value: float) -> float:
-        """
-        Convertit la note sur 5 en un intervalle [-1, +1].
-        Exemple:
-          - score=1 => -1.0
-          - score=3 =>  0.0
-          - score=5 => +1.0
-
-        Formule utilisée: (score - 3) / 2
-        """
-        return (score_value - 3) / 2
-
-    # ------------------------------------------------------------------------
-    # Sous-fonction combined_sentiment: combine polarité texte et note
-    # ------------------------------------------------------------------------
-    def combined_sentiment(text: str, score_value: float) -> float:
-        """
-        Calcule un score numérique qui prend en compte à la fois:
-        - La polarité textuelle (entre -1 et +1, calculée par TextBlob).
-        - La note de l'utilisateur (entre 1 et 5, qu'on convertit en [-1..+1]).
-
-        On fait une moyenne pondérée:
-          combined = alpha * polarité_texte + (1 - alpha) * polarité_score
-
-        alpha est le poids qu'on donne à la polarité du texte.
-        (1 - alpha) est donc le poids accordé à la note.
-
-        Retourne un float, qui peut être positif ou négatif.
-        """
-        pol_text = get_text_polarity(text)
-        pol_score = scale_score(score_value)
-        return alpha * pol_text + (1 - alpha) * pol_score
-
-    # ------------------------------------------------------------------------
-    # Sous-fonction classify_combined: on utilise trois labels
-    # ------------------------------------------------------------------------
-    def classify_combined(value: float) -> str:
-        """
-        Cette fonction prend un score numérique (value),
-        et détermine s'il doit être considéré comme 'positive', 'negative'
-        ou 'neutral', selon les seuils choisis.
-
-        On a fixé deux seuils simples :
-        - Si value est supérieur à 0.1, on renvoie 'positive'.
-        - Si value est inférieur à -0.1, on renvoie 'negative'.
-        - Sinon, on considère que c'est 'neutral'.
-
-        Pourquoi ces valeurs de 0.1 et -0.1 ?
-        -------------------------------------
-        On laisse une petite "zone tampon" entre -0.1 et +0.1
-        pour capturer tout ce qui est jugé ni franchement positif,
-        ni franchement négatif. On peut ainsi éviter de dire
-        qu'un avis est "positif" ou "négatif" quand la valeur
-        est très proche de zéro.
-
-        Ces seuils restent arbitraires et peuvent être ajustés
-        en fonction des besoins et de la sensibilité souhaitée.
-        Par exemple, on pourrait choisir 0.05 ou 0.2 comme limites.
-        L'essentiel est de trouver un compromis cohérent avec
-        la façon dont on veut catégoriser les retours utilisateurs.
-        """
-        if value > 0.1:
-            return "positive"
-        elif value < -0.1:
-            return "negative"
-        else:
-            return "neutral"
-
-    # ------------------------------------------------------------------------
-    # Application de combined_sentiment à chaque ligne du DataFrame
-    # ------------------------------------------------------------------------
-    # On crée une nouvelle colonne 'combined_score' pour garder la valeur numérique
-    df['combined_score'] = df.apply(
-        lambda row: combined_sentiment(row['content'], row['score']),
-        axis=1
+    profiler = profiler or NullProfiler()
+    df = read_dataset(input_csv)
+    profiler.lap("sentiment : lecture", rows_out=len(df))
+    cache_stats = {}
+    df = add_sentiment_columns(
+        df,
+        alpha=alpha,
+        positive_threshold=positive_threshold,
+        negative_threshold=negative_threshold,
+        workers=workers,
+        chunk_size=chunk_size,
+        cache_path=cache_path,
+        cache_max_entries=cache_max_entries,
+        profiler=profiler,
+        cache_stats=cache_stats
     )
-
-    # On crée la colonne 'sentiment' pour catégoriser le résultat final
-    df['sentiment'] = df['combined_score'].apply(classify_combined)
+    if cache_stats:
+        print("Cache de polarité :", cache_stats)
 
     # ------------------------------------------------------------------------
-    # Sauvegarde du DataFrame (avec ses nouvelles colonnes) dans le CSV de sortie
+    # Sauvegarde du DataFrame (avec ses nouvelles colonnes) dans le fichier de sortie
     # ------------------------------------------------------------------------
-    df.to_csv(output_csv, index=False)
+    write_dataset(df, output_csv)
+    profiler.lap("sentiment : écriture", rows_out=len(df))
 
     # On retourne également le DataFrame pour usage direct (ex: affichage, analyse)
     return df
@@ -0,0 +1,306 @@
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+# ------------------------------------------------------------------------
+# Formats de sortie supportés (déduits de l'extension du fichier)
+# ------------------------------------------------------------------------
+FORMAT_EXTENSIONS = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "feather": ".feather",
+}
+
+# Colonnes à faible cardinalité : stockées en 'category' (dictionnaire)
+CATEGORY_COLUMNS = ["sentiment", "reviewCreatedVersion", "userName"]
+
+# Colonnes entières : on choisit le plus petit type qui couvre les valeurs attendues
+# (score entre 1 et 5, thumbsUpCount reste sous les 2 milliards)
+INTEGER_DTYPES = {
+    "score": "int8",
+    "thumbsUpCount": "int32",
+}
+
+# Colonnes de dates
+DATETIME_COLUMNS = ["at", "repliedAt"]
+
+# Colonnes qui identifient un avis : sert à retrouver dans un jeu publié les avis
+# ingérés par l'API (journal) qui y ont été ajoutés par le pipeline
+REVIEW_KEY_COLUMNS = ["userName", "at", "content"]
+
+
+def detect_format(path: str) -> str:
+    """
+    Déduit le format de stockage à partir de l'extension du fichier.
+
+    Paramètres
+    ----------
+    path : str
+        Chemin du fichier ('.csv', '.parquet', '.feather' ou '.arrow').
+
+    Retour
+    ------
+    str
+        'csv', 'parquet' ou 'feather'.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".arrow":
+        # Arrow IPC et Feather v2 sont le même format sur disque
+        return "feather"
+    for fmt, fmt_ext in FORMAT_EXTENSIONS.items():
+        if ext == fmt_ext:
+            return fmt
+    raise ValueError(
+        f"Extension '{ext}' non supportée : utiliser .csv, .parquet, .feather ou .arrow."
+    )
+
+
+def with_format(path: str, fmt: str) -> str:
+    """
+    Remplace l'extension de 'path' par celle du format demandé.
+    Exemple : with_format('uber_data_final.csv', 'parquet') -> 'uber_data_final.parquet'
+    """
+    if fmt not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Format '{fmt}' inconnu : choisir parmi {list(FORMAT_EXTENSIONS)}.")
+    return os.path.splitext(path)[0] + FORMAT_EXTENSIONS[fmt]
+
+
+def apply_typed_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applique les types "compacts" aux colonnes connues du jeu de données Uber.
+
+    - 'sentiment', 'reviewCreatedVersion', 'userName' -> category
+    - 'at' (et 'repliedAt') -> datetime64
+    - 'score' -> int8, 'thumbsUpCount' -> int32
+
+    Les colonnes absentes sont ignorées, les autres colonnes sont laissées telles quelles.
+    Le DataFrame est modifié en place et retourné.
+    """
+    for col in DATETIME_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+
+    for col, dtype in INTEGER_DTYPES.items():
+        # On ne convertit pas une colonne qui contient encore des manquants
+        if col in df.columns and not df[col].isna().any():
+            df[col] = df[col].astype(dtype)
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+
+    return df
+
+
+def rows_contained_in(df: pd.DataFrame, other: pd.DataFrame) -> np.ndarray:
+    """
+    Indique, pour chaque ligne de 'df', si un avis identique (mêmes REVIEW_KEY_COLUMNS)
+    existe dans 'other'.
+
+    Retour
+    ------
+    np.ndarray
+        Masque booléen aligné sur les lignes de 'df'.
+    """
+    def review_keys(frame: pd.DataFrame) -> pd.MultiIndex:
+        return pd.MultiIndex.from_arrays([
+            pd.to_datetime(frame[col]) if col in DATETIME_COLUMNS else frame[col].astype(object)
+            for col in REVIEW_KEY_COLUMNS
+        ])
+
+    if df.empty or other.empty:
+        return np.zeros(len(df), dtype=bool)
+    return review_keys(df).isin(review_keys(other))
+
+
+def write_dataset(df: pd.DataFrame, path: str, fmt: Optional[str] = None) -> str:
+    """
+    Écrit le DataFrame au format demandé (ou déduit de l'extension).
+
+    Les formats colonnes (Parquet, Feather/Arrow IPC) conservent les types :
+    pas de re-parsing des dates ni des catégories au chargement.
+    Le CSV reste disponible comme format d'export.
+
+    Paramètres
+    ----------
+    df : pd.DataFrame
+        Données à écrire.
+    path : str
+        Chemin de sortie. Si 'fmt' est fourni, l'extension est ajustée en conséquence.
+    fmt : str, optionnel
+        'csv', 'parquet' ou 'feather'. Par défaut, déduit de l'extension de 'path'.
+
+    Retour
+    ------
+    str
+        Chemin effectivement écrit.
+    """
+    if fmt is None:
+        fmt = detect_format(path)
+    else:
+        path = with_format(path, fmt)
+
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return path
+
+    df = apply_typed_schema(df.copy(deep=False))
+    if fmt == "parquet":
+        df.to_parquet(path, index=False, compression="zstd")
+    else:
+        df.reset_index(drop=True).to_feather(path, compression="zstd")
+    return path
+
+
+def read_dataset(path: str, columns: Optional[list] = None) -> pd.DataFrame:
+    """
+    Lit un jeu de données (CSV, Parquet ou Feather/Arrow IPC) et applique le schéma typé.
+
+    Paramètres
+    ----------
+    path : str
+        Chemin du fichier à lire ; le format est déduit de l'extension.
+    columns : list, optionnel
+        Sous-ensemble de colonnes à charger (lecture colonne par colonne
+        pour les formats Parquet et Feather).
+
+    Retour
+    ------
+    pd.DataFrame
+        DataFrame avec les types du schéma (category, datetime64, petits entiers).
+    """
+    fmt = detect_format(path)
+    if fmt == "parquet":
+        df = pd.read_parquet(path, columns=columns)
+    elif fmt == "feather":
+        df = pd.read_feather(path, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+    return apply_typed_schema(df)
+
+
+def append_dataset(df: pd.DataFrame, path: str) -> str:
+    """
+    Ajoute des lignes à la fin d'un jeu de données existant (ou le crée s'il n'existe pas).
+
+    - CSV : ajout en fin de fichier sans réécrire l'existant (pas d'en-tête répété).
+      Les colonnes sont réordonnées selon l'en-tête du fichier.
+    - Parquet / Feather : ces formats ne permettent pas l'ajout en place ;
+      l'existant est relu puis réécrit avec les nouvelles lignes.
+
+    Retour
+    ------
+    str
+        Chemin écrit.
+    """
+    if not os.path.exists(path):
+        return write_dataset(df, path)
+
+    fmt = detect_format(path)
+    if fmt == "csv":
+        header = pd.read_csv(path, nrows=0).columns.tolist()
+        df[header].to_csv(path, mode='a', header=False, index=False)
+        return path
+
+    existing = read_dataset(path)
+    combined = pd.concat([existing, df[existing.columns.tolist()]], ignore_index=True)
+    return write_dataset(combined, path)
+
+
+class DatasetWriter:
+    """
+    Écriture d'un jeu de données morceau par morceau (mode streaming du pipeline).
+
+    Chaque appel à write() ajoute un morceau à la fin du fichier, sans jamais garder
+    l'ensemble du jeu en mémoire :
+    - CSV : ajout en fin de fichier, en-tête écrit une seule fois ;
+    - Parquet : un row group par morceau (pyarrow.parquet.ParquetWriter) ;
+    - Feather : un record batch par morceau (fichier Arrow IPC).
+
+    Le schéma Arrow est fixé par le premier morceau ; les suivants y sont convertis.
+    Les colonnes 'category' sont écrites en chaînes (leurs catégories changent d'un morceau
+    à l'autre) : read_dataset les re-catégorise au chargement.
+
+    Paramètres
+    ----------
+    path : str
+        Fichier de sortie.
+    fmt : str, optionnel
+        'csv', 'parquet' ou 'feather' ; par défaut déduit de l'extension de 'path'.
+    append : bool
+        Ajouter à un fichier existant au lieu de l'écraser (CSV uniquement).
+    """
+
+    def __init__(self, path: str, fmt: Optional[str] = None, append: bool = False):
+        if fmt is None:
+            fmt = detect_format(path)
+        else:
+            path = with_format(path, fmt)
+        if append and fmt != "csv" and os.path.exists(path):
+            raise ValueError("L'ajout en streaming à un fichier existant n'est possible qu'en CSV.")
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self._header = not (append and os.path.exists(path))
+        self._columns = pd.read_csv(path, nrows=0).columns.tolist() if not self._header else None
+        self._schema = None
+        self._writer = None
+        self._sink = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Ajoute un morceau à la fin du fichier.
+        """
+        if self.fmt == "csv":
+            if self._columns is None:
+                self._columns = df.columns.tolist()
+            df[self._columns].to_csv(
+                self.path, mode='w' if self._header else 'a', header=self._header, index=False
+            )
+            self._header = False
+            self.rows += len(df)
+            return
+
+        import pyarrow as pa
+
+        df = apply_typed_schema(df.copy(deep=False))
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(object)
+
+        if self._schema is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._schema = table.schema
+            if self.fmt == "parquet":
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self.path, self._schema, compression="zstd")
+            else:
+                self._sink = pa.OSFile(self.path, "wb")
+                self._writer = pa.ipc.new_file(
+                    self._sink, self._schema, options=pa.ipc.IpcWriteOptions(compression="zstd")
+                )
+        else:
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self) -> None:
+        """
+        Termine l'écriture (pied de fichier Parquet / Arrow) et ferme le fichier.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
@@ -0,0 +1,80 @@
+# test_sql_backend.py
+#
+# Parité du backend SQL (DuckDB, SQLite) avec les fonctions pandas de kpi.py, et chargement
+# de la base par SQLDatasetStore (fichier publié, journal d'ingestion, réutilisation au redémarrage).
+# À lancer depuis BACK-END/FAST-API : python -m pytest tests
+
+import os
+import warnings
+
+import pandas as pd
+import pytest
+
+from kpi_function.dataset import DatasetStore
+from kpi_function.serving import build_serving_frame
+from kpi_function.sql_backend import SQL_ENGINES, SQLDatasetStore, SQLKPIBackend, check_parity, duckdb
+from pipeline.storage import append_dataset, read_dataset, write_dataset
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "Assets", "Datas", "archive_uber", "uber_data_final.csv")
+
+ENGINES = [
+    pytest.param(
+        engine,
+        marks=pytest.mark.skipif(engine == "duckdb" and duckdb is None, reason="duckdb non installé")
+    )
+    for engine in SQL_ENGINES
+]
+
+
+@pytest.fixture(autouse=True)
+def ignore_deprecated_freq():
+    # Les alias de fréquence dépréciés ('M') restent ceux des fonctions pandas comparées
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        yield
+
+
+def assert_parity(backend: SQLKPIBackend, frame: pd.DataFrame) -> None:
+    failures = [entry for entry in check_parity(backend, frame) if entry["difference"] is not None]
+    assert not failures, failures
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_kpis_match_pandas(engine, tmp_path):
+    backend = SQLKPIBackend(engine, str(tmp_path / f"kpi.{engine}"))
+    backend.load_file(DATA_PATH)
+    assert_parity(backend, build_serving_frame(read_dataset(DATA_PATH)))
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_store_loads_file_and_journal(engine, tmp_path):
+    data_path = str(tmp_path / "data.csv")
+    journal_path = str(tmp_path / "journal.csv")
+    db_path = str(tmp_path / f"kpi.{engine}")
+    published = read_dataset(DATA_PATH).head(2000)
+    write_dataset(published, data_path)
+
+    store = SQLDatasetStore(SQLKPIBackend(engine, db_path), data_path, read_dataset, journal_path, append_dataset)
+    store.reload(force=True)
+    reviews = published.head(3).assign(userName=["new0", "new1", "new2"], sentiment="negative")
+    store.ingest(reviews)
+    assert store.current.rows == 2003
+
+    # Même jeu que le DatasetStore pandas : fichier puis journal
+    pandas_store = DatasetStore(data_path, read_dataset, journal_path, append_dataset)
+    pandas_store.reload(force=True)
+    assert_parity(store.backend, pandas_store.current.frame)
+
+    # Redémarrage : la base est réutilisée sans recharger le fichier
+    restarted = SQLDatasetStore(SQLKPIBackend(engine, db_path), data_path, read_dataset, journal_path, append_dataset)
+    assert restarted.backend.is_loaded(data_path, store.current.version)
+    restarted.reload(force=True)
+    assert restarted.current.rows == 2003
+
+    # Republication avec les avis du journal : ils sont retirés du journal, pas ajoutés deux fois
+    write_dataset(pd.concat([published, reviews], ignore_index=True), data_path)
+    assert restarted.reload()
+    assert restarted.current.rows == 2003
+    assert restarted.status()["journal_folded_rows"] == 3
+    assert not os.path.exists(journal_path)
+    assert_parity(restarted.backend, build_serving_frame(read_dataset(data_path)))